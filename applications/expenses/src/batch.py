@@ -0,0 +1,181 @@
+"""
+Non-interactive batch mode for the expense CLI.
+
+Commands are read from a file or stdin, one JSON object per line:
+
+    {"op": "add", "name": "Coffee", "price": 3.5, "tags": ["food"]}
+    {"op": "update", "id": 12, "price": 4.25}
+    {"op": "delete", "id": 13}
+    {"op": "search", "query": "cof"}
+    {"op": "search", "query": "cofee", "fuzzy": true, "distance": 1}
+    {"op": "list"}
+
+`add` takes the same fields as an NDJSON import (see bulk.py); `update`
+takes any of name, price and tags. The whole batch runs as one transaction
+(see ExpenseManager.transaction): the changes are persisted once at the
+end, and if any command fails none of them are. Results are written to
+stdout as one JSON object per command, then a summary:
+
+    {"line": 1, "op": "add", "ok": true, "expense": {...}}
+    {"line": 4, "op": "search", "ok": true, "count": 2, "total": 7.75,
+     "expenses": [...]}
+    {"line": 5, "op": "delete", "ok": false, "error": "no expense with id 99"}
+    {"committed": false, "commands": 5, "changes": 3}
+"""
+
+import contextlib
+import json
+import math
+import os
+import sys
+from typing import Any, Dict, Iterable, Iterator, TextIO, Tuple
+
+from bulk import validate_record
+from expenses_core.fuzzy_index import DEFAULT_MAX_DISTANCE
+from expenses_core.tag_index import normalize_tags
+
+COMMANDS = ("add", "update", "delete", "search", "list")
+CHANGES = ("add", "update", "delete")
+
+
+class BatchError(Exception):
+    """A command that cannot be run; the batch is rolled back."""
+
+
+def iter_commands(lines: Iterable[str]) -> Iterator[Tuple[int, Any]]:
+    """Yield (line number, parsed command or JSON error) pairs, skipping
+    blank lines."""
+    for line_num, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_num, json.loads(line)
+        except ValueError as e:
+            yield line_num, e
+
+
+def _expense_id(command: Dict[str, Any]) -> int:
+    expense_id = command.get("id")
+    if not isinstance(expense_id, int) or isinstance(expense_id, bool):
+        raise BatchError(f"invalid id {expense_id!r}")
+    return expense_id
+
+
+def _price(value: Any) -> float:
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        raise BatchError(f"invalid price {value!r}") from None
+    if not math.isfinite(price):
+        raise BatchError(f"invalid price {value!r}")
+    return price
+
+
+def _listing(expenses: Iterable) -> Dict[str, Any]:
+    records = [expense.to_dict() for expense in expenses]
+    return {
+        "count": len(records),
+        "total": math.fsum(record["price"] for record in records),
+        "expenses": records,
+    }
+
+
+def run_command(manager, command: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one command and return its result fields. Raises BatchError."""
+    if isinstance(command, Exception):
+        raise BatchError(f"invalid JSON: {command}")
+    if not isinstance(command, dict) or command.get("op") not in COMMANDS:
+        raise BatchError(f"expected an object with an op in {', '.join(COMMANDS)}")
+    op = command["op"]
+    try:
+        if op == "add":
+            name, price, timestamp, tags = validate_record(command)
+            return {
+                "expense": manager.add_expense(name, price, timestamp, tags).to_dict()
+            }
+        if op == "update":
+            expense_id = _expense_id(command)
+            name = command.get("name")
+            if name is not None and (not isinstance(name, str) or not name.strip()):
+                raise BatchError(f"invalid name {name!r}")
+            price = command.get("price")
+            if price is not None:
+                price = _price(price)
+            tags = command.get("tags")
+            if tags is not None:
+                tags = normalize_tags(tags)
+            expense = manager.update_expense(expense_id, name, price, tags)
+            if expense is None:
+                raise BatchError(f"no expense with id {expense_id}")
+            return {"expense": expense.to_dict()}
+        if op == "delete":
+            expense_id = _expense_id(command)
+            expense = manager.delete_expense(expense_id)
+            if expense is None:
+                raise BatchError(f"no expense with id {expense_id}")
+            return {"expense": expense.to_dict()}
+        if op == "search":
+            query = command.get("query")
+            if not isinstance(query, str):
+                raise BatchError(f"invalid query {query!r}")
+            if command.get("fuzzy"):
+                distance = command.get("distance", DEFAULT_MAX_DISTANCE)
+                if not isinstance(distance, int) or distance < 0:
+                    raise BatchError(f"invalid distance {distance!r}")
+                return _listing(manager.expenses_similar_to(query, distance))
+            return _listing(manager.expenses_matching(query))
+        return _listing(manager.iter_expenses())
+    except ValueError as e:
+        raise BatchError(str(e)) from None
+
+
+def run_batch(manager, lines: Iterable[str], out: TextIO) -> bool:
+    """Run every command in one transaction, writing a JSON line per
+    result and then a summary to out. Returns whether the changes were
+    committed."""
+    commands = changes = 0
+    committed = False
+    # The manager reports each change on stdout; keep that out of the
+    # results.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        try:
+            with manager.transaction():
+                for line_num, command in iter_commands(lines):
+                    commands += 1
+                    op = command.get("op") if isinstance(command, dict) else None
+                    try:
+                        result = run_command(manager, command)
+                    except BatchError as e:
+                        out.write(
+                            json.dumps(
+                                {
+                                    "line": line_num,
+                                    "op": op,
+                                    "ok": False,
+                                    "error": str(e),
+                                }
+                            )
+                            + "\n"
+                        )
+                        raise
+                    out.write(
+                        json.dumps({"line": line_num, "op": op, "ok": True, **result})
+                        + "\n"
+                    )
+                    changes += op in CHANGES
+            # A failed save leaves the changes pending.
+            committed = not manager.pending
+        except BatchError:
+            pass
+    out.write(
+        json.dumps({"committed": committed, "commands": commands, "changes": changes})
+        + "\n"
+    )
+    return committed
+
+
+def open_commands(path: str):
+    """The command file, or stdin for "-"."""
+    if path == "-":
+        return contextlib.nullcontext(sys.stdin)
+    return open(path, "r")
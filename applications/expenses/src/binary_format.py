@@ -0,0 +1,231 @@
+"""
+Memory-mapped binary format for expenses.
+
+Layout (little-endian):
+
+    header   magic "EXPB", version, record count, string heap offset
+    records  one fixed-width record per expense, sorted by id:
+             id (int64), price (float64), name offset (uint64),
+             name length (uint32), tags length (uint32),
+             timestamp (int64 seconds), tags offset (uint64)
+    heap     UTF-8 names and comma-separated tag lists; each distinct
+             string is stored once
+
+Files from older versions (1: no timestamp or tags, 2: no tags) can still
+be read.
+
+Opening a file only reads the header, records are decoded on access, and
+an id lookup is a binary search over the mapped records. Because the file
+is mapped read-only, several processes reading it share the OS page cache.
+
+Convert between formats with:
+    python src/binary_format.py to-binary expenses.json expenses.bin
+    python src/binary_format.py to-json expenses.bin expenses.json
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from expenses_core.partitions import (
+    NO_TIMESTAMP,
+    seconds_to_timestamp,
+    timestamp_to_seconds,
+)
+from expenses_core.streaming import iter_records
+
+MAGIC = b"EXPB"
+VERSION = 3
+HEADER = struct.Struct("<4sHHQQ4x")
+RECORD = struct.Struct("<qdQIIqQ")
+_RECORDS = {
+    1: struct.Struct("<qdQI4x"),
+    2: struct.Struct("<qdQI4xq"),
+    VERSION: RECORD,
+}
+_ID = struct.Struct("<q")
+
+
+class BinaryExpenseFile:
+    """Read-only, memory-mapped view of a binary expenses file."""
+
+    def __init__(self, file_path: Path):
+        self.file_path = file_path
+        with open(file_path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.count, self.heap_offset = HEADER.unpack_from(
+            self._map, 0
+        )
+        if magic != MAGIC or version not in _RECORDS:
+            self._map.close()
+            raise ValueError(f"{file_path} is not a binary expenses file")
+        self._version = version
+        self._record = _RECORDS[version]
+
+    def _id_at(self, index: int) -> int:
+        return _ID.unpack_from(self._map, HEADER.size + index * self._record.size)[0]
+
+    def record(self, index: int) -> Dict[str, Any]:
+        """Decode the record at a 0-based position."""
+        fields = self._record.unpack_from(
+            self._map, HEADER.size + index * self._record.size
+        )
+        if self._version == 1:
+            expense_id, price, name_offset, name_length = fields
+            seconds, tags = NO_TIMESTAMP, []
+        elif self._version == 2:
+            expense_id, price, name_offset, name_length, seconds = fields
+            tags = []
+        else:
+            (
+                expense_id,
+                price,
+                name_offset,
+                name_length,
+                tags_length,
+                seconds,
+                tags_offset,
+            ) = fields
+            tags = self._string(tags_offset, tags_length)
+            tags = tags.split(",") if tags else []
+        return {
+            "name": self._string(name_offset, name_length),
+            "price": price,
+            "id": expense_id,
+            "timestamp": seconds_to_timestamp(seconds),
+            "tags": tags,
+        }
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self.heap_offset + offset
+        return self._map[start : start + length].decode("utf-8")
+
+    def get(self, expense_id: int) -> Optional[Dict[str, Any]]:
+        """Find a record by id with a binary search over the mapped file."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._id_at(middle) < expense_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self._id_at(low) == expense_id:
+            return self.record(low)
+        return None
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(self.count):
+            yield self.record(index)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __enter__(self) -> "BinaryExpenseFile":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def write_binary(file_path: Path, records: Iterable[Any]) -> int:
+    """Atomically write expenses (objects or dicts) in the binary format.
+
+    Records must be given in ascending id order. Returns how many were
+    written.
+    """
+    tmp_path = file_path.with_name(file_path.name + ".tmp")
+    heap = bytearray()
+    offsets: Dict[str, int] = {}
+    count = 0
+
+    def add_string(text: str) -> Tuple[int, int]:
+        encoded = text.encode("utf-8")
+        offset = offsets.get(text)
+        if offset is None:
+            offset = offsets[text] = len(heap)
+            heap.extend(encoded)
+        return offset, len(encoded)
+
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0))
+        for record in records:
+            if isinstance(record, dict):
+                expense_id, name, price = record["id"], record["name"], record["price"]
+                timestamp = record.get("timestamp")
+                tags = record.get("tags", ())
+            else:
+                expense_id, name, price = record.id, record.name, record.price
+                timestamp = record.timestamp
+                tags = record.tags
+            name_offset, name_length = add_string(name)
+            tags_offset, tags_length = add_string(",".join(tags))
+            f.write(
+                RECORD.pack(
+                    expense_id,
+                    price,
+                    name_offset,
+                    name_length,
+                    tags_length,
+                    timestamp_to_seconds(timestamp),
+                    tags_offset,
+                )
+            )
+            count += 1
+        heap_offset = f.tell()
+        f.write(heap)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, 0, count, heap_offset))
+    os.replace(tmp_path, file_path)
+    return count
+
+
+def is_binary_file(file_path: Path) -> bool:
+    with open(file_path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def json_to_binary(json_path: Path, binary_path: Path) -> int:
+    """Convert expenses.json to the binary format."""
+    records = sorted(iter_records(json_path), key=lambda record: record["id"])
+    return write_binary(binary_path, records)
+
+
+def binary_to_json(binary_path: Path, json_path: Path) -> int:
+    """Convert a binary expenses file back to expenses.json."""
+    with BinaryExpenseFile(binary_path) as expenses:
+        tmp_path = json_path.with_name(json_path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(list(expenses), f, indent=2)
+        os.replace(tmp_path, json_path)
+        return len(expenses)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert expenses between JSON and the binary format."
+    )
+    parser.add_argument("command", choices=["to-binary", "to-json"])
+    parser.add_argument("source", type=Path)
+    parser.add_argument("destination", type=Path)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "to-binary":
+            count = json_to_binary(args.source, args.destination)
+        else:
+            count = binary_to_json(args.source, args.destination)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return
+    print(f"Converted {count} expenses to {args.destination}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Bulk import and export of expenses as CSV or newline-delimited JSON.
+
+Imports stream the input file, validate records a batch at a time and hand
+each valid batch to the manager, which indexes it as a whole, and persist
+once per batch rather than once per row where that only appends the batch:
+in journal mode and with the SQLite backend. A snapshot file would be
+rewritten whole for every batch, making a large import quadratic, so there
+the import is one transaction saved once at the end. Imported records
+always get new ids, and keep their `timestamp` and `tags` (a list, or a
+comma-separated string in CSV) when they have them. Exports stream
+straight from the store.
+"""
+
+import contextlib
+import csv
+import json
+import math
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from expenses_core.partitions import normalize_timestamp
+from expenses_core.tag_index import normalize_tags
+
+FORMATS = ("csv", "ndjson")
+BATCH_SIZE = 10000
+# How many rejected records are reported individually.
+MAX_REPORTED_ERRORS = 10
+
+
+def detect_format(path: Path, fmt: Optional[str] = None) -> str:
+    """Pick the file format from an explicit choice or the file suffix."""
+    if fmt:
+        return fmt
+    suffix = path.suffix.lower().lstrip(".")
+    if suffix in ("ndjson", "jsonl"):
+        return "ndjson"
+    if suffix == "csv":
+        return "csv"
+    raise ValueError(f"Cannot tell the format of {path}; use --format")
+
+
+def iter_records(path: Path, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """Yield (line number, raw record) pairs from an import file."""
+    with open(path, "r", newline="") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_num, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_num, json.loads(line)
+                except ValueError as e:
+                    yield line_num, e
+
+
+def validate_record(record: Any) -> Tuple[str, float, Optional[str], List[str]]:
+    """Return (name, price, timestamp, tags) for a raw record or raise
+    ValueError."""
+    if isinstance(record, Exception):
+        raise ValueError(f"invalid JSON: {record}")
+    if not isinstance(record, dict):
+        raise ValueError("record is not an object")
+
+    name = record.get("name")
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError("missing name")
+    try:
+        price = float(record.get("price"))
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid price {record.get('price')!r}")
+    if not math.isfinite(price):
+        raise ValueError(f"invalid price {record.get('price')!r}")
+
+    timestamp = record.get("timestamp") or None
+    if timestamp is not None:
+        try:
+            timestamp = normalize_timestamp(timestamp)
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid timestamp {timestamp!r}")
+    return name, price, timestamp, normalize_tags(record.get("tags"))
+
+
+def import_expenses(
+    manager, path: Path, fmt: Optional[str] = None, batch_size: int = BATCH_SIZE
+) -> Tuple[int, int]:
+    """Import expenses into manager, returning (imported, rejected) counts.
+
+    In journal mode and with the SQLite backend each batch is a transaction
+    of its own, so a failed import keeps the batches saved before it.
+    Otherwise the import is one transaction: the batches are added to
+    memory and saved once at the end, or not at all if the import fails.
+    """
+    fmt = detect_format(path, fmt)
+    records = iter_records(path, fmt)
+    imported = rejected = 0
+    per_batch = manager.journal is not None or (
+        manager.store is not None and manager.store.durable
+    )
+
+    with contextlib.nullcontext() if per_batch else manager.transaction():
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+
+            valid: List[Tuple[str, float, Optional[str], List[str]]] = []
+            for line_num, record in batch:
+                try:
+                    valid.append(validate_record(record))
+                except ValueError as e:
+                    rejected += 1
+                    if rejected <= MAX_REPORTED_ERRORS:
+                        print(f"Skipping line {line_num}: {e}")
+            if valid:
+                with manager.transaction() if per_batch else contextlib.nullcontext():
+                    manager.add_expenses(valid)
+                imported += len(valid)
+
+    if rejected > MAX_REPORTED_ERRORS:
+        print(f"... {rejected - MAX_REPORTED_ERRORS} more records skipped")
+    return imported, rejected
+
+
+def export_expenses(manager, path: Path, fmt: Optional[str] = None) -> int:
+    """Write every expense to path, returning how many were written."""
+    fmt = detect_format(path, fmt)
+    count = 0
+    with open(path, "w", newline="") as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(["id", "name", "price", "timestamp", "tags"])
+            for expense in manager.iter_expenses():
+                writer.writerow(
+                    [
+                        expense.id,
+                        expense.name,
+                        expense.price,
+                        expense.timestamp or "",
+                        ",".join(expense.tags),
+                    ]
+                )
+                count += 1
+        else:
+            for expense in manager.iter_expenses():
+                record: Dict[str, Any] = expense.to_dict()
+                f.write(json.dumps(record) + "\n")
+                count += 1
+    return count
@@ -0,0 +1,301 @@
+"""
+Compact columnar storage for expenses.
+
+Instead of one dataclass instance (plus its __dict__ and float object) per
+expense, prices are kept in a single array of doubles, timestamps in an
+array of 64-bit seconds, and names and tag sets are each stored once in a
+table and referenced by a 4-byte id. Individual expenses
+are exposed through lightweight views that read and write the columns.
+
+Rows are kept in id order, so an id is found by binary search over the id
+column rather than through a dict, which would cost more than the row.
+"""
+
+import math
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from expenses_core.partitions import seconds_to_timestamp, timestamp_to_seconds
+
+
+class ExpenseView:
+    """A view of one row in a ColumnarExpenses store.
+
+    Views address rows by position, so they should not be kept across
+    deletes or adds.
+    """
+
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, store: "ColumnarExpenses", index: int):
+        self._store = store
+        self._index = index
+
+    @property
+    def id(self) -> int:
+        return self._store._ids[self._index]
+
+    @property
+    def name(self) -> str:
+        return self._store._names[self._store._name_refs[self._index]]
+
+    @name.setter
+    def name(self, value: str) -> None:
+        self._store._name_refs[self._index] = self._store._intern(value)
+
+    @property
+    def price(self) -> float:
+        return self._store._prices[self._index]
+
+    @price.setter
+    def price(self, value: float) -> None:
+        self._store._prices[self._index] = value
+
+    @property
+    def timestamp(self) -> Optional[str]:
+        return seconds_to_timestamp(self._store._timestamps[self._index])
+
+    @timestamp.setter
+    def timestamp(self, value: Optional[str]) -> None:
+        self._store._timestamps[self._index] = timestamp_to_seconds(value)
+
+    @property
+    def tags(self) -> List[str]:
+        return list(self._store._tag_sets[self._store._tag_refs[self._index]])
+
+    @tags.setter
+    def tags(self, value: Iterable[str]) -> None:
+        self._store._tag_refs[self._index] = self._store._intern_tags(value)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "price": self.price,
+            "id": self.id,
+            "timestamp": self.timestamp,
+            "tags": self.tags,
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"ExpenseView(name={self.name!r}, price={self.price!r}, "
+            f"id={self.id!r}, timestamp={self.timestamp!r}, "
+            f"tags={self.tags!r})"
+        )
+
+
+class ColumnarExpenses:
+    """A dict-like container, keyed by expense id, that stores expenses
+    column by column."""
+
+    def __init__(self, expense_type: type):
+        # Type used when a row is detached from the store, e.g. on pop().
+        self.expense_type = expense_type
+        self._ids = array("q")
+        self._prices = array("d")
+        self._timestamps = array("q")
+        self._name_refs = array("I")
+        self._names: List[str] = []
+        self._name_ids: Dict[str, int] = {}
+        # Distinct tag combinations; most expenses share a handful.
+        self._tag_refs = array("I")
+        self._tag_sets: List[Tuple[str, ...]] = [()]
+        self._tag_set_ids: Dict[Tuple[str, ...], int] = {(): 0}
+        # 1 for each live row. Deleted rows are left as tombstones (price
+        # 0.0) so positions stay valid, and are squeezed out once they make
+        # up half of the columns.
+        self._live = bytearray()
+        self._deleted = 0
+
+    def _intern(self, name: str) -> int:
+        """Return the string table id for a name, adding it if needed."""
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = len(self._names)
+            self._names.append(name)
+            self._name_ids[name] = name_id
+        return name_id
+
+    def _intern_tags(self, tags: Iterable[str]) -> int:
+        """Return the table id for a combination of tags."""
+        tags = tuple(tags)
+        tag_set_id = self._tag_set_ids.get(tags)
+        if tag_set_id is None:
+            tag_set_id = len(self._tag_sets)
+            self._tag_sets.append(tags)
+            self._tag_set_ids[tags] = tag_set_id
+        return tag_set_id
+
+    def _find(self, expense_id: int) -> Tuple[int, bool]:
+        """Return the row position of an id, or where it would go, and
+        whether a row (live or deleted) with that id is there."""
+        ids = self._ids
+        if ids and ids[-1] < expense_id:
+            return len(ids), False
+        position = bisect_left(ids, expense_id)
+        return position, position < len(ids) and ids[position] == expense_id
+
+    def _position(self, expense_id: int) -> Optional[int]:
+        position, found = self._find(expense_id)
+        return position if found and self._live[position] else None
+
+    def add(
+        self,
+        expense_id: int,
+        name: str,
+        price: float,
+        timestamp: Optional[str] = None,
+        tags: Iterable[str] = (),
+    ) -> None:
+        position, found = self._find(expense_id)
+        if found:
+            if not self._live[position]:
+                self._live[position] = 1
+                self._deleted -= 1
+            self._prices[position] = price
+            self._timestamps[position] = timestamp_to_seconds(timestamp)
+            self._name_refs[position] = self._intern(name)
+            self._tag_refs[position] = self._intern_tags(tags)
+            return
+        if position == len(self._ids):
+            self._ids.append(expense_id)
+            self._prices.append(price)
+            self._timestamps.append(timestamp_to_seconds(timestamp))
+            self._name_refs.append(self._intern(name))
+            self._tag_refs.append(self._intern_tags(tags))
+            self._live.append(1)
+            return
+        # Ids mostly arrive in order; an older one is inserted in place.
+        self._ids.insert(position, expense_id)
+        self._prices.insert(position, price)
+        self._timestamps.insert(position, timestamp_to_seconds(timestamp))
+        self._name_refs.insert(position, self._intern(name))
+        self._tag_refs.insert(position, self._intern_tags(tags))
+        self._live.insert(position, 1)
+
+    def __setitem__(self, expense_id: int, expense) -> None:
+        self.add(
+            expense_id, expense.name, expense.price, expense.timestamp, expense.tags
+        )
+
+    def get(self, expense_id: int) -> Optional[ExpenseView]:
+        position = self._position(expense_id)
+        if position is None:
+            return None
+        return ExpenseView(self, position)
+
+    def pop(self, expense_id: int):
+        view = self[expense_id]
+        expense = self.expense_type(
+            name=view.name,
+            price=view.price,
+            id=expense_id,
+            timestamp=view.timestamp,
+            tags=view.tags,
+        )
+        position = view._index
+        self._live[position] = 0
+        self._prices[position] = 0.0
+        self._deleted += 1
+        if self._deleted * 2 > len(self._ids):
+            self._compact()
+        return expense
+
+    def _compact(self) -> None:
+        """Drop tombstoned rows from the columns."""
+        live = [position for position, alive in enumerate(self._live) if alive]
+        self._ids = array("q", (self._ids[p] for p in live))
+        self._prices = array("d", (self._prices[p] for p in live))
+        self._timestamps = array("q", (self._timestamps[p] for p in live))
+        self._name_refs = array("I", (self._name_refs[p] for p in live))
+        self._tag_refs = array("I", (self._tag_refs[p] for p in live))
+        self._live = bytearray(b"\x01") * len(live)
+        self._deleted = 0
+
+    def values(self) -> Iterator[ExpenseView]:
+        for position, alive in enumerate(self._live):
+            if alive:
+                yield ExpenseView(self, position)
+
+    def snapshot(self) -> "ColumnarExpenses":
+        """A copy that later changes to this store do not affect.
+
+        The columns are copied, which is a single memory copy each; the
+        name and tag tables are only ever appended to, so they are shared.
+        """
+        copy = ColumnarExpenses(self.expense_type)
+        copy._ids = self._ids[:]
+        copy._prices = self._prices[:]
+        copy._timestamps = self._timestamps[:]
+        copy._name_refs = self._name_refs[:]
+        copy._tag_refs = self._tag_refs[:]
+        copy._names = self._names
+        copy._name_ids = self._name_ids
+        copy._tag_sets = self._tag_sets
+        copy._tag_set_ids = self._tag_set_ids
+        copy._live = self._live[:]
+        copy._deleted = self._deleted
+        return copy
+
+    def columns(self) -> Tuple[array, array, array, array, List[str], bytearray]:
+        """The raw (ids, prices, timestamps, name refs, names, live) columns.
+
+        Deleted rows are still present, with 0 in live.
+        """
+        return (
+            self._ids,
+            self._prices,
+            self._timestamps,
+            self._name_refs,
+            self._names,
+            self._live,
+        )
+
+    def total(self) -> float:
+        """Sum all prices in one pass over the price column."""
+        return math.fsum(self._prices)
+
+    def memory_usage(self) -> int:
+        """Approximate bytes used by the store: the columns, the name and
+        tag tables and the dicts that look them up."""
+        tags = {tag for tag_set in self._tag_sets for tag in tag_set}
+        return (
+            sum(
+                sys.getsizeof(column)
+                for column in (
+                    self._ids,
+                    self._prices,
+                    self._timestamps,
+                    self._name_refs,
+                    self._tag_refs,
+                    self._live,
+                )
+            )
+            + sys.getsizeof(self._names)
+            + sys.getsizeof(self._name_ids)
+            + sum(sys.getsizeof(name) for name in self._names)
+            + sys.getsizeof(self._tag_sets)
+            + sys.getsizeof(self._tag_set_ids)
+            + sum(sys.getsizeof(tag_set) for tag_set in self._tag_sets)
+            + sum(sys.getsizeof(tag) for tag in tags)
+        )
+
+    def __getitem__(self, expense_id: int) -> ExpenseView:
+        view = self.get(expense_id)
+        if view is None:
+            raise KeyError(expense_id)
+        return view
+
+    def __contains__(self, expense_id: int) -> bool:
+        return self._position(expense_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._ids) - self._deleted
+
+    def __iter__(self) -> Iterator[int]:
+        return (expense_id for expense_id, alive in zip(self._ids, self._live) if alive)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
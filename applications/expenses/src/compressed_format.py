@@ -0,0 +1,250 @@
+"""
+Block-compressed snapshot format for expenses.
+
+Archived expense files are large and mostly repetitive text, so this format
+stores the records as JSON compressed with zlib or lzma. Records are
+grouped into blocks of BLOCK_RECORDS that are each compressed on their own,
+and a block index at the end of the file gives each block's id range,
+timestamp range and position. An id lookup or a date range query only
+decompresses the blocks that can contain matches.
+
+Layout (little-endian):
+
+    header  magic "EXPZ", version, codec, record count, index offset,
+            index length
+    blocks  compressed JSON arrays of records, sorted by id
+    index   compressed JSON list with one entry per block: first id, last
+            id, earliest and latest timestamp, offset, length, record count
+
+The most recently decompressed block is kept, so reading records in order
+or looking up nearby ids decompresses each block once.
+
+Convert between formats with:
+    python src/compressed_format.py to-compressed expenses.json expenses.jsonz
+    python src/compressed_format.py to-json expenses.jsonz expenses.json
+"""
+
+import argparse
+import bisect
+import itertools
+import json
+import lzma
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from expenses_core.partitions import in_range
+from expenses_core.streaming import iter_records
+
+MAGIC = b"EXPZ"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQQQ")
+CODECS = ("zlib", "lzma")
+# Larger blocks compress better; smaller ones make a single lookup cheaper.
+BLOCK_RECORDS = 1024
+
+_COMPRESS = {"zlib": zlib.compress, "lzma": lzma.compress}
+_DECOMPRESS = {"zlib": zlib.decompress, "lzma": lzma.decompress}
+
+# Fields of a block index entry.
+_FIRST_ID, _LAST_ID, _EARLIEST, _LATEST, _OFFSET, _LENGTH, _COUNT = range(7)
+
+
+class CompressedExpenseFile:
+    """Read-only view of a block-compressed expenses file."""
+
+    def __init__(self, file_path: Path):
+        self.file_path = file_path
+        self._file = open(file_path, "rb")
+        header = self._file.read(HEADER.size)
+        if len(header) == HEADER.size:
+            magic, version, codec, self.count, index_offset, index_length = (
+                HEADER.unpack(header)
+            )
+        if (
+            len(header) < HEADER.size
+            or magic != MAGIC
+            or version != VERSION
+            or codec >= len(CODECS)
+        ):
+            self._file.close()
+            raise ValueError(f"{file_path} is not a compressed expenses file")
+        self.codec = CODECS[codec]
+        self._file.seek(index_offset)
+        self._blocks = json.loads(
+            _DECOMPRESS[self.codec](self._file.read(index_length))
+        )
+        self._first_ids = [block[_FIRST_ID] for block in self._blocks]
+        self._cached_number = -1
+        self._cached: List[Dict[str, Any]] = []
+        # Blocks decompressed so far, to see what a query cost.
+        self.blocks_read = 0
+
+    def block(self, number: int) -> List[Dict[str, Any]]:
+        """Decompress the records of a block."""
+        if number != self._cached_number:
+            entry = self._blocks[number]
+            self._file.seek(entry[_OFFSET])
+            data = self._file.read(entry[_LENGTH])
+            self._cached = json.loads(_DECOMPRESS[self.codec](data))
+            self._cached_number = number
+            self.blocks_read += 1
+        return self._cached
+
+    def get(self, expense_id: int) -> Optional[Dict[str, Any]]:
+        """Find a record by id, decompressing only the block holding it."""
+        number = bisect.bisect_right(self._first_ids, expense_id) - 1
+        if number < 0 or expense_id > self._blocks[number][_LAST_ID]:
+            return None
+        records = self.block(number)
+        low, high = 0, len(records)
+        while low < high:
+            middle = (low + high) // 2
+            if records[middle]["id"] < expense_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(records) and records[low]["id"] == expense_id:
+            # A copy, since the block stays cached for the next lookup.
+            return {**records[low], "tags": list(records[low].get("tags", []))}
+        return None
+
+    def between(
+        self, start: Optional[str] = None, end: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Records timestamped within [start, end] (see in_range), in id
+        order, skipping blocks whose timestamps are all outside it."""
+        for number, entry in enumerate(self._blocks):
+            earliest, latest = entry[_EARLIEST], entry[_LATEST]
+            if (
+                earliest is None
+                or (start is not None and latest < start)
+                or (end is not None and earliest[: len(end)] > end)
+            ):
+                continue
+            for record in self.block(number):
+                if in_range(record.get("timestamp"), start, end):
+                    yield record
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for number in range(len(self._blocks)):
+            yield from self.block(number)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "CompressedExpenseFile":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def write_compressed(
+    file_path: Path,
+    records: Iterable[Any],
+    codec: str = "zlib",
+    block_records: int = BLOCK_RECORDS,
+) -> int:
+    """Atomically write expenses (objects or dicts) in blocks of
+    block_records, compressed with codec.
+
+    Records must be given in ascending id order. Returns how many were
+    written.
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec: {codec}")
+    compress = _COMPRESS[codec]
+    tmp_path = file_path.with_name(file_path.name + ".tmp")
+    records = (
+        record if isinstance(record, dict) else record.to_dict() for record in records
+    )
+    blocks = []
+    count = 0
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0, 0))
+        while True:
+            block = list(itertools.islice(records, block_records))
+            if not block:
+                break
+            data = compress(json.dumps(block, separators=(",", ":")).encode())
+            timestamps = [
+                record["timestamp"] for record in block if record.get("timestamp")
+            ]
+            blocks.append(
+                [
+                    block[0]["id"],
+                    block[-1]["id"],
+                    min(timestamps, default=None),
+                    max(timestamps, default=None),
+                    f.tell(),
+                    len(data),
+                    len(block),
+                ]
+            )
+            f.write(data)
+            count += len(block)
+        index = compress(json.dumps(blocks).encode())
+        index_offset = f.tell()
+        f.write(index)
+        f.seek(0)
+        f.write(
+            HEADER.pack(
+                MAGIC, VERSION, CODECS.index(codec), count, index_offset, len(index)
+            )
+        )
+    os.replace(tmp_path, file_path)
+    return count
+
+
+def json_to_compressed(
+    json_path: Path, compressed_path: Path, codec: str = "zlib"
+) -> int:
+    """Convert expenses.json to the compressed format."""
+    records = sorted(iter_records(json_path), key=lambda record: record["id"])
+    return write_compressed(compressed_path, records, codec)
+
+
+def compressed_to_json(compressed_path: Path, json_path: Path) -> int:
+    """Convert a compressed expenses file back to expenses.json."""
+    with CompressedExpenseFile(compressed_path) as expenses:
+        tmp_path = json_path.with_name(json_path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(list(expenses), f, indent=2)
+        os.replace(tmp_path, json_path)
+        return len(expenses)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert expenses between JSON and the compressed format."
+    )
+    parser.add_argument("command", choices=["to-compressed", "to-json"])
+    parser.add_argument("source", type=Path)
+    parser.add_argument("destination", type=Path)
+    parser.add_argument(
+        "--codec",
+        choices=CODECS,
+        default="zlib",
+        help="compression for to-compressed (default: zlib)",
+    )
+    args = parser.parse_args()
+
+    try:
+        if args.command == "to-compressed":
+            count = json_to_compressed(args.source, args.destination, args.codec)
+        else:
+            count = compressed_to_json(args.source, args.destination)
+    except (OSError, ValueError, zlib.error, lzma.LZMAError) as e:
+        print(f"Error: {e}")
+        return
+    print(f"Converted {count} expenses to {args.destination}")
+
+
+if __name__ == "__main__":
+    main()
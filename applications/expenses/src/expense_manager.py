@@ -1,117 +1,1186 @@
-from dataclasses import dataclass
-from typing import List, Optional
+import argparse
+import contextlib
+import heapq
 import json
+import math
+import os
+import sys
+import threading
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from background_save import BackgroundSaver
+from batch import open_commands, run_batch
+from binary_format import BinaryExpenseFile, write_binary
+from bulk import FORMATS, export_expenses, import_expenses
+from compressed_format import CODECS, CompressedExpenseFile, write_compressed
+from expenses_core.aggregates import ExpenseStats
+from expenses_core.analytics import REPORTS, ExpenseAnalytics
+from expenses_core.autocomplete import complete_by_scan
+from expenses_core.fuzzy_index import DEFAULT_MAX_DISTANCE, levenshtein
+from expenses_core.locking import VersionLock
+from expenses_core.partitions import (
+    MonthlyPartitions,
+    in_range,
+    normalize_timestamp,
+    now_timestamp,
+)
+from expenses_core.persistence import POLICIES, DebouncedFlusher, install_exit_hooks
+from expenses_core.sketches import ExpenseSketches
+from expenses_core.streaming import assign_ids, iter_records
+from expenses_core.symbols import SymbolTable
+from expenses_core.tag_index import matches, normalize_tags, parse_query
+from journal import ExpenseJournal
+from rendering import ExpenseRenderer
+from shards import MANIFEST, SHARD_KEYS, ShardLayout
+from sqlite_backend import SqliteBackend
+from storage import ExpenseStorage, MemoryStorage
 
 
 @dataclass
 class Expense:
     name: str
     price: float
+    id: Optional[int] = None
+    # ISO 8601 local time; None for expenses saved before timestamps.
+    timestamp: Optional[str] = None
+    # Lowercase tags such as "food" or "travel".
+    tags: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {**vars(self), "tags": list(self.tags)}
+
+
+def _records(items: Iterable[dict]) -> Iterator[tuple]:
+    """The (id, name, price, timestamp, tags) records of saved items."""
+    for item in items:
+        yield (
+            item["id"],
+            item["name"],
+            item["price"],
+            item.get("timestamp"),
+            item.get("tags", []),
+        )
 
 
 class ExpenseManager:
-    def __init__(self):
+    def __init__(
+        self,
+        journal: bool = False,
+        lazy: bool = False,
+        columnar: bool = False,
+        backend: str = "json",
+        durability: str = "always",
+        flush_interval: float = 1.0,
+        flush_every: int = 1000,
+        storage_format: str = "json",
+        shards: int = 0,
+        shard_key: str = "id",
+        compression: str = "zlib",
+        background_save: bool = False,
+        file_path: Optional[Path] = None,
+    ):
         # Get the application root directory (applications/expenses)
         self.root_dir = Path(__file__).parent.parent
-        self.file_path = self.root_dir / "expenses.json"
-        self.expenses: List[Expense] = []
-        self.load_expenses()
+        # The snapshot is either expenses.json, a memory-mapped binary file
+        # with fixed-width records (see binary_format.py) or JSON compressed
+        # in independently readable blocks (see compressed_format.py).
+        self.binary = storage_format == "binary"
+        self.compressed = storage_format == "compressed"
+        if compression not in CODECS:
+            raise ValueError(f"Unknown compression: {compression}")
+        self.compression = compression
+        default_name = {"binary": "expenses.bin", "compressed": "expenses.jsonz"}.get(
+            storage_format, "expenses.json"
+        )
+        self.file_path = file_path or self.root_dir / default_name
+        self.snapshot_view: Optional[
+            Union[BinaryExpenseFile, CompressedExpenseFile]
+        ] = None
+        # With shards the snapshot is split across several JSON files that
+        # are loaded and scanned in parallel (see shards.py). Shards touched
+        # since the last save are rewritten on the next one.
+        self.shards: Optional[ShardLayout] = None
+        self.dirty_shards: Set[int] = set()
+        # Once split, the shards are the only copy of the expenses (see
+        # _write_snapshot), so an existing layout is used even when no
+        # shards are asked for.
+        shard_dir = self.file_path.with_suffix(".shards")
+        if shards or (storage_format == "json" and (shard_dir / MANIFEST).exists()):
+            if storage_format != "json" or backend == "sqlite":
+                raise ValueError(
+                    "Shards need the json backend and storage format"
+                    if shards
+                    else f"The expenses are split into shards in {shard_dir}, "
+                    "which only the json backend reads"
+                )
+            self.shards = ShardLayout(shard_dir, shards or 1, shard_key)
+        # Columnar mode keeps prices and names in compact arrays instead of
+        # one Expense object per record.
+        self.columnar = columnar
+        # Changes waiting to be written, flushed together according to the
+        # durability policy. Held under self.lock, which also guards the
+        # expenses while a background flush writes them out.
+        self.lock = threading.RLock()
+        # The store holding the expenses and answering queries (see
+        # storage.py): a MemoryStorage once they are loaded, or the SQLite
+        # database, where expenses stay and every change is a single-row
+        # statement. Until then queries stream the snapshot file.
+        self.store: Optional[ExpenseStorage] = None
+        if backend == "sqlite":
+            self.store = SqliteBackend(
+                self.file_path.with_suffix(".db"),
+                Expense,
+                import_path=self.file_path if storage_format == "json" else None,
+            )
+        # In journal mode mutations are appended to a write-ahead journal
+        # instead of rewriting the whole file on every change.
+        self.journal = ExpenseJournal(self.file_path) if journal else None
+        # Other processes may save the same file. Saves hold an exclusive
+        # lock and check that nothing was saved since the expenses were
+        # loaded at self.version; if something was, they reload and replay
+        # self.pending on top instead of overwriting it (see locking.py).
+        self.version_lock = VersionLock(self.file_path.with_suffix(".lock"))
+        self.version: Optional[int] = None
+        self.pending: List[dict] = []
+        # With background saves the snapshot is written by a writer thread
+        # instead of the caller (see background_save.py). Its exit hook is
+        # installed before the flusher's, so it runs after them and waits
+        # for what they flush.
+        self.saver: Optional[BackgroundSaver] = None
+        if background_save and backend != "sqlite":
+            self.saver = BackgroundSaver(self._save_in_background)
+            install_exit_hooks(self._finish_saves)
+        self.flusher = DebouncedFlusher(
+            self._write_pending, self.lock, durability, flush_interval, flush_every
+        )
+        # Formats listings; set a paging renderer to page them.
+        self.renderer = ExpenseRenderer()
+        # In lazy mode expenses are streamed from disk for reads and only
+        # loaded into memory once something needs to change them. Journal
+        # entries can only be replayed in memory, so journal mode always
+        # loads eagerly.
+        self.is_loaded = False
+        if self.store is None and (not lazy or journal):
+            self.load_expenses()
+
+    @property
+    def expenses(self) -> Dict[int, Expense]:
+        """The loaded expenses keyed by their stable id, in id order."""
+        return self.store.expenses
+
+    @property
+    def names(self) -> SymbolTable:
+        """The names shared by the loaded expenses."""
+        return self.store.names
+
+    @property
+    def next_id(self) -> int:
+        return self.store.next_id
 
     def load_expenses(self) -> None:
-        """Load expenses from JSON file."""
-        if self.file_path.exists():
+        """Load expenses from JSON file, replaying the journal if enabled."""
+        self.is_loaded = True
+        version = self.version_lock.read()
+        # Reloading must not keep expenses that are no longer on disk.
+        self.store = self._new_store()
+        sharded = self._is_sharded()
+        if self.shards is not None and not sharded:
+            # Split the single file into shards on the first save.
+            self.dirty_shards = set(range(self.shards.count))
+        if sharded or self.file_path.exists():
             try:
-                with open(self.file_path, 'r') as f:
-                    data = json.load(f)
-                    self.expenses = [Expense(**item) for item in data]
+                if sharded:
+                    self.store.load(self.shards.load())
+                elif self.columnar or self.binary or self.compressed:
+                    # Stream the file so the parsed JSON never has to fit in
+                    # memory alongside the compact columns.
+                    self.store.load(_records(self._iter_snapshot()))
+                else:
+                    with open(self.file_path, "r") as f:
+                        data = json.load(f)
+                    self.store.load(_records(assign_ids(data)))
             except Exception as e:
                 print(f"Error loading expenses: {e}")
-                self.expenses = []
+                self.store = self._new_store()
+
+        if self.journal:
+            try:
+                for entry in self.journal.entries():
+                    self._replay(entry)
+            except Exception as e:
+                print(f"Error replaying journal: {e}")
+        self.version = self.version_lock.confirm(version)
+        if self.journal and self.journal.needs_compaction(len(self.expenses)):
+            self.compact()
+
+    def _is_sharded(self) -> bool:
+        """Whether the snapshot has been written as shards."""
+        return self.shards is not None and self.shards.exists()
+
+    def _mark_shard(self, expense: Expense) -> None:
+        if self.shards is not None:
+            self.dirty_shards.add(self.shards.shard_of(expense))
+
+    def _new_store(self) -> MemoryStorage:
+        """An empty in-memory store. Its secondary indexes are built the
+        first time a query needs one, then kept up to date on every change,
+        so loading only pays for the expenses themselves."""
+        store = MemoryStorage(Expense, self.columnar, self.lock)
+        store.copy_on_write = self.saver is not None
+        return store
+
+    def ensure_loaded(self) -> None:
+        """Load expenses into memory if they are still only on disk."""
+        if self.store is None:
+            if self.snapshot_view is not None:
+                self.snapshot_view.close()
+                self.snapshot_view = None
+            self.load_expenses()
+
+    def iter_expenses(self) -> Iterator[Expense]:
+        """Yield all expenses, streaming them from disk in lazy mode."""
+        if self.store is not None:
+            yield from self.store.iter_expenses()
+        elif self._is_sharded() or self.file_path.exists():
+            for item in self._iter_snapshot():
+                yield Expense(**item)
+
+    def _iter_snapshot(self) -> Iterator[dict]:
+        """Stream the records of the snapshot file."""
+        if self._is_sharded():
+            yield from self.shards.iter_records()
+        elif self.binary:
+            with BinaryExpenseFile(self.file_path) as records:
+                yield from records
+        elif self.compressed:
+            with CompressedExpenseFile(self.file_path) as records:
+                yield from records
+        else:
+            yield from iter_records(self.file_path)
+
+    def get_expense(self, expense_id: int) -> Optional[Expense]:
+        """Look up an expense by id."""
+        if self.store is None and (self.binary or self.compressed):
+            # Binary snapshots can be searched in place and compressed ones
+            # block by block, without loading.
+            if not self.file_path.exists():
+                return None
+            if self.snapshot_view is None:
+                view_type = BinaryExpenseFile if self.binary else CompressedExpenseFile
+                self.snapshot_view = view_type(self.file_path)
+            item = self.snapshot_view.get(expense_id)
+            return Expense(**item) if item else None
+        self.ensure_loaded()
+        return self.store.get(expense_id)
+
+    def count_expenses(self) -> int:
+        """Count expenses without loading them in lazy mode."""
+        return self.stats().count
+
+    def total_expenses(self) -> float:
+        """Sum the price of all expenses."""
+        return self.stats().total
+
+    def stats(self) -> ExpenseStats:
+        """Return total, count, min, max and mean of expense prices."""
+        if self.store is not None:
+            return self.store.stats()
+        if self._is_sharded():
+            return self.shards.stats()
+        # Nothing is in memory yet, so compute them in one streaming pass.
+        stats = ExpenseStats()
+        stats.add_all(self.iter_expenses())
+        return stats
+
+    def approx_stats(self) -> ExpenseSketches:
+        """Sketches of the price quantiles and the number of distinct names.
+
+        The store keeps them up to date (rebuilding them once enough
+        expenses have been removed); otherwise they are built in one pass,
+        or per shard in parallel and merged.
+        """
+        if self.store is not None:
+            return self.store.approx_stats()
+        if self._is_sharded():
+            return self.shards.sketches()
+        sketches = ExpenseSketches()
+        sketches.add_all(self.iter_expenses())
+        return sketches
+
+    def save_expenses(self) -> bool:
+        """Save expenses to JSON file, returning whether it worked.
+
+        With background saves this only asks the writer thread to save,
+        unless the calling thread already holds the file lock, as inside a
+        transaction; the writer thread reports its own failures.
+        """
+        if not self.is_loaded:
+            # Nothing has been loaded, so nothing can have changed.
+            return True
+        if self.saver is not None and not self.version_lock.held():
+            self.saver.request()
+            return True
+        with self.lock:
+            try:
+                with self.version_lock as version:
+                    if version != self.version:
+                        self._merge_changes()
+                    self._write_snapshot(self.expenses.values(), self.dirty_shards)
+                    self.dirty_shards.clear()
+                    # The snapshot already contains every pending change.
+                    self.pending.clear()
+                    if self.journal:
+                        self.journal.reset()
+                self.version = self.version_lock.version
+            except Exception as e:
+                print(f"Error saving expenses: {e}")
+                return False
+        return True
+
+    def _write_snapshot(self, expenses: Iterable, dirty_shards: Set[int]) -> None:
+        """Write the snapshot file, or the given shards of it."""
+        # Write to a temporary file first so a crash never leaves a
+        # half-written snapshot behind.
+        if self.shards is not None:
+            self.shards.save(expenses, dirty_shards)
+            if self.file_path.exists():
+                # The first save split expenses.json; keep it only as a
+                # backup, where a run without shards cannot load it.
+                os.replace(self.file_path, self.file_path.with_suffix(".json.bak"))
+        elif self.binary:
+            write_binary(
+                self.file_path, sorted(expenses, key=lambda expense: expense.id)
+            )
+        elif self.compressed:
+            write_compressed(
+                self.file_path,
+                sorted(expenses, key=lambda expense: expense.id),
+                self.compression,
+            )
+        else:
+            tmp_path = self.file_path.with_suffix(".json.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump([expense.to_dict() for expense in expenses], f, indent=2)
+            os.replace(tmp_path, self.file_path)
+
+    def _snapshot(self) -> Iterable:
+        """The expenses as they are now, unaffected by later changes.
+
+        O(n): the columns or the references to the expenses are copied.
+        """
+        if self.columnar:
+            return self.expenses.snapshot().values()
+        # Expenses are replaced rather than changed while background saves
+        # are on (see _apply_update), so copying the references is enough
+        # and the expenses themselves are not copied.
+        return list(self.expenses.values())
 
-    def save_expenses(self) -> None:
-        """Save expenses to JSON file."""
+    def _save_in_background(self) -> None:
+        """Save a snapshot of the expenses; run on the saver's thread.
+
+        The lock is only held to capture the snapshot. The file lock is
+        taken before it is released, so nothing else can be saved in
+        between, and held until the snapshot is written. Raises if the
+        save fails; the changes then stay pending.
+        """
+        dirty_shards: Set[int] = set()
         try:
-            with open(self.file_path, 'w') as f:
-                json.dump([vars(expense)
-                          for expense in self.expenses], f, indent=2)
+            with contextlib.ExitStack() as stack:
+                with self.lock:
+                    if not self.is_loaded:
+                        return
+                    version = stack.enter_context(self.version_lock)
+                    if version != self.version:
+                        self._merge_changes()
+                    expenses = self._snapshot()
+                    dirty_shards, self.dirty_shards = self.dirty_shards, set()
+                    saved = len(self.pending)
+                self._write_snapshot(expenses, dirty_shards)
+                # While this thread holds the file lock, other threads
+                # only append to pending, so the first entries are still
+                # the ones in the snapshot.
+                del self.pending[:saved]
+                if self.journal:
+                    self.journal.reset()
+        except Exception:
+            with self.lock:
+                self.dirty_shards |= dirty_shards
+            raise
+        self.version = self.version_lock.version
+
+    def take_save_error(self) -> Optional[Exception]:
+        """Why the last background save failed, if it did and has not been
+        reported yet. Its changes stay pending and are saved again by the
+        next change or flush()."""
+        return self.saver.take_error() if self.saver else None
+
+    def _finish_saves(self) -> None:
+        """At exit, save what is pending and report a failed save."""
+        self.flush()
+        error = self.take_save_error()
+        if error is not None:
+            print(f"Error saving expenses: {error}", file=sys.stderr)
+
+    def _merge_changes(self) -> None:
+        """Reload what another process saved since the expenses were loaded
+        and replay the pending changes on top of it.
+
+        Called with the version lock held. Added expenses keep their id
+        unless the other process used it meanwhile; changes to expenses it
+        deleted are dropped.
+        """
+        entries, self.pending = self.pending, []
+        self.load_expenses()
+        renumbered: Dict[int, int] = {}
+        dropped = 0
+        for entry in entries:
+            expense_id = renumbered.get(entry["id"], entry["id"])
+            if entry["op"] == "add":
+                expense = self._apply_add(
+                    entry["name"],
+                    entry["price"],
+                    expense_id if expense_id >= self.next_id else None,
+                    entry.get("timestamp"),
+                    entry.get("tags", []),
+                )
+                if expense.id != expense_id:
+                    renumbered[entry["id"]] = expense.id
+            elif entry["op"] == "update":
+                expense = self._apply_update(
+                    expense_id, entry.get("name"), entry.get("price"), entry.get("tags")
+                )
+            else:
+                expense = self._apply_delete(expense_id)
+            if expense is None:
+                dropped += 1
+            else:
+                self.pending.append({**entry, "id": expense.id})
+        if entries:
+            print("Merged changes saved by another process")
+        for old_id, new_id in renumbered.items():
+            print(f"Expense #{old_id} was saved as #{new_id}")
+        if dropped:
+            print(f"Dropped {dropped} change(s) to expenses deleted by another process")
+
+    def compact(self) -> bool:
+        """Fold the journal back into the snapshot file."""
+        return self.save_expenses()
+
+    def _persist(self, op: str, **fields) -> None:
+        """Persist a single mutation."""
+        self._persist_batch([{"op": op, **fields}])
+
+    def _persist_batch(self, entries: List[dict]) -> None:
+        """Queue a batch of mutations to be persisted."""
+        if self.store.durable:
+            # The store has already saved the change.
+            return
+        with self.lock:
+            self.pending.extend(entries)
+            self.flusher.mark_dirty(len(entries))
+
+    def flush(self) -> None:
+        """Persist every pending change now. With background saves, wait
+        until they are written, saving again what a failed save left."""
+        self.flusher.flush()
+        if self.saver is not None:
+            self.saver.wait()
+            if self.pending or self.dirty_shards:
+                self.save_expenses()
+                self.saver.wait()
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Make the changes inside the block one unit, persisted once when
+        it ends whatever the durability policy, or rolled back if it raises.
+
+        The file stays locked against other writers until then, so the
+        changes are made against what was last saved and never need
+        merging.
+        """
+        if self.store is not None and self.store.durable:
+            with self.store.transaction():
+                yield
+            return
+        with self.lock:
+            self.flusher.flush()
+            try:
+                with self.version_lock as version:
+                    if self.is_loaded and version != self.version:
+                        self._merge_changes()
+                    try:
+                        with self.flusher.hold():
+                            yield
+                    except BaseException:
+                        self.pending.clear()
+                        self.flusher.discard()
+                        if self.is_loaded:
+                            self.load_expenses()
+                        raise
+            finally:
+                self.version = self.version_lock.version
+
+    def _write_pending(self) -> bool:
+        """Write the pending changes to the journal or the snapshot,
+        returning whether they were written."""
+        if not self.pending:
+            return True
+        if not self.journal:
+            return self.save_expenses()
+
+        try:
+            with self.version_lock as version:
+                if version != self.version:
+                    self._merge_changes()
+                self.journal.append_many(self.pending)
+                self.pending.clear()
+            self.version = self.version_lock.version
         except Exception as e:
-            print(f"Error saving expenses: {e}")
-
-    def add_expense(self, name: str, price: float) -> None:
-        """Add a new expense."""
-        expense = Expense(name=name, price=price)
-        self.expenses.append(expense)
-        self.save_expenses()
-        print(f"Added expense: {name} - ${price:.2f}")
-
-    def update_expense(self, index: int, name: Optional[str] = None, price: Optional[float] = None) -> None:
-        """Update an existing expense."""
-        # Convert 1-based index to 0-based index
-        index = index - 1
-        if 0 <= index < len(self.expenses):
-            expense = self.expenses[index]
-            if name is not None:
-                expense.name = name
-            if price is not None:
-                expense.price = price
-            self.save_expenses()
-            print(f"Updated expense: {expense.name} - ${expense.price:.2f}")
-        else:
-            print("Invalid index!")
-
-    def delete_expense(self, index: int) -> None:
-        """Delete an expense by index."""
-        # Convert 1-based index to 0-based index
-        index = index - 1
-        if 0 <= index < len(self.expenses):
-            expense = self.expenses.pop(index)
-            self.save_expenses()
-            print(f"Deleted expense: {expense.name} - ${expense.price:.2f}")
+            print(f"Error writing journal: {e}")
+            return False
+        if self.journal.needs_compaction(len(self.expenses)):
+            self.compact()
+        return True
+
+    def _replay(self, entry: dict) -> None:
+        """Apply a journal entry to the in-memory expenses."""
+        op = entry["op"]
+        if "id" in entry:
+            expense_id = entry["id"]
+        elif op != "add":
+            # Journals written before expenses had ids address by position.
+            expense_id = list(self.expenses)[entry["index"]]
+        if op == "add":
+            self._apply_add(
+                entry["name"],
+                entry["price"],
+                entry.get("id"),
+                entry.get("timestamp"),
+                entry.get("tags", []),
+            )
+        elif op == "update":
+            self._apply_update(
+                expense_id, entry.get("name"), entry.get("price"), entry.get("tags")
+            )
+        elif op == "delete":
+            self._apply_delete(expense_id)
+
+    def _apply_add(
+        self,
+        name: str,
+        price: float,
+        expense_id: Optional[int] = None,
+        timestamp: Optional[str] = None,
+        tags: Iterable[str] = (),
+    ) -> Expense:
+        expense = self.store.add(name, price, expense_id, timestamp, tags)
+        self._mark_shard(expense)
+        return expense
+
+    def _apply_update(
+        self,
+        expense_id: int,
+        name: Optional[str],
+        price: Optional[float],
+        tags: Optional[List[str]] = None,
+    ) -> Optional[Expense]:
+        expense = self.store.update(expense_id, name, price, tags)
+        if expense is not None:
+            self._mark_shard(expense)
+        return expense
+
+    def _apply_delete(self, expense_id: int) -> Optional[Expense]:
+        expense = self.store.delete(expense_id)
+        if expense is not None:
+            self._mark_shard(expense)
+        return expense
+
+    def add_expense(
+        self,
+        name: str,
+        price: float,
+        timestamp: Optional[str] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> Expense:
+        """Add a new expense, timestamped now unless a time is given.
+
+        Raises ValueError for an invalid tag.
+        """
+        tags = normalize_tags(tags)
+        self.ensure_loaded()
+        timestamp = timestamp or now_timestamp()
+        with self.lock:
+            expense = self._apply_add(name, price, timestamp=timestamp, tags=tags)
+            self._persist(
+                "add",
+                id=expense.id,
+                name=name,
+                price=price,
+                timestamp=timestamp,
+                tags=tags,
+            )
+        print(f"Added expense #{expense.id}: {name} - ${price:.2f}")
+        return expense
+
+    def add_expenses(
+        self, items: Iterable[Tuple[str, float, Optional[str], List[str]]]
+    ) -> int:
+        """Add many (name, price, timestamp, tags) expenses and persist them
+        once."""
+        self.ensure_loaded()
+        items = list(items)
+        with self.lock:
+            added = self.store.add_many(items)
+            entries = []
+            for expense, (name, price, timestamp, tags) in zip(added, items):
+                self._mark_shard(expense)
+                entries.append(
+                    {
+                        "op": "add",
+                        "id": expense.id,
+                        "name": name,
+                        "price": price,
+                        "timestamp": timestamp,
+                        "tags": tags,
+                    }
+                )
+            self._persist_batch(entries)
+        return len(items)
+
+    def update_expense(
+        self,
+        expense_id: int,
+        name: Optional[str] = None,
+        price: Optional[float] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> Optional[Expense]:
+        """Update an existing expense by id. Given tags replace the old ones.
+
+        Returns the updated expense, or None if there is no such id.
+        """
+        if tags is not None:
+            tags = normalize_tags(tags)
+        self.ensure_loaded()
+        with self.lock:
+            expense = self._apply_update(expense_id, name, price, tags)
+            if expense is not None:
+                self._persist(
+                    "update", id=expense_id, name=name, price=price, tags=tags
+                )
+        if expense is None:
+            print("Invalid ID!")
+            return None
+        print(f"Updated expense #{expense_id}: {expense.name} - ${expense.price:.2f}")
+        return expense
+
+    def delete_expense(self, expense_id: int) -> Optional[Expense]:
+        """Delete an expense by id, returning it, or None if there is no
+        such id."""
+        self.ensure_loaded()
+        with self.lock:
+            expense = self._apply_delete(expense_id)
+            if expense is not None:
+                self._persist("delete", id=expense_id)
+        if expense is None:
+            print("Invalid ID!")
+            return None
+        print(f"Deleted expense #{expense_id}: {expense.name} - ${expense.price:.2f}")
+        return expense
+
+    def autocomplete(self, prefix: str, k: int = 5) -> List[Tuple[str, int]]:
+        """Return up to k (name, count) pairs of existing names starting
+        with prefix, most frequent first."""
+        if self.store is not None:
+            return self.store.complete(prefix, k)
+        return complete_by_scan(self.iter_expenses(), prefix, k)
+
+    def expenses_between(
+        self, start: Optional[str] = None, end: Optional[str] = None
+    ) -> List[Expense]:
+        """Return expenses timestamped within [start, end], oldest first.
+
+        Bounds are ISO dates, months or timestamps; `end` is inclusive, so
+        end="2026-10" includes all of October.
+        """
+        if self.store is not None:
+            return self.store.between(start, end)
+        if self.compressed and self.file_path.exists():
+            # Only blocks whose timestamps overlap the range are read.
+            with CompressedExpenseFile(self.file_path) as records:
+                matching = [Expense(**item) for item in records.between(start, end)]
         else:
-            print("Invalid index!")
+            matching = [
+                expense
+                for expense in self.iter_expenses()
+                if in_range(expense.timestamp, start, end)
+            ]
+        matching.sort(key=lambda expense: (expense.timestamp, expense.id))
+        return matching
 
-    def list_expenses(self) -> None:
-        """List all expenses with total."""
-        if not self.expenses:
-            print("No expenses found!")
+    def monthly_stats(
+        self, start: Optional[str] = None, end: Optional[str] = None
+    ) -> List[Tuple[str, ExpenseStats]]:
+        """Return (month, statistics) for each month from start to end,
+        read from the per-month summaries."""
+        if self.store is not None:
+            return self.store.monthly_stats(start, end)
+        partitions = MonthlyPartitions()
+        partitions.add_all(self.iter_expenses())
+        return partitions.summaries(start, end)
+
+    def print_monthly_report(
+        self, start: Optional[str] = None, end: Optional[str] = None
+    ) -> None:
+        """Print count and total for each month from start to end."""
+        try:
+            months = self.monthly_stats(start, end)
+        except Exception as e:
+            print(f"Error loading expenses: {e}")
+            return
+        if not months:
+            print("No dated expenses found!")
             return
 
-        print("\nExpense List:")
+        print("\nMonthly Report:")
         print("-" * 40)
-        for i, expense in enumerate(self.expenses, start=1):
-            print(f"{i}. {expense.name} - ${expense.price:.2f}")
-
-        total = sum(expense.price for expense in self.expenses)
+        total = 0.0
+        for month, stats in months:
+            print(f"{month}: {stats.count} expenses, ${stats.total:.2f}")
+            total += stats.total
         print("-" * 40)
         print(f"Total: ${total:.2f}")
 
+    def report(self, name: str, **options) -> Any:
+        """Run an analytics report (see analytics.py) by name.
+
+        Raises ValueError for an unknown report or option and RuntimeError
+        when NumPy is not installed.
+        """
+        if self.store is not None:
+            return self.store.report(name, **options)
+        if name not in REPORTS:
+            raise ValueError(f"Unknown report: {name}")
+        # Nothing tells a one-off projection about changes.
+        return getattr(ExpenseAnalytics(self.iter_expenses), name)(**options)
+
+    def print_report(self, name: str, **options) -> None:
+        """Print an analytics report."""
+        try:
+            result = self.report(name, **options)
+        except (RuntimeError, ValueError) as e:
+            print(f"Error: {e}")
+            return
+        except Exception as e:
+            print(f"Error loading expenses: {e}")
+            return
+        if not result or (name == "outliers" and result["low"] is None):
+            print("No expenses found!")
+            return
+
+        print(f"\n{name.replace('_', ' ').capitalize()}:")
+        print("-" * 40)
+        if name == "histogram":
+            largest = max(row["count"] for row in result)
+            for row in result:
+                bar = "#" * round(30 * row["count"] / largest) if largest else ""
+                print(f"${row['low']:.2f} - ${row['high']:.2f}: {row['count']} {bar}")
+        elif name == "totals_by_name":
+            for row in result:
+                print(f"{row['name']}: {row['count']} expenses, ${row['total']:.2f}")
+        elif name == "moving_average":
+            window = options.get("window", 7)
+            for row in result:
+                print(
+                    f"{row['date']}: ${row['total']:.2f} "
+                    f"({window}-day average ${row['average']:.2f})"
+                )
+        else:
+            print(f"Usual range: ${result['low']:.2f} - ${result['high']:.2f}")
+            for row in result["expenses"]:
+                print(f"{row['id']}. {row['name']} - ${row['price']:.2f}")
+            if not result["expenses"]:
+                print("No outliers.")
+
+    def expenses_with_tags(self, query: str) -> List[Expense]:
+        """Return expenses matching a tag query such as "food AND NOT
+        travel", in id order. Raises ValueError for a malformed query."""
+        if self.store is not None:
+            return self.store.search_tags(query)
+        parsed = parse_query(query)
+        return [
+            expense
+            for expense in self.iter_expenses()
+            if matches(parsed, set(expense.tags))
+        ]
+
+    def expenses_by_price(
+        self, min_price: Optional[float] = None, max_price: Optional[float] = None
+    ) -> List[Expense]:
+        """Return expenses priced within [min_price, max_price], cheapest first."""
+        if self.store is not None:
+            return self.store.price_range(min_price, max_price)
+        return sorted(
+            self._iter_price_range(min_price, max_price),
+            key=lambda expense: (expense.price, expense.id),
+        )
+
+    def top_expenses(
+        self,
+        n: int,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> List[Expense]:
+        """Return the n most expensive expenses, optionally within a range."""
+        if self.store is not None:
+            return self.store.price_range(min_price, max_price, top=n)
+        return heapq.nlargest(
+            n,
+            self._iter_price_range(min_price, max_price),
+            key=lambda expense: (expense.price, expense.id),
+        )
+
+    def _iter_price_range(
+        self, min_price: Optional[float], max_price: Optional[float]
+    ) -> Iterator[Expense]:
+        """Stream expenses within a price range when nothing is loaded."""
+        for expense in self.iter_expenses():
+            if (min_price is None or expense.price >= min_price) and (
+                max_price is None or expense.price <= max_price
+            ):
+                yield expense
+
+    def list_expenses(self) -> None:
+        """List all expenses with total."""
+        self._print_expenses(
+            self.iter_expenses(), "\nExpense List:", "No expenses found!"
+        )
+
+    def expenses_matching(self, query: str) -> Iterator[Expense]:
+        """Expenses whose name contains query, ignoring case."""
+        query = query.lower()
+        if self.store is not None:
+            return self.store.search(query)
+        if self._is_sharded():
+            return (Expense(**item) for item in self.shards.search(query))
+        return (
+            expense for expense in self.iter_expenses() if query in expense.name.lower()
+        )
+
     def search_expenses(self, query: str) -> None:
         """Search expenses by name."""
+        self._print_expenses(
+            self.expenses_matching(query),
+            f"\nExpenses matching '{query.lower()}':",
+            f"No expenses found matching '{query.lower()}'",
+        )
+
+    def fuzzy_search_expenses(
+        self, query: str, max_distance: int = DEFAULT_MAX_DISTANCE
+    ) -> None:
+        """Search expenses by name, allowing up to max_distance typos."""
+        self._print_expenses(
+            iter(self.expenses_similar_to(query, max_distance)),
+            f"\nExpenses similar to '{query.lower()}':",
+            f"No expenses found similar to '{query.lower()}'",
+        )
+
+    def expenses_similar_to(
+        self, query: str, max_distance: int = DEFAULT_MAX_DISTANCE
+    ) -> List[Expense]:
+        """Expenses whose name is within max_distance edits of query,
+        closest first."""
         query = query.lower()
-        matching_expenses = [
-            expense for expense in self.expenses
-            if query in expense.name.lower()
-        ]
+        if self.store is not None:
+            return self.store.similar(query, max_distance)
+        # Without an index, compare each distinct name once.
+        distances: Dict[str, int] = {}
+        ranked = []
+        for expense in self.iter_expenses():
+            name = expense.name.lower()
+            if name not in distances:
+                distances[name] = levenshtein(query, name)
+            if distances[name] <= max_distance:
+                ranked.append(((distances[name], name, expense.id), expense))
+        ranked.sort(key=lambda item: item[0])
+        return [expense for _, expense in ranked]
 
-        if not matching_expenses:
-            print(f"No expenses found matching '{query}'")
+    def filter_by_tags(self, query: str) -> None:
+        """List expenses matching a tag query."""
+        try:
+            matching_expenses = self.expenses_with_tags(query)
+        except ValueError as e:
+            print(f"Invalid tag query: {e}")
             return
+        self._print_expenses(
+            iter(matching_expenses),
+            f"\nExpenses tagged '{query}':",
+            f"No expenses found tagged '{query}'",
+        )
 
-        print(f"\nExpenses matching '{query}':")
-        print("-" * 40)
-        for i, expense in enumerate(matching_expenses, start=1):
-            print(f"{i}. {expense.name} - ${expense.price:.2f}")
+    def print_stats(self) -> None:
+        """Print summary statistics for all expenses."""
+        try:
+            stats = self.stats()
+        except Exception as e:
+            print(f"Error loading expenses: {e}")
+            return
+        if not stats.count:
+            print("No expenses found!")
+            return
 
-        total = sum(expense.price for expense in matching_expenses)
+        print("\nExpense Statistics:")
         print("-" * 40)
-        print(f"Total: ${total:.2f}")
+        print(f"Count: {stats.count}")
+        print(f"Total: ${stats.total:.2f}")
+        print(f"Mean: ${stats.mean:.2f}")
+        print(f"Min: ${stats.minimum:.2f}")
+        print(f"Max: ${stats.maximum:.2f}")
+        sketches = self.approx_stats()
+        median, p90, p99 = sketches.quantiles((0.5, 0.9, 0.99))
+        print(f"Median (approx.): ${median:.2f}")
+        print(f"90th/99th percentile (approx.): ${p90:.2f} / ${p99:.2f}")
+        print(f"Distinct names (approx.): {sketches.distinct_names()}")
+        if self.is_loaded:
+            names = self.names.to_dict()
+            print(
+                f"Name table: {names['distinct']} names, "
+                f"{names['bytes_used'] / 1024:.1f} KiB "
+                f"({names['bytes_saved'] / 1024:.1f} KiB saved by sharing)"
+            )
+
+    def _print_expenses(
+        self, expenses: Iterator[Expense], title: str, empty_message: str
+    ) -> None:
+        """Print expenses with a running total as they are produced."""
+        self.renderer.render(expenses, title, empty_message)
+
+
+def run_bulk(manager: ExpenseManager, args) -> None:
+    """Run a non-interactive import or export."""
+    try:
+        if args.import_path:
+            imported, rejected = import_expenses(manager, args.import_path, args.format)
+            if manager.journal:
+                manager.compact()
+            manager.flush()
+            error = manager.take_save_error()
+            if error is not None:
+                raise OSError(f"could not save the imported expenses: {error}")
+            print(f"Imported {imported} expenses ({rejected} skipped)")
+        if args.export_path:
+            count = export_expenses(manager, args.export_path, args.format)
+            print(f"Exported {count} expenses to {args.export_path}")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Manage personal expenses.")
+    parser.add_argument(
+        "--journal",
+        action="store_true",
+        help="append changes to a journal instead of "
+        "rewriting expenses.json on every change",
+    )
+    parser.add_argument(
+        "--lazy",
+        action="store_true",
+        help="stream expenses.json for listing and searching "
+        "instead of loading it all at startup",
+    )
+    parser.add_argument(
+        "--columnar",
+        action="store_true",
+        help="keep expenses in compact column arrays to reduce memory use",
+    )
+    parser.add_argument(
+        "--import",
+        dest="import_path",
+        type=Path,
+        metavar="FILE",
+        help="import expenses from a CSV or NDJSON file and exit",
+    )
+    parser.add_argument(
+        "--export",
+        dest="export_path",
+        type=Path,
+        metavar="FILE",
+        help="export all expenses to a CSV or NDJSON file and exit",
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="run the JSON commands in FILE (- for stdin) "
+        "as one transaction, print a JSON result for "
+        "each and exit",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        help="import/export file format (default: from the file extension)",
+    )
+    parser.add_argument(
+        "--durability",
+        choices=POLICIES,
+        default="always",
+        help="when changes are written: after every change "
+        "(always), in batches (interval) or only on "
+        "exit (default: always)",
+    )
+    parser.add_argument(
+        "--flush-interval",
+        type=float,
+        default=1.0,
+        metavar="SECONDS",
+        help="with --durability interval, the longest a "
+        "change waits before being written",
+    )
+    parser.add_argument(
+        "--flush-every",
+        type=int,
+        default=1000,
+        metavar="N",
+        help="with --durability interval, write as soon as N changes are pending",
+    )
+    parser.add_argument(
+        "--storage-format",
+        choices=["json", "binary", "compressed"],
+        default="json",
+        help="snapshot file format: expenses.json, the "
+        "memory-mapped expenses.bin or the "
+        "block-compressed expenses.jsonz (default: json)",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=CODECS,
+        default="zlib",
+        help="with --storage-format compressed, how new "
+        "snapshots are compressed (default: zlib)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["json", "sqlite"],
+        default="json",
+        help="where expenses are stored (default: json)",
+    )
+    parser.add_argument(
+        "--background-save",
+        action="store_true",
+        help="write the snapshot on a background thread "
+        "instead of waiting for each save",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=0,
+        metavar="N",
+        help="split expenses.json into N shard files that "
+        "are loaded and scanned in parallel",
+    )
+    parser.add_argument(
+        "--shard-key",
+        choices=SHARD_KEYS,
+        default="id",
+        help="with --shards, split expenses by id or by month (default: id)",
+    )
+    parser.add_argument(
+        "--page",
+        type=int,
+        metavar="N",
+        help="show only page N of listings and searches",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        metavar="N",
+        help="rows per page (default: 50 with --page); "
+        "on a terminal without --page, pause after "
+        "each page",
+    )
+    args = parser.parse_args()
+    if args.page is not None and args.page < 1:
+        parser.error("--page must be at least 1")
+    if args.page_size is not None and args.page_size < 1:
+        parser.error("--page-size must be at least 1")
+    if args.shards < 0:
+        parser.error("--shards must not be negative")
+    if args.shards and (args.backend == "sqlite" or args.storage_format != "json"):
+        parser.error("--shards needs the json backend and storage format")
+    return args
+
+
+def parse_price(text: str) -> float:
+    """A price typed at the prompt; NaN and infinity are not prices."""
+    price = float(text)
+    if not math.isfinite(price):
+        raise ValueError(f"invalid price {text!r}")
+    return price
+
+
+def prompt_name(manager: ExpenseManager) -> str:
+    """Ask for an expense name, offering completions for a trailing '*'."""
+    name = input("Enter expense name (end with * for suggestions): ")
+    if not name.endswith("*"):
+        return name
+
+    suggestions = manager.autocomplete(name[:-1])
+    if not suggestions:
+        print("No suggestions.")
+        return input("Enter expense name: ")
+    for number, (suggestion, count) in enumerate(suggestions, start=1):
+        print(f"{number}. {suggestion} ({count})")
+    choice = input("Pick a number or enter a name: ").strip()
+    if choice.isdigit() and 1 <= int(choice) <= len(suggestions):
+        return suggestions[int(choice) - 1][0]
+    return choice
 
 
 def main():
-    manager = ExpenseManager()
+    args = parse_args()
+    try:
+        manager = ExpenseManager(
+            journal=args.journal,
+            lazy=args.lazy,
+            columnar=args.columnar,
+            backend=args.backend,
+            durability=args.durability,
+            flush_interval=args.flush_interval,
+            flush_every=args.flush_every,
+            storage_format=args.storage_format,
+            compression=args.compression,
+            shards=args.shards,
+            shard_key=args.shard_key,
+            background_save=args.background_save,
+        )
+    except ValueError as e:
+        # Such as a sharded snapshot opened with another backend.
+        print(f"Error: {e}")
+        sys.exit(1)
+    manager.renderer = ExpenseRenderer(page_size=args.page_size, page=args.page)
+
+    if args.import_path or args.export_path:
+        run_bulk(manager, args)
+        return
+    if args.batch:
+        try:
+            with open_commands(args.batch) as lines:
+                committed = run_batch(manager, lines, sys.stdout)
+        except OSError as e:
+            print(f"Error: {e}")
+            committed = False
+        sys.exit(0 if committed else 1)
 
     while True:
+        error = manager.take_save_error()
+        if error is not None:
+            print(f"\nError saving expenses: {error}")
+            print(
+                "Your changes are kept and will be saved again with the "
+                "next change or on exit."
+            )
+
         print("\nExpense Manager")
         print("=" * 40)
         print("1. Add Expense")
@@ -119,51 +1188,101 @@ def main():
         print("3. Delete Expense")
         print("4. List Expenses")
         print("5. Search Expenses")
-        print("6. Exit")
+        print("6. Show Statistics")
+        print("7. Monthly Report")
+        print("8. Filter by Tags")
+        print("9. Analytics")
+        print("10. Exit")
 
-        choice = input("\nEnter your choice (1-6): ")
+        choice = input("\nEnter your choice (1-10): ")
 
         if choice == "1":
-            name = input("Enter expense name: ")
+            name = prompt_name(manager)
             try:
-                price = float(input("Enter price: $"))
-                manager.add_expense(name, price)
+                price = parse_price(input("Enter price: $"))
             except ValueError:
                 print("Invalid price! Please enter a number.")
+                continue
+            date = input("Enter date (YYYY-MM-DD, press Enter for now): ").strip()
+            try:
+                timestamp = normalize_timestamp(date) if date else None
+            except ValueError:
+                print("Invalid date!")
+                continue
+            tags = input("Enter tags (comma separated, optional): ")
+            try:
+                manager.add_expense(name, price, timestamp, tags)
+            except ValueError as e:
+                print(f"Invalid tags: {e}")
 
         elif choice == "2":
             manager.list_expenses()
             try:
-                index = int(
-                    input("\nEnter index to update (1-{}): ".format(len(manager.expenses))))
+                expense_id = int(input("\nEnter ID to update: "))
                 name = input("Enter new name (press Enter to skip): ").strip()
-                price_str = input(
-                    "Enter new price (press Enter to skip): ").strip()
+                price_str = input("Enter new price (press Enter to skip): ").strip()
 
-                price = float(price_str) if price_str else None
+                tags = input(
+                    "Enter new tags, comma separated (press Enter to skip): "
+                ).strip()
+
+                price = parse_price(price_str) if price_str else None
                 name = name if name else None
 
-                manager.update_expense(index, name, price)
+                manager.update_expense(expense_id, name, price, tags or None)
             except ValueError:
                 print("Invalid input!")
 
         elif choice == "3":
             manager.list_expenses()
             try:
-                index = int(
-                    input("\nEnter index to delete (1-{}): ".format(len(manager.expenses))))
-                manager.delete_expense(index)
+                expense_id = int(input("\nEnter ID to delete: "))
+                manager.delete_expense(expense_id)
             except ValueError:
-                print("Invalid index!")
+                print("Invalid ID!")
 
         elif choice == "4":
             manager.list_expenses()
 
         elif choice == "5":
             query = input("Enter search term: ")
-            manager.search_expenses(query)
+            fuzzy = input("Allow typos? (y/N): ").strip().lower() == "y"
+            if fuzzy:
+                manager.fuzzy_search_expenses(query)
+            else:
+                manager.search_expenses(query)
 
         elif choice == "6":
+            manager.print_stats()
+
+        elif choice == "7":
+            start = input("From month (YYYY-MM, press Enter for all): ").strip()
+            end = input("To month (YYYY-MM, press Enter for all): ").strip()
+            manager.print_monthly_report(start or None, end or None)
+
+        elif choice == "8":
+            query = input("Enter tag query (e.g. food AND NOT travel): ")
+            manager.filter_by_tags(query)
+
+        elif choice == "9":
+            print(
+                "1. Price histogram  2. Totals by name  "
+                "3. Daily moving average  4. Outliers"
+            )
+            report = input("Pick a report: ").strip()
+            if report in ("1", "2", "3", "4"):
+                manager.print_report(REPORTS[int(report) - 1])
+            else:
+                print("Invalid report!")
+
+        elif choice == "10":
+            if manager.journal:
+                manager.compact()
+            manager.flush()
+            error = manager.take_save_error()
+            if error is not None:
+                print(f"Error saving expenses: {error}")
+                print("Your latest changes could not be saved.")
             print("Goodbye!")
             break
 
@@ -0,0 +1,10 @@
+"""
+Indexes, statistics, locking and persistence shared by the expense CLI and
+the expenses API.
+
+Both applications keep expenses in memory with the same secondary indexes
+and save them to the same kind of file, so these modules are written once
+here. The package is installed with the project (see pyproject.toml). From
+a checkout, the CLI imports it from its own src directory and the API
+imports it from there by location (see expenses_api/src/__init__.py).
+"""
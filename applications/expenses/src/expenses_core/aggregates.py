@@ -0,0 +1,138 @@
+"""
+Running aggregates over expense prices.
+
+The total, count, minimum, maximum and mean are updated as expenses are
+added, changed and removed, so reading them never needs a pass over the
+whole expense list.
+
+Prices that are not finite (NaN or infinite, which only files written
+before such prices were rejected can hold) are left out, so a single one
+cannot turn the total and mean into NaN for good.
+"""
+
+import heapq
+import math
+from collections import Counter
+from typing import Iterable, List, Optional
+
+
+class ExpenseStats:
+    """Incrementally maintained price statistics."""
+
+    def __init__(self):
+        self.count = 0
+        self._total = 0.0
+        # Compensation term for the running total (Neumaier summation), so
+        # long sequences of adds and removes do not drift.
+        self._compensation = 0.0
+        # How many expenses have each price. The minimum and maximum only
+        # change when the last expense at that price goes away.
+        self._prices: Counter = Counter()
+        # Every price, and every price negated, as heaps. Prices that are
+        # gone stay in them until they reach the top, where they are popped
+        # (lazy deletion), so removing the minimum or maximum costs
+        # O(log n) amortized instead of a scan of every price.
+        self._low: List[float] = []
+        self._high: List[float] = []
+        self._min: Optional[float] = None
+        self._max: Optional[float] = None
+
+    @classmethod
+    def from_summary(
+        cls,
+        count: int,
+        total: float,
+        minimum: Optional[float],
+        maximum: Optional[float],
+    ) -> "ExpenseStats":
+        """Build read-only statistics from values computed elsewhere."""
+        stats = cls()
+        stats.count = count
+        stats._total = total
+        stats._min = minimum
+        stats._max = maximum
+        return stats
+
+    def _accumulate(self, value: float) -> None:
+        total = self._total + value
+        if abs(self._total) >= abs(value):
+            self._compensation += (self._total - total) + value
+        else:
+            self._compensation += (value - total) + self._total
+        self._total = total
+
+    def add(self, expense) -> None:
+        price = expense.price
+        if not math.isfinite(price):
+            return
+        self.count += 1
+        self._accumulate(price)
+        self._prices[price] += 1
+        if self._prices[price] == 1:
+            heapq.heappush(self._low, price)
+            heapq.heappush(self._high, -price)
+        if self._min is None or price < self._min:
+            self._min = price
+        if self._max is None or price > self._max:
+            self._max = price
+
+    def remove(self, expense) -> None:
+        price = expense.price
+        if not math.isfinite(price):
+            return
+        self.count -= 1
+        self._accumulate(-price)
+        self._prices[price] -= 1
+        if self._prices[price] > 0:
+            return
+
+        del self._prices[price]
+        if not self._prices:
+            self._min = self._max = None
+            self._total = self._compensation = 0.0
+            self._low.clear()
+            self._high.clear()
+            return
+        if price == self._min:
+            while self._low[0] not in self._prices:
+                heapq.heappop(self._low)
+            self._min = self._low[0]
+        elif price == self._max:
+            while -self._high[0] not in self._prices:
+                heapq.heappop(self._high)
+            self._max = -self._high[0]
+        if len(self._low) > 2 * len(self._prices) + 64:
+            # Too many gone prices buried below the top: rebuild the heaps.
+            self._low = list(self._prices)
+            self._high = [-price for price in self._low]
+            heapq.heapify(self._low)
+            heapq.heapify(self._high)
+
+    def add_all(self, expenses: Iterable) -> None:
+        for expense in expenses:
+            self.add(expense)
+
+    @property
+    def total(self) -> float:
+        return self._total + self._compensation
+
+    @property
+    def minimum(self) -> Optional[float]:
+        return self._min
+
+    @property
+    def maximum(self) -> Optional[float]:
+        return self._max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "min": self.minimum,
+            "max": self.maximum,
+            "mean": self.mean,
+        }
@@ -0,0 +1,180 @@
+"""
+Vectorized analytics over expenses.
+
+The expenses are projected once into NumPy arrays (ids, prices, timestamps
+and codes into a table of distinct names) and every report - price
+histogram, totals by name, daily moving average and outliers - runs as
+array operations on that projection instead of a Python loop over the
+expenses.
+
+ExpenseAnalytics caches the projection and sits with the other indexes, so
+any change to the expenses drops it and the next report projects again.
+Columnar stores are projected straight from their column arrays.
+
+NumPy is optional: without it the rest of the application works and the
+reports raise RuntimeError.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Report names, which are also the ExpenseAnalytics methods producing them.
+REPORTS = ("histogram", "totals_by_name", "moving_average", "outliers")
+
+
+class _Projection:
+    """Column arrays of the expenses, one row per expense."""
+
+    def __init__(self, ids, prices, timestamps, codes, names: List[str]):
+        self.ids = ids
+        self.prices = prices
+        # datetime64[s]; NaT for expenses without a timestamp.
+        self.timestamps = timestamps
+        # Index of each expense's name in names.
+        self.codes = codes
+        self.names = names
+
+
+def _project(expenses) -> _Projection:
+    if np is None:
+        raise RuntimeError("Analytics need NumPy; install it with 'pip install numpy'")
+    columns = getattr(expenses, "columns", None)
+    if columns is not None:
+        ids, prices, timestamps, name_refs, names, live = columns()
+        ids = np.frombuffer(ids, dtype=np.int64)
+        # Deleted rows are tombstones with 0 in live.
+        live = np.frombuffer(live, dtype=np.bool_)
+        # Missing timestamps are stored as the smallest int64, which is NaT.
+        return _Projection(
+            ids[live],
+            np.frombuffer(prices, dtype=np.float64)[live],
+            np.frombuffer(timestamps, dtype=np.int64)[live].view("datetime64[s]"),
+            np.frombuffer(name_refs, dtype=np.uint32)[live].astype(np.intp),
+            list(names),
+        )
+
+    ids: List[int] = []
+    prices: List[float] = []
+    timestamps: List[Optional[str]] = []
+    codes: List[int] = []
+    name_codes: Dict[str, int] = {}
+    for expense in expenses:
+        ids.append(expense.id)
+        prices.append(expense.price)
+        timestamps.append(expense.timestamp)
+        codes.append(name_codes.setdefault(expense.name, len(name_codes)))
+    return _Projection(
+        np.array(ids, dtype=np.int64),
+        np.array(prices, dtype=np.float64),
+        np.array(timestamps, dtype="datetime64[s]"),
+        np.array(codes, dtype=np.intp),
+        list(name_codes),
+    )
+
+
+class ExpenseAnalytics:
+    """Reports over a cached NumPy projection of the expenses."""
+
+    def __init__(self, source: Callable[[], Iterable]):
+        # Returns the expenses to project: an iterable of expenses or a
+        # columnar store.
+        self._source = source
+        self._projection: Optional[_Projection] = None
+
+    def add(self, expense) -> None:
+        self._projection = None
+
+    def remove(self, expense) -> None:
+        self._projection = None
+
+    def add_all(self, expenses: Iterable) -> None:
+        self._projection = None
+
+    def _data(self) -> _Projection:
+        if self._projection is None:
+            self._projection = _project(self._source())
+        return self._projection
+
+    def histogram(self, bins: int = 10) -> List[Dict[str, Any]]:
+        """Number of expenses in each of `bins` equal price ranges."""
+        if bins < 1:
+            raise ValueError("bins must be at least 1")
+        data = self._data()
+        if not len(data.prices):
+            return []
+        counts, edges = np.histogram(data.prices, bins=bins)
+        return [
+            {"low": float(low), "high": float(high), "count": int(count)}
+            for low, high, count in zip(edges[:-1], edges[1:], counts)
+        ]
+
+    def totals_by_name(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Count and total per name, largest total first."""
+        if limit is not None and limit < 1:
+            raise ValueError("limit must be at least 1")
+        data = self._data()
+        totals = np.bincount(data.codes, weights=data.prices, minlength=len(data.names))
+        counts = np.bincount(data.codes, minlength=len(data.names))
+        order = np.argsort(-totals, kind="stable")
+        order = order[counts[order] > 0][:limit]
+        return [
+            {
+                "name": data.names[code],
+                "count": int(counts[code]),
+                "total": float(totals[code]),
+            }
+            for code in order
+        ]
+
+    def moving_average(self, window: int = 7) -> List[Dict[str, Any]]:
+        """Total spent each day and its average over the trailing `window`
+        days, from the first to the last day with a timestamped expense."""
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        data = self._data()
+        dated = ~np.isnat(data.timestamps)
+        if not dated.any():
+            return []
+        days = data.timestamps[dated].astype("datetime64[D]")
+        first = days.min()
+        totals = np.bincount(
+            (days - first).astype(np.int64), weights=data.prices[dated]
+        )
+        running = np.concatenate(([0.0], np.cumsum(totals)))
+        ends = np.arange(1, len(totals) + 1)
+        starts = np.maximum(ends - window, 0)
+        averages = (running[ends] - running[starts]) / (ends - starts)
+        dates = np.arange(first, first + len(totals)).astype(str).tolist()
+        return [
+            {"date": date, "total": float(total), "average": float(average)}
+            for date, total, average in zip(dates, totals, averages)
+        ]
+
+    def outliers(self, k: float = 1.5) -> Dict[str, Any]:
+        """Expenses priced more than k interquartile ranges outside the
+        middle half of prices (Tukey's fences), most expensive first."""
+        if k < 0:
+            raise ValueError("k must not be negative")
+        data = self._data()
+        if not len(data.prices):
+            return {"low": None, "high": None, "expenses": []}
+        q1, q3 = np.percentile(data.prices, [25, 75])
+        low, high = q1 - k * (q3 - q1), q3 + k * (q3 - q1)
+        rows = np.flatnonzero((data.prices < low) | (data.prices > high))
+        rows = rows[np.argsort(-data.prices[rows], kind="stable")]
+        return {
+            "low": float(low),
+            "high": float(high),
+            "expenses": [
+                {
+                    "id": int(data.ids[row]),
+                    "name": data.names[data.codes[row]],
+                    "price": float(data.prices[row]),
+                }
+                for row in rows
+            ],
+        }
@@ -0,0 +1,191 @@
+"""
+Prefix trie for autocompleting expense names.
+
+Every distinct lowercased name is a path in the trie, and the node where it
+ends counts the expenses with that name. Each node also caches the most
+frequent names below it, updated along the name's path as expenses are
+added and removed, so completing a prefix is a walk down the prefix plus a
+slice of the cache rather than a scan of every expense.
+
+A cache only has to be recomputed from its subtree when it was full and
+one of its names became less frequent, since a name outside the cache
+might now belong in it. That is done lazily on the next lookup.
+"""
+
+import heapq
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# How many completions each node caches.
+CACHE_SIZE = 10
+
+
+class _Node:
+    __slots__ = ("children", "count", "top", "stale")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # Expenses whose lowercased name ends at this node.
+        self.count = 0
+        # (-count, name) of the most frequent names below this node.
+        self.top: List[Tuple[int, str]] = []
+        self.stale = False
+
+
+class AutocompleteIndex:
+    """Incrementally maintained prefix index over expense names."""
+
+    def __init__(self):
+        self._root = _Node()
+        # Lowercased name -> how often each spelling of it is used.
+        self._spellings: Dict[str, Counter] = {}
+
+    def _path(self, name: str, create: bool) -> List[_Node]:
+        path = [self._root]
+        for char in name:
+            child = path[-1].children.get(char)
+            if child is None:
+                if not create:
+                    return []
+                child = path[-1].children[char] = _Node()
+            path.append(child)
+        return path
+
+    def add(self, expense) -> None:
+        name = expense.name.lower()
+        self._spellings.setdefault(name, Counter())[expense.name] += 1
+        path = self._path(name, create=True)
+        path[-1].count += 1
+        entry = (-path[-1].count, name)
+        for node in path:
+            if node.stale:
+                continue
+            node.top = [item for item in node.top if item[1] != name]
+            node.top.append(entry)
+            node.top.sort()
+            del node.top[CACHE_SIZE:]
+
+    def remove(self, expense) -> None:
+        """Remove an expense, which must still carry its indexed name."""
+        name = expense.name.lower()
+        spellings = self._spellings.get(name)
+        if not spellings or not spellings[expense.name]:
+            return
+        spellings[expense.name] -= 1
+        if not +spellings:
+            del self._spellings[name]
+        else:
+            self._spellings[name] = +spellings
+
+        path = self._path(name, create=False)
+        path[-1].count -= 1
+        for node in path:
+            position = next(
+                (i for i, item in enumerate(node.top) if item[1] == name), None
+            )
+            if node.stale or position is None:
+                continue
+            if len(node.top) == CACHE_SIZE:
+                node.stale = True
+            elif path[-1].count:
+                node.top[position] = (-path[-1].count, name)
+                node.top.sort()
+            else:
+                del node.top[position]
+
+        # Drop the nodes that no longer lead to any name.
+        for depth in range(len(name), 0, -1):
+            node = path[depth]
+            if node.count or node.children:
+                break
+            del path[depth - 1].children[name[depth - 1]]
+
+    def add_all(self, expenses: Iterable) -> None:
+        """Index many expenses at once.
+
+        The names are counted first, so each distinct name walks the trie
+        once, and then every cache is rebuilt in one bottom-up pass from
+        its children's caches instead of being kept up to date per expense.
+        """
+        counts: Dict[str, int] = {}
+        for spelling, count in Counter(expense.name for expense in expenses).items():
+            name = spelling.lower()
+            self._spellings.setdefault(name, Counter())[spelling] += count
+            counts[name] = counts.get(name, 0) + count
+        if not counts:
+            return
+        for name, count in counts.items():
+            self._path(name, create=True)[-1].count += count
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        """Recompute every node's cache from its own count and its
+        children's caches, children first."""
+        pending = [(self._root, "", False)]
+        while pending:
+            node, name, children_done = pending.pop()
+            if not children_done:
+                pending.append((node, name, True))
+                pending.extend(
+                    (child, name + char, False) for char, child in node.children.items()
+                )
+                continue
+            top = [(-node.count, name)] if node.count else []
+            for child in node.children.values():
+                top.extend(child.top)
+            top.sort()
+            node.top = top[:CACHE_SIZE]
+            node.stale = False
+
+    def _names(self, node: _Node, prefix: str) -> Iterator[Tuple[int, str]]:
+        """Yield (-count, name) for every name below node."""
+        pending = [(node, prefix)]
+        while pending:
+            node, name = pending.pop()
+            if node.count:
+                yield -node.count, name
+            pending.extend(
+                (child, name + char) for char, child in node.children.items()
+            )
+
+    def complete(self, prefix: str, k: int = 5) -> List[Tuple[str, int]]:
+        """Return up to k (name, count) pairs for names starting with
+        prefix, most frequent first.
+
+        Each name is given in its most common spelling.
+        """
+        prefix = prefix.lower()
+        path = self._path(prefix, create=False)
+        if not path or k <= 0:
+            return []
+        node = path[-1]
+        if k > CACHE_SIZE:
+            top = heapq.nsmallest(k, self._names(node, prefix))
+        else:
+            if node.stale:
+                node.top = heapq.nsmallest(CACHE_SIZE, self._names(node, prefix))
+                node.stale = False
+            top = node.top[:k]
+        return [
+            (self._spellings[name].most_common(1)[0][0], -count) for count, name in top
+        ]
+
+    def __len__(self) -> int:
+        return sum(sum(spellings.values()) for spellings in self._spellings.values())
+
+
+def complete_by_scan(
+    expenses: Iterable, prefix: str, k: int = 5
+) -> List[Tuple[str, int]]:
+    """Same result as AutocompleteIndex.complete in one pass over expenses,
+    for when no index has been built."""
+    prefix = prefix.lower()
+    spellings: Dict[str, Counter] = {}
+    for expense in expenses:
+        name = expense.name.lower()
+        if name.startswith(prefix):
+            spellings.setdefault(name, Counter())[expense.name] += 1
+    top = heapq.nsmallest(
+        k, ((-sum(counts.values()), name) for name, counts in spellings.items())
+    )
+    return [(spellings[name].most_common(1)[0][0], -count) for count, name in top]
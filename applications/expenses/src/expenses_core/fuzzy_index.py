@@ -0,0 +1,135 @@
+"""
+BK-tree for fuzzy (typo tolerant) search over expense names.
+
+Each distinct lowercased name is a node, and a child hangs off its parent
+under their Levenshtein distance. By the triangle inequality, a name
+within distance k of the query can only be below a child whose edge
+distance is within k of the parent's distance to the query, so a search
+only visits a small part of the tree instead of comparing the query
+against every name.
+
+Names whose last expense is removed stay in the tree as empty nodes, and
+the tree is rebuilt once they outnumber the live names.
+"""
+
+from typing import Dict, Iterable, List, Set, Tuple
+
+DEFAULT_MAX_DISTANCE = 2
+
+
+def levenshtein(a: str, b: str) -> int:
+    """Number of single-character edits that turn a into b."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+class _Node:
+    __slots__ = ("name", "children")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.children: Dict[int, "_Node"] = {}
+
+
+class BKTreeIndex:
+    """Incrementally maintained edit-distance index over expense names."""
+
+    def __init__(self):
+        self._root = None
+        # Lowercased name -> ids of the expenses with that name. Names in
+        # the tree without an entry here are empty nodes.
+        self._by_name: Dict[str, Set[int]] = {}
+        self._nodes = 0
+
+    def _insert(self, name: str) -> None:
+        self._nodes += 1
+        if self._root is None:
+            self._root = _Node(name)
+            return
+        node = self._root
+        while True:
+            distance = levenshtein(name, node.name)
+            if distance == 0:
+                # Re-adding a name whose node was left empty.
+                self._nodes -= 1
+                return
+            child = node.children.get(distance)
+            if child is None:
+                node.children[distance] = _Node(name)
+                return
+            node = child
+
+    def add(self, expense) -> None:
+        """Index an expense under its current name."""
+        name = expense.name.lower()
+        ids = self._by_name.get(name)
+        if ids is None:
+            ids = self._by_name[name] = set()
+            self._insert(name)
+        ids.add(expense.id)
+
+    def remove(self, expense) -> None:
+        """Remove an expense, which must still carry its indexed name."""
+        name = expense.name.lower()
+        ids = self._by_name.get(name)
+        if ids is None:
+            return
+        ids.discard(expense.id)
+        if not ids:
+            del self._by_name[name]
+            if self._nodes > 2 * len(self._by_name):
+                self._rebuild()
+
+    def _rebuild(self) -> None:
+        self._root = None
+        self._nodes = 0
+        for name in self._by_name:
+            self._insert(name)
+
+    def add_all(self, expenses: Iterable) -> None:
+        for expense in expenses:
+            self.add(expense)
+
+    def matching_names(
+        self, query: str, max_distance: int = DEFAULT_MAX_DISTANCE
+    ) -> List[Tuple[int, str]]:
+        """Return (distance, name) for names within max_distance of query,
+        closest first."""
+        query = query.lower()
+        matches: List[Tuple[int, str]] = []
+        pending = [self._root] if self._root is not None else []
+        while pending:
+            node = pending.pop()
+            distance = levenshtein(query, node.name)
+            if distance <= max_distance and node.name in self._by_name:
+                matches.append((distance, node.name))
+            low, high = distance - max_distance, distance + max_distance
+            pending.extend(
+                child for edge, child in node.children.items() if low <= edge <= high
+            )
+        matches.sort()
+        return matches
+
+    def search(self, query: str, max_distance: int = DEFAULT_MAX_DISTANCE) -> List[int]:
+        """Return ids of expenses with a name within max_distance of query,
+        closest names first and by id within a name."""
+        ids: List[int] = []
+        for _, name in self.matching_names(query, max_distance):
+            ids.extend(sorted(self._by_name[name]))
+        return ids
+
+    def __len__(self) -> int:
+        return sum(len(ids) for ids in self._by_name.values())
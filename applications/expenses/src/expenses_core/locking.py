@@ -0,0 +1,152 @@
+"""
+Cross-process locking and versioning for an expenses file.
+
+Several processes (CLI sessions, API servers) may share one expenses file,
+and every save is a read-modify-write: without coordination the last
+process to save silently discards what the others wrote. Writers therefore
+take an exclusive advisory (fcntl) lock on a small sidecar file,
+expenses.lock, for the whole check-and-write, and compare the version
+counter kept in it with the version their expenses were loaded at. If
+another process saved in between, they reload and replay their own pending
+changes on top before writing, instead of overwriting.
+
+Readers never take the lock: snapshots are replaced atomically, so a
+reader sees the old file or the new one and is never held up by a save.
+To know which version it loaded without locking, a loader reads the
+counter before and after reading the data, like a seqlock. Writers make
+the counter odd before writing and even once done, so a loader that saw
+the same even value both times read exactly that version; otherwise the
+version is unknown and the next save merges. A writer that crashed
+mid-save leaves the counter odd, which matches no loaded version either.
+
+Threads of one process also take turns: only one holds the lock at a
+time, and re-entering it is a no-op only for the thread holding it.
+
+fcntl is POSIX only; elsewhere the lock does nothing between processes and
+only the version check remains.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+LOCK_TIMEOUT = 10.0
+# Fixed width, so every update overwrites the whole value in one write.
+_WIDTH = 20
+
+
+class VersionLock:
+    """Exclusive writer lock and version counter kept in one file.
+
+    Used as a context manager around a save; entering returns the current
+    version (None if the file is unreadable). Re-entering from the thread
+    holding the lock, as a save nested in another one does, is a no-op.
+    """
+
+    def __init__(self, path: Path, timeout: float = LOCK_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        # While held: the version on disk when the lock was taken. After
+        # release: the version this process wrote.
+        self.version: Optional[int] = None
+        self._fd: Optional[int] = None
+        self._depth = 0
+        # Other threads of this process wait on this before the file lock.
+        self._threads = threading.Lock()
+        self._owner: Optional[int] = None
+
+    def read(self) -> Optional[int]:
+        """The current version, 0 before the first save, or None if it
+        cannot be read."""
+        try:
+            with open(self.path, "r") as f:
+                text = f.read()
+        except FileNotFoundError:
+            return 0
+        if not text:
+            # Created by a writer that has not written a version yet.
+            return 0
+        try:
+            return int(text)
+        except ValueError:
+            return None
+
+    def held(self) -> bool:
+        """Whether the calling thread holds the lock."""
+        return self._owner == threading.get_ident()
+
+    def confirm(self, before: Optional[int]) -> Optional[int]:
+        """The version of data loaded after reading `before`, or None when
+        a save started or finished while it was being loaded."""
+        if self.held():
+            # Nobody else can save while this thread holds the lock.
+            return self.version
+        if before is None or before % 2 or self.read() != before:
+            return None
+        return before
+
+    def __enter__(self) -> Optional[int]:
+        if not self.held():
+            self._acquire()
+            try:
+                current = self.read()
+                self.version = current
+                # Odd while the save is in progress.
+                self._write((current or 0) // 2 * 2 + 1)
+            except Exception:
+                self._release()
+                raise
+        self._depth += 1
+        return self.version
+
+    def __exit__(self, *exc_info) -> None:
+        self._depth -= 1
+        if self._depth:
+            return
+        try:
+            # Bumped even if the save failed: the file may have changed.
+            self.version = (self.version or 0) // 2 * 2 + 2
+            self._write(self.version)
+        finally:
+            self._release()
+
+    def _acquire(self) -> None:
+        deadline = time.monotonic() + self.timeout
+        if not self._threads.acquire(timeout=self.timeout):
+            raise TimeoutError(f"Timed out waiting for the lock on {self.path}")
+        self._owner = threading.get_ident()
+        try:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        except BaseException:
+            self._owner = None
+            self._threads.release()
+            raise
+        if fcntl is None:
+            return
+        while True:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    self._release()
+                    raise TimeoutError(f"Timed out waiting for the lock on {self.path}")
+                time.sleep(0.01)
+
+    def _release(self) -> None:
+        # Closing the file also releases the lock.
+        os.close(self._fd)
+        self._fd = None
+        self._owner = None
+        self._threads.release()
+
+    def _write(self, version: int) -> None:
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        os.write(self._fd, f"{version:0{_WIDTH}d}\n".encode())
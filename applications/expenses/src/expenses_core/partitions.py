@@ -0,0 +1,262 @@
+"""
+Expense timestamps and month partitions.
+
+Timestamps are ISO 8601 local times at second precision
+("2026-10-18T09:30:00"), so they sort as strings and the month an expense
+belongs to is simply its first seven characters.
+
+MonthlyPartitions groups expenses by that month, keeping each partition
+as arrays of epoch seconds, ids and prices sorted by time, and caches
+statistics for each partition. A date range query only visits the
+partitions it overlaps, cutting only the first and last month with binary
+searches, and a month-by-month report reads one cached summary per month
+instead of every expense.
+"""
+
+import math
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .aggregates import ExpenseStats
+
+_EPOCH = datetime(1970, 1, 1)
+# Stand-in for "no timestamp" where a number is required (columnar and
+# binary storage), as older expenses were saved without one.
+NO_TIMESTAMP = -(2**63)
+
+
+def now_timestamp() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def normalize_timestamp(value: str) -> str:
+    """Parse an ISO 8601 date or date-time into the stored form.
+
+    Raises ValueError for anything else. Times with a UTC offset are
+    converted to local time.
+    """
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.isoformat(timespec="seconds")
+
+
+def timestamp_to_seconds(timestamp: Optional[str]) -> int:
+    if timestamp is None:
+        return NO_TIMESTAMP
+    return int((datetime.fromisoformat(timestamp) - _EPOCH).total_seconds())
+
+
+def seconds_to_timestamp(seconds: int) -> Optional[str]:
+    if seconds == NO_TIMESTAMP:
+        return None
+    return (_EPOCH + timedelta(seconds=seconds)).isoformat(timespec="seconds")
+
+
+def in_range(
+    timestamp: Optional[str], start: Optional[str], end: Optional[str]
+) -> bool:
+    """Whether timestamp falls within [start, end].
+
+    Bounds may be a month ("2026-10"), a date or a full timestamp, and
+    `end` includes everything it is a prefix of, so "2026-10" ends with
+    the last second of October.
+    """
+    if timestamp is None:
+        return False
+    return (start is None or timestamp >= start) and (
+        end is None or timestamp[: len(end)] <= end
+    )
+
+
+class _Partition:
+    """One month of expenses as parallel arrays sorted by (time, id)."""
+
+    __slots__ = ("seconds", "ids", "prices", "_summary")
+
+    def __init__(self):
+        # Timestamps as seconds since the epoch, for ordering and filtering
+        # the boundary months, and prices for the summary: 24 bytes an
+        # expense instead of a dict entry and a timestamp string.
+        self.seconds = array("q")
+        self.ids = array("q")
+        self.prices = array("d")
+        # Statistics of the month, recomputed from the prices the first time
+        # they are read after an expense was removed.
+        self._summary: Optional[ExpenseStats] = None
+
+    def _locate(self, seconds: int, expense_id: int) -> int:
+        """Position of (seconds, expense_id), or where it goes."""
+        start = bisect_left(self.seconds, seconds)
+        end = bisect_right(self.seconds, seconds, start)
+        return bisect_left(self.ids, expense_id, start, end)
+
+    def add(self, seconds: int, expense_id: int, price: float) -> None:
+        position = self._locate(seconds, expense_id)
+        self.seconds.insert(position, seconds)
+        self.ids.insert(position, expense_id)
+        self.prices.insert(position, price)
+        self._count(price)
+
+    def add_sorted(self, entries: List[Tuple[int, int, float]]) -> None:
+        """Add (seconds, id, price) entries given in order, copying the
+        entries already here once instead of moving them on every insert."""
+        if not self.ids or entries[0][:2] > (self.seconds[-1], self.ids[-1]):
+            # All of them go after the entries already here.
+            for entry in entries:
+                self.seconds.append(entry[0])
+                self.ids.append(entry[1])
+                self.prices.append(entry[2])
+                self._count(entry[2])
+            return
+        positions = [
+            self._locate(seconds, expense_id) for seconds, expense_id, _ in entries
+        ]
+        columns = (self.seconds, self.ids, self.prices)
+        merged = tuple(array(column.typecode) for column in columns)
+        previous = 0
+        for entry, position in zip(entries, positions):
+            for column, new_column, value in zip(columns, merged, entry):
+                new_column.extend(column[previous:position])
+                new_column.append(value)
+            previous = position
+            self._count(entry[2])
+        for column, new_column in zip(columns, merged):
+            new_column.extend(column[previous:])
+        self.seconds, self.ids, self.prices = merged
+
+    def remove(self, seconds: int, expense_id: int) -> bool:
+        """Remove an entry, returning whether it was here."""
+        position = self._locate(seconds, expense_id)
+        if position == len(self.ids) or self.ids[position] != expense_id:
+            return False
+        del self.seconds[position], self.ids[position], self.prices[position]
+        self._summary = None
+        return True
+
+    def _count(self, price: float) -> None:
+        """Update a cached summary for an added price."""
+        summary = self._summary
+        if summary is None or not math.isfinite(price):
+            return
+        self._summary = ExpenseStats.from_summary(
+            summary.count + 1,
+            summary.total + price,
+            price if summary.minimum is None else min(summary.minimum, price),
+            price if summary.maximum is None else max(summary.maximum, price),
+        )
+
+    def summary(self) -> ExpenseStats:
+        if self._summary is None:
+            prices = [price for price in self.prices if math.isfinite(price)]
+            self._summary = ExpenseStats.from_summary(
+                len(prices),
+                math.fsum(prices),
+                min(prices, default=None),
+                max(prices, default=None),
+            )
+        return self._summary
+
+    def first(self, predicate: Callable[[str], bool]) -> int:
+        """Index of the first entry whose timestamp satisfies predicate,
+        which must then hold for every later entry too."""
+        low, high = 0, len(self.seconds)
+        while low < high:
+            middle = (low + high) // 2
+            if predicate(seconds_to_timestamp(self.seconds[middle])):
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class MonthlyPartitions:
+    """Incrementally maintained month partitions with per-month summaries."""
+
+    def __init__(self):
+        self._partitions: Dict[str, _Partition] = {}
+        # Months that have a partition, in order.
+        self._months: List[str] = []
+
+    def _partition(self, month: str) -> _Partition:
+        partition = self._partitions.get(month)
+        if partition is None:
+            partition = self._partitions[month] = _Partition()
+            insort(self._months, month)
+        return partition
+
+    def add(self, expense) -> None:
+        timestamp = expense.timestamp
+        if timestamp is None:
+            return
+        self._partition(timestamp[:7]).add(
+            timestamp_to_seconds(timestamp), expense.id, expense.price
+        )
+
+    def remove(self, expense) -> None:
+        """Remove an expense, which must still carry its indexed values."""
+        timestamp = expense.timestamp
+        if timestamp is None:
+            return
+        month = timestamp[:7]
+        partition = self._partitions.get(month)
+        if partition is None or not partition.remove(
+            timestamp_to_seconds(timestamp), expense.id
+        ):
+            return
+        if not partition:
+            del self._partitions[month]
+            del self._months[bisect_left(self._months, month)]
+
+    def add_all(self, expenses: Iterable) -> None:
+        """Add many expenses, merging them into each month at once."""
+        by_month: Dict[str, List[Tuple[int, int, float]]] = {}
+        for expense in expenses:
+            timestamp = expense.timestamp
+            if timestamp is not None:
+                by_month.setdefault(timestamp[:7], []).append(
+                    (timestamp_to_seconds(timestamp), expense.id, expense.price)
+                )
+        for month, entries in by_month.items():
+            entries.sort()
+            self._partition(month).add_sorted(entries)
+
+    def months(
+        self, start: Optional[str] = None, end: Optional[str] = None
+    ) -> List[str]:
+        """Months with expenses that overlap [start, end], in order."""
+        low = 0 if start is None else bisect_left(self._months, start[:7])
+        high = len(self._months) if end is None else bisect_right(self._months, end[:7])
+        return self._months[low:high]
+
+    def ids_between(
+        self, start: Optional[str] = None, end: Optional[str] = None
+    ) -> List[int]:
+        """Ids of expenses timestamped within [start, end], oldest first."""
+        matches: List[int] = []
+        for month in self.months(start, end):
+            partition = self._partitions[month]
+            # Interior months lie entirely inside the range; the boundary
+            # ones are cut with binary searches.
+            low = 0
+            if start is not None and month == start[:7]:
+                low = partition.first(lambda timestamp: timestamp >= start)
+            high = len(partition)
+            if end is not None and month == end[:7]:
+                high = partition.first(lambda timestamp: timestamp[: len(end)] > end)
+            matches.extend(partition.ids[low:high])
+        return matches
+
+    def summaries(
+        self, start: Optional[str] = None, end: Optional[str] = None
+    ) -> List[Tuple[str, ExpenseStats]]:
+        """(month, statistics) for each month from start to end."""
+        return [
+            (month, self._partitions[month].summary())
+            for month in self.months(start, end)
+        ]
@@ -0,0 +1,116 @@
+"""
+Group commit for expense writes.
+
+Instead of persisting after every change, changes are marked dirty and
+flushed together according to a durability policy:
+
+- "always": flush after every change (the default).
+- "interval": flush once the oldest unflushed change is `interval` seconds
+  old, or as soon as `max_dirty` changes are pending.
+- "exit": only flush on an explicit flush() and at shutdown.
+
+Pending changes are always flushed at interpreter exit and on SIGTERM, so
+no acknowledged write is lost on a clean shutdown. Inside hold() changes
+are only counted, whatever the policy, and flushed together at the end.
+
+The owner's flush function returns whether it wrote everything; after a
+failed write the changes stay dirty and the next flush tries again.
+"""
+
+import atexit
+import contextlib
+import signal
+import sys
+import threading
+from typing import Callable, Iterator, Optional
+
+POLICIES = ("always", "interval", "exit")
+
+
+class DebouncedFlusher:
+    """Coalesces bursts of changes into a single flush."""
+
+    def __init__(
+        self,
+        flush: Callable[[], bool],
+        lock: threading.RLock,
+        policy: str = "always",
+        interval: float = 1.0,
+        max_dirty: int = 1000,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown durability policy: {policy}")
+        self._flush = flush
+        # The owner's lock, held while its data is changed or written out.
+        self.lock = lock
+        self.policy = policy
+        self.interval = interval
+        self.max_dirty = max_dirty
+        self.dirty = 0
+        # Nesting depth of hold() blocks.
+        self.held = 0
+        self._timer: Optional[threading.Timer] = None
+        if policy != "always":
+            install_exit_hooks(self.flush)
+
+    def mark_dirty(self, count: int = 1) -> None:
+        """Record changes and flush them if the policy says so."""
+        with self.lock:
+            self.dirty += count
+            if self.held:
+                return
+            if self.policy == "always" or (
+                self.policy == "interval" and self.dirty >= self.max_dirty
+            ):
+                self.flush()
+            elif self.policy == "interval" and self._timer is None:
+                self._timer = threading.Timer(self.interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        """Write out all pending changes now, unless they are held."""
+        with self.lock:
+            if self.held:
+                return
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self.dirty:
+                return
+            if self._flush():
+                self.dirty = 0
+
+    @contextlib.contextmanager
+    def hold(self) -> Iterator[None]:
+        """Defer flushing the changes made inside the block and flush them
+        all at once when it ends. If it raises they stay pending; the owner
+        decides whether to discard() them."""
+        with self.lock:
+            self.held += 1
+            try:
+                yield
+            finally:
+                self.held -= 1
+            if not self.held:
+                self.flush()
+
+    def discard(self) -> None:
+        """Forget pending changes without writing them."""
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self.dirty = 0
+
+
+def install_exit_hooks(flush: Callable[[], None]) -> None:
+    """Flush at interpreter exit, including when stopped with SIGTERM."""
+    atexit.register(flush)
+    # SIGTERM normally kills the process without running atexit handlers;
+    # turn it into a regular exit instead.
+    if (
+        threading.current_thread() is threading.main_thread()
+        and signal.getsignal(signal.SIGTERM) == signal.SIG_DFL
+    ):
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
@@ -0,0 +1,184 @@
+"""
+Sorted price index for range and top-N queries.
+
+Keeps (price, id) pairs in sorted order, updated with bisect on every add,
+update and delete. A price range is a few binary searches and a slice, and
+the N most expensive expenses are the last N entries, so neither query has
+to scan or sort the whole expense list.
+
+The pairs are split into blocks of at most 2 * BLOCK_SIZE entries, each
+holding its prices and ids in two parallel arrays, so an insert or delete
+only moves the entries of one block instead of the whole index, and an
+entry costs 16 bytes instead of a tuple and two boxed numbers.
+
+Prices that are not finite are left out: NaN has no place in the order
+and could not be found again to be removed.
+"""
+
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List, Optional, Tuple
+
+# Entries per block when the index is built; a block is split in two when
+# it grows to twice this.
+BLOCK_SIZE = 1024
+
+
+class PriceIndex:
+    """Incrementally maintained index of expense ids ordered by price."""
+
+    def __init__(self):
+        # Blocks in order, as parallel arrays of prices and ids sorted by
+        # (price, id), and the last (price, id) of each block to find the
+        # block a pair belongs in.
+        self._prices: List[array] = []
+        self._ids: List[array] = []
+        self._maxes: List[Tuple[float, int]] = []
+        self._len = 0
+
+    def _locate(self, prices: array, ids: array, price: float, expense_id: int) -> int:
+        """Position of (price, expense_id) in a block, or where it goes."""
+        start = bisect_left(prices, price)
+        end = bisect_right(prices, price, start)
+        return bisect_left(ids, expense_id, start, end)
+
+    def add(self, expense) -> None:
+        price, expense_id = expense.price, expense.id
+        if not math.isfinite(price):
+            return
+        self._len += 1
+        if not self._maxes:
+            self._prices.append(array("d", [price]))
+            self._ids.append(array("q", [expense_id]))
+            self._maxes.append((price, expense_id))
+            return
+
+        block = bisect_left(self._maxes, (price, expense_id))
+        if block == len(self._maxes):
+            block -= 1
+            self._maxes[block] = (price, expense_id)
+        prices, ids = self._prices[block], self._ids[block]
+        position = self._locate(prices, ids, price, expense_id)
+        prices.insert(position, price)
+        ids.insert(position, expense_id)
+        if len(prices) >= 2 * BLOCK_SIZE:
+            self._prices.insert(block + 1, prices[BLOCK_SIZE:])
+            self._ids.insert(block + 1, ids[BLOCK_SIZE:])
+            del prices[BLOCK_SIZE:]
+            del ids[BLOCK_SIZE:]
+            self._maxes.insert(block, (prices[-1], ids[-1]))
+
+    def remove(self, expense) -> None:
+        """Remove an expense, which must still carry its indexed price."""
+        price, expense_id = expense.price, expense.id
+        if not math.isfinite(price):
+            return
+        block = bisect_left(self._maxes, (price, expense_id))
+        if block == len(self._maxes):
+            return
+        prices, ids = self._prices[block], self._ids[block]
+        position = self._locate(prices, ids, price, expense_id)
+        if (
+            position == len(ids)
+            or ids[position] != expense_id
+            or prices[position] != price
+        ):
+            return
+
+        self._len -= 1
+        del prices[position]
+        del ids[position]
+        if not prices:
+            del self._prices[block], self._ids[block], self._maxes[block]
+        elif position == len(prices):
+            self._maxes[block] = (prices[-1], ids[-1])
+
+    def add_all(self, expenses: Iterable) -> None:
+        """Index many expenses: one at a time when they are few next to the
+        indexed ones, otherwise by sorting everything into new blocks."""
+        expenses = list(expenses)
+        if len(expenses) * 8 < self._len:
+            for expense in expenses:
+                self.add(expense)
+            return
+        entries = [
+            (price, expense_id)
+            for prices, ids in zip(self._prices, self._ids)
+            for price, expense_id in zip(prices, ids)
+        ]
+        entries.extend(
+            (expense.price, expense.id)
+            for expense in expenses
+            if math.isfinite(expense.price)
+        )
+        entries.sort()
+        self._prices, self._ids, self._maxes = [], [], []
+        for start in range(0, len(entries), BLOCK_SIZE):
+            chunk = entries[start : start + BLOCK_SIZE]
+            self._prices.append(array("d", [price for price, _ in chunk]))
+            self._ids.append(array("q", [expense_id for _, expense_id in chunk]))
+            self._maxes.append(chunk[-1])
+        self._len = len(entries)
+
+    def _bounds(
+        self, low: Optional[float], high: Optional[float]
+    ) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        """(block, position) of the first entry within [low, high] and just
+        past the last one."""
+        if low is None:
+            start = (0, 0)
+        else:
+            block = bisect_left(self._maxes, (low,))
+            start = (
+                block,
+                (
+                    bisect_left(self._prices[block], low)
+                    if block < len(self._maxes)
+                    else 0
+                ),
+            )
+        if high is None:
+            end = (len(self._maxes), 0)
+        else:
+            block = bisect_right(self._maxes, (high, math.inf))
+            end = (
+                block,
+                (
+                    bisect_right(self._prices[block], high)
+                    if block < len(self._maxes)
+                    else 0
+                ),
+            )
+        return start, end
+
+    def range(
+        self, low: Optional[float] = None, high: Optional[float] = None
+    ) -> List[int]:
+        """Return ids of expenses priced within [low, high], cheapest first."""
+        (first, start), (last, end) = self._bounds(low, high)
+        result: List[int] = []
+        for block in range(first, min(last, len(self._ids) - 1) + 1):
+            ids = self._ids[block]
+            result.extend(
+                ids[start if block == first else 0 : end if block == last else len(ids)]
+            )
+        return result
+
+    def top(
+        self, n: int, low: Optional[float] = None, high: Optional[float] = None
+    ) -> List[int]:
+        """Return ids of the n most expensive expenses within [low, high]."""
+        (first, start), (last, end) = self._bounds(low, high)
+        result: List[int] = []
+        block = min(last, len(self._ids) - 1)
+        while block >= first and len(result) < n:
+            ids = self._ids[block]
+            stop = end if block == last else len(ids)
+            begin = max(start if block == first else 0, stop - (n - len(result)))
+            result.extend(reversed(ids[begin:stop]))
+            block -= 1
+        return result
+
+    def __len__(self) -> int:
+        return self._len
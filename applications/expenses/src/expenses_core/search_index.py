@@ -0,0 +1,88 @@
+"""
+Trigram index for substring search over expense names.
+
+Every distinct lowercased name is split into overlapping three-character
+grams, and each gram keeps the set of names containing it. A substring
+query only has to intersect the postings of its own grams and verify the
+few candidate names, instead of lowercasing and scanning every expense.
+"""
+
+from typing import Dict, Iterable, List, Set
+
+
+def trigrams(text: str) -> Set[str]:
+    """Return the set of three-character substrings of text."""
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """Incrementally maintained substring index over expense names."""
+
+    def __init__(self):
+        # Trigram -> distinct lowercased names that contain it.
+        self._postings: Dict[str, Set[str]] = {}
+        # Lowercased name -> ids of the expenses with that name.
+        self._by_name: Dict[str, Set[int]] = {}
+        self._count = 0
+
+    def add(self, expense) -> None:
+        """Index an expense under its current name."""
+        name = expense.name.lower()
+        ids = self._by_name.get(name)
+        if ids is None:
+            ids = self._by_name[name] = set()
+            for gram in trigrams(name):
+                self._postings.setdefault(gram, set()).add(name)
+        ids.add(expense.id)
+        self._count += 1
+
+    def remove(self, expense) -> None:
+        """Remove an expense, which must still carry its indexed name."""
+        name = expense.name.lower()
+        ids = self._by_name.get(name)
+        if ids is None or expense.id not in ids:
+            return
+        ids.discard(expense.id)
+        self._count -= 1
+        if ids:
+            return
+
+        del self._by_name[name]
+        for gram in trigrams(name):
+            names = self._postings[gram]
+            names.discard(name)
+            if not names:
+                del self._postings[gram]
+
+    def add_all(self, expenses: Iterable) -> None:
+        for expense in expenses:
+            self.add(expense)
+
+    def matching_names(self, query: str) -> List[str]:
+        """Return the distinct lowercased names containing query."""
+        query = query.lower()
+        grams = trigrams(query)
+        if not grams:
+            # Queries shorter than a trigram fall back to the distinct name
+            # table, which is usually far smaller than the expense list.
+            return [name for name in self._by_name if query in name]
+
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        candidates = set(postings[0])
+        for names in postings[1:]:
+            candidates &= names
+            if not candidates:
+                return []
+        # Sharing every trigram does not guarantee a contiguous match.
+        return [name for name in candidates if query in name]
+
+    def search(self, query: str) -> List[int]:
+        """Return the ids of expenses whose name contains query, in order."""
+        ids: List[int] = []
+        for name in self.matching_names(query):
+            ids.extend(self._by_name[name])
+        ids.sort()
+        return ids
+
+    def __len__(self) -> int:
+        return self._count
@@ -0,0 +1,195 @@
+"""
+Approximate statistics over expenses: price quantiles and distinct names.
+
+Exact percentiles need every price sorted and an exact distinct count needs
+every name in a set. For very large stores two small sketches are kept
+instead, updated as expenses are added:
+
+- KLLSketch estimates quantiles (median, 90th percentile...) of the prices
+  from a few hundred retained values, with a rank error of about 1-2%.
+- HyperLogLog estimates how many distinct names there are from 4096
+  one-byte registers, with a relative error of about 1.6%.
+
+Both are mergeable: sketches built separately, such as one per shard in a
+separate process, combine into the sketch of all the expenses together.
+
+Neither can forget a value, so removing or changing an expense only counts
+the removal. Once removed values make up more than REBUILD_FRACTION of the
+live ones, needs_rebuild() tells the owner to build fresh sketches.
+"""
+
+import hashlib
+import math
+import random
+from typing import Dict, Iterable, List, Optional, Sequence
+
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+REBUILD_FRACTION = 0.1
+
+
+class KLLSketch:
+    """Streaming quantile sketch (Karnin, Lang and Liberty)."""
+
+    def __init__(self, k: int = 200):
+        self.k = k
+        self.count = 0
+        # Level h holds values that each stand for 2**h of the originals.
+        self._compactors: List[List[float]] = [[]]
+        self._random = random.Random()
+
+    def _capacity(self, level: int) -> int:
+        # Lower levels get geometrically smaller buffers than the top one.
+        depth = len(self._compactors) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self._compactors):
+            items = self._compactors[level]
+            if len(items) >= self._capacity(level):
+                if level + 1 == len(self._compactors):
+                    self._compactors.append([])
+                items.sort()
+                leftover = [items.pop()] if len(items) % 2 else []
+                # Keep every other value, at twice the weight, starting at a
+                # random one so the error has no bias.
+                self._compactors[level + 1].extend(
+                    items[self._random.randrange(2) :: 2]
+                )
+                items[:] = leftover
+            level += 1
+
+    def update(self, value: float) -> None:
+        self._compactors[0].append(value)
+        self.count += 1
+        if len(self._compactors[0]) >= self._capacity(0):
+            self._compress()
+
+    def merge(self, other: "KLLSketch") -> None:
+        while len(self._compactors) < len(other._compactors):
+            self._compactors.append([])
+        for level, items in enumerate(other._compactors):
+            self._compactors[level].extend(items)
+        self.count += other.count
+        self._compress()
+
+    def quantiles(self, fractions: Sequence[float]) -> List[Optional[float]]:
+        """Estimate the value at each fraction (0 to 1) of the sorted
+        values; None when the sketch is empty."""
+        weighted = sorted(
+            (value, 1 << level)
+            for level, items in enumerate(self._compactors)
+            for value in items
+        )
+        total = sum(weight for _, weight in weighted)
+        results: List[Optional[float]] = []
+        for fraction in fractions:
+            if not weighted:
+                results.append(None)
+                continue
+            target = fraction * total
+            seen = 0
+            for value, weight in weighted:
+                seen += weight
+                if seen >= target:
+                    break
+            results.append(value)
+        return results
+
+    def __len__(self) -> int:
+        """Values retained, which is what the sketch costs in memory."""
+        return sum(len(items) for items in self._compactors)
+
+
+class HyperLogLog:
+    """Distinct count estimator (Flajolet et al.)."""
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self._registers = bytearray(1 << precision)
+
+    def add(self, value: str) -> None:
+        # An unsalted hash, so sketches built in other processes
+        # (where hash() is salted differently) can be merged.
+        digest = hashlib.blake2b(value.encode(), digest_size=8).digest()
+        hashed = int.from_bytes(digest, "big")
+        bits = 64 - self.precision
+        register = hashed >> bits
+        rank = bits - (hashed & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self._registers[register]:
+            self._registers[register] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches of different precision")
+        self._registers = bytearray(map(max, self._registers, other._registers))
+
+    def estimate(self) -> int:
+        size = len(self._registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(2.0**-rank for rank in self._registers)
+        empty = self._registers.count(0)
+        if estimate <= 2.5 * size and empty:
+            # Small counts are estimated better from the empty registers.
+            estimate = size * math.log(size / empty)
+        return round(estimate)
+
+
+class ExpenseSketches:
+    """Price quantiles and distinct names, maintained like an index."""
+
+    def __init__(self):
+        self.prices = KLLSketch()
+        self.names = HyperLogLog()
+        # Removed values the sketches still count.
+        self.removed = 0
+
+    def add(self, expense) -> None:
+        self.prices.update(expense.price)
+        self.names.add(expense.name.lower())
+
+    def remove(self, expense) -> None:
+        self.removed += 1
+
+    def add_all(self, expenses: Iterable) -> None:
+        for expense in expenses:
+            self.add(expense)
+
+    def merge(self, other: "ExpenseSketches") -> None:
+        self.prices.merge(other.prices)
+        self.names.merge(other.names)
+        self.removed += other.removed
+
+    @property
+    def count(self) -> int:
+        return self.prices.count - self.removed
+
+    def needs_rebuild(self) -> bool:
+        return self.removed > REBUILD_FRACTION * max(self.count, 1)
+
+    def quantiles(
+        self, fractions: Sequence[float] = DEFAULT_QUANTILES
+    ) -> List[Optional[float]]:
+        return self.prices.quantiles(fractions)
+
+    def distinct_names(self) -> int:
+        return self.names.estimate()
+
+    def to_dict(self, fractions: Sequence[float] = DEFAULT_QUANTILES) -> dict:
+        quantiles: Dict[str, Optional[float]] = {
+            f"p{fraction * 100:g}": value
+            for fraction, value in zip(fractions, self.quantiles(fractions))
+        }
+        return {
+            "count": self.count,
+            "distinct_names": self.distinct_names(),
+            "quantiles": quantiles,
+        }
+
+
+def parse_quantiles(text: str) -> List[float]:
+    """Parse comma-separated fractions such as "0.5,0.9,0.99"."""
+    fractions = [float(part) for part in text.split(",") if part.strip()]
+    if not fractions or not all(0 <= fraction <= 1 for fraction in fractions):
+        raise ValueError("quantiles must be between 0 and 1")
+    return fractions
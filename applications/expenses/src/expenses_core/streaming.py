@@ -0,0 +1,116 @@
+"""
+Incremental parser for expenses.json.
+
+The snapshot is a JSON array of objects. Rather than handing the whole file
+to json.load, the array is read in chunks and each object is decoded as soon
+as it is complete, so memory use stays bounded by the chunk size.
+"""
+
+import functools
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_SEPARATORS = " \t\n\r,"
+
+
+def max_id(items: Iterable[Dict[str, Any]]) -> int:
+    """The largest id among stored records, or 0 if none has one."""
+    return max((item.get("id") or 0 for item in items), default=0)
+
+
+def assign_ids(
+    items: Iterable[Dict[str, Any]],
+    find_max_id: Optional[Callable[[], int]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Give stored records without an id (older files) sequential ids
+    after the largest id in use, so they cannot collide with the id of a
+    record further on.
+
+    The largest id is only needed once a record without an id turns up.
+    find_max_id returns it, for a stream by reading it again from the
+    start; without it the items are first read into a list.
+    """
+    if find_max_id is None:
+        if not isinstance(items, list):
+            items = list(items)
+        find_max_id = functools.partial(max_id, items)
+    next_id = None
+    for item in items:
+        if not item.get("id"):
+            if next_id is None:
+                next_id = find_max_id() + 1
+            item["id"] = next_id
+            next_id += 1
+        yield item
+
+
+def iter_records(
+    file_path: Path, chunk_size: int = CHUNK_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """Stream the records of an expenses.json snapshot, each with an id.
+
+    Files written by this application give every record an id; only older
+    ones without them cost a second pass to find the largest id.
+    """
+    return assign_ids(
+        iter_json_array(file_path, chunk_size),
+        lambda: max_id(iter_json_array(file_path, chunk_size)),
+    )
+
+
+def iter_json_array(
+    file_path: Path, chunk_size: int = CHUNK_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """Yield the items of a top-level JSON array one at a time."""
+    with open(file_path, "r") as f:
+        buffer = ""
+        pos = 0
+        eof = False
+        started = False
+
+        def fill() -> bool:
+            nonlocal buffer, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            return True
+
+        while True:
+            # Skip whitespace and separators between items.
+            while pos < len(buffer) and buffer[pos] in _SEPARATORS:
+                if buffer[pos] == "," and not started:
+                    raise ValueError("Unexpected ',' before '['")
+                pos += 1
+            if pos >= len(buffer):
+                if not fill():
+                    if started:
+                        raise ValueError("Unterminated JSON array")
+                    return
+                continue
+
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                pos += 1
+                continue
+
+            if buffer[pos] == "]":
+                return
+
+            try:
+                item, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # The item straddles the chunk boundary.
+                if eof or not fill():
+                    raise
+                continue
+            pos = end
+            yield item
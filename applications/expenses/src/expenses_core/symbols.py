@@ -0,0 +1,65 @@
+"""
+Shared symbol table for repeated expense names.
+
+Parsing a snapshot creates a new string for every record, so a name used a
+million times is stored a million times. Loaders pass each name through a
+SymbolTable instead, which hands back one canonical copy per distinct name
+and lets the parsed duplicates be freed.
+
+The table counts how many expenses refer to each name, so it can report
+the bytes saved compared with one string per expense, and drops a name
+once the last expense using it is deleted or renamed. sys.intern would
+deduplicate too, but without the accounting and without ever forgetting
+names that are no longer used.
+"""
+
+import sys
+from typing import Dict, List
+
+
+class SymbolTable:
+    """Reference-counted canonical strings."""
+
+    def __init__(self):
+        # String -> [canonical copy, number of references].
+        self._symbols: Dict[str, List] = {}
+        self.references = 0
+        self.bytes_saved = 0
+
+    def intern(self, value: str) -> str:
+        """Return the canonical copy of value, adding a reference to it."""
+        self.references += 1
+        entry = self._symbols.get(value)
+        if entry is None:
+            self._symbols[value] = [value, 1]
+            return value
+        entry[1] += 1
+        self.bytes_saved += sys.getsizeof(value)
+        return entry[0]
+
+    def release(self, value: str) -> None:
+        """Drop a reference taken by intern."""
+        entry = self._symbols.get(value)
+        if entry is None:
+            return
+        self.references -= 1
+        entry[1] -= 1
+        if entry[1]:
+            self.bytes_saved -= sys.getsizeof(value)
+        else:
+            del self._symbols[value]
+
+    def bytes_used(self) -> int:
+        """Bytes taken by the canonical strings themselves."""
+        return sum(sys.getsizeof(entry[0]) for entry in self._symbols.values())
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def to_dict(self) -> dict:
+        return {
+            "distinct": len(self),
+            "references": self.references,
+            "bytes_used": self.bytes_used(),
+            "bytes_saved": self.bytes_saved,
+        }
@@ -0,0 +1,231 @@
+"""
+Bitmap index over expense tags.
+
+Each tag keeps a bitset with bit n set when the expense with id n has the
+tag. A tag query such as "food AND NOT travel" is parsed once and evaluated
+with bitwise operations on whole bitmaps, so combining several tags costs a
+few big-int operations instead of a pass over every expense. NOT is taken
+relative to a bitmap of all live ids.
+
+Bitmaps are split into chunks of CHUNK_IDS ids, each a Python int keyed by
+chunk number, as in roaring bitmaps. Setting or clearing a bit rebuilds
+one chunk of at most 8 KiB rather than an int as long as the highest id,
+and chunks without any bit set are not stored.
+
+Query syntax: tag names combined with AND, OR, NOT and parentheses
+(case-insensitive). Adjacent tags without an operator are ANDed, so
+"food weekend" means "food AND weekend".
+"""
+
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+_TOKEN = re.compile(r"\s*(\(|\)|[^\s()]+)")
+_TAG = re.compile(r"[^\s(),]+")
+_OPERATORS = {"and", "or", "not"}
+
+# A parsed query: ("tag", name), ("not", node), ("and", a, b) or ("or", a, b).
+Query = Tuple
+# Chunk number -> bits of the ids in that chunk.
+Bitmap = Dict[int, int]
+
+CHUNK_SHIFT = 16
+CHUNK_IDS = 1 << CHUNK_SHIFT
+
+
+def normalize_tags(tags: Union[str, Iterable[str], None]) -> List[str]:
+    """Lowercase and deduplicate tags, given as a list or a comma-separated
+    string."""
+    if tags is None:
+        return []
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    normalized: List[str] = []
+    for tag in tags:
+        if not isinstance(tag, str):
+            raise ValueError(f"invalid tag {tag!r}")
+        tag = tag.strip().lower()
+        if not tag:
+            continue
+        if tag in _OPERATORS or not _TAG.fullmatch(tag):
+            raise ValueError(f"invalid tag {tag!r}")
+        if tag not in normalized:
+            normalized.append(tag)
+    return normalized
+
+
+def parse_query(text: str) -> Query:
+    """Parse a tag query, raising ValueError if it is malformed."""
+    tokens = _TOKEN.findall(text)
+    position = 0
+
+    def peek() -> Optional[str]:
+        return tokens[position].lower() if position < len(tokens) else None
+
+    def take() -> str:
+        nonlocal position
+        if position >= len(tokens):
+            raise ValueError("unexpected end of tag query")
+        position += 1
+        return tokens[position - 1]
+
+    def expression() -> Query:
+        node = term()
+        while peek() == "or":
+            take()
+            node = ("or", node, term())
+        return node
+
+    def term() -> Query:
+        node = factor()
+        while peek() not in (None, "or", ")"):
+            if peek() == "and":
+                take()
+            node = ("and", node, factor())
+        return node
+
+    def factor() -> Query:
+        token = take()
+        if token.lower() == "not":
+            return ("not", factor())
+        if token == "(":
+            node = expression()
+            if take() != ")":
+                raise ValueError("missing ')' in tag query")
+            return node
+        if token == ")" or token.lower() in _OPERATORS:
+            raise ValueError(f"unexpected {token!r} in tag query")
+        return ("tag", token.lower())
+
+    node = expression()
+    if position != len(tokens):
+        raise ValueError(f"unexpected {tokens[position]!r} in tag query")
+    return node
+
+
+def matches(query: Query, tags: Set[str]) -> bool:
+    """Evaluate a parsed query against one expense's tags."""
+    kind = query[0]
+    if kind == "tag":
+        return query[1] in tags
+    if kind == "not":
+        return not matches(query[1], tags)
+    if kind == "and":
+        return matches(query[1], tags) and matches(query[2], tags)
+    return matches(query[1], tags) or matches(query[2], tags)
+
+
+def iter_bits(bitmap: int) -> Iterator[int]:
+    """Yield the positions of the set bits of bitmap in ascending order."""
+    bits = bin(bitmap)[:1:-1]
+    position = bits.find("1")
+    while position != -1:
+        yield position
+        position = bits.find("1", position + 1)
+
+
+class TagIndex:
+    """Incrementally maintained bitmap per tag."""
+
+    def __init__(self):
+        self._bitmaps: Dict[str, Bitmap] = {}
+        # Every indexed id, the universe NOT is taken against.
+        self._all: Bitmap = {}
+
+    @staticmethod
+    def _set(bitmap: Bitmap, expense_id: int) -> None:
+        chunk = expense_id >> CHUNK_SHIFT
+        bitmap[chunk] = bitmap.get(chunk, 0) | 1 << (expense_id & CHUNK_IDS - 1)
+
+    @staticmethod
+    def _clear(bitmap: Bitmap, expense_id: int) -> None:
+        chunk = expense_id >> CHUNK_SHIFT
+        bits = bitmap.get(chunk, 0) & ~(1 << (expense_id & CHUNK_IDS - 1))
+        if bits:
+            bitmap[chunk] = bits
+        else:
+            bitmap.pop(chunk, None)
+
+    def add(self, expense) -> None:
+        self._set(self._all, expense.id)
+        for tag in expense.tags:
+            self._set(self._bitmaps.setdefault(tag, {}), expense.id)
+
+    def remove(self, expense) -> None:
+        """Remove an expense, which must still carry its indexed tags."""
+        self._clear(self._all, expense.id)
+        for tag in expense.tags:
+            bitmap = self._bitmaps.get(tag)
+            if bitmap is None:
+                continue
+            self._clear(bitmap, expense.id)
+            if not bitmap:
+                del self._bitmaps[tag]
+
+    def add_all(self, expenses: Iterable) -> None:
+        """Index many expenses, building each bitmap in one pass."""
+        ids: List[int] = []
+        ids_by_tag: Dict[str, List[int]] = {}
+        for expense in expenses:
+            ids.append(expense.id)
+            for tag in expense.tags:
+                ids_by_tag.setdefault(tag, []).append(expense.id)
+        # Setting bits one at a time would copy the growing chunks each time.
+        self._merge(self._all, ids)
+        for tag, tag_ids in ids_by_tag.items():
+            self._merge(self._bitmaps.setdefault(tag, {}), tag_ids)
+
+    @staticmethod
+    def _merge(bitmap: Bitmap, ids: List[int]) -> None:
+        """Set the bits of many ids, building each chunk once."""
+        buffers: Dict[int, bytearray] = {}
+        for expense_id in ids:
+            chunk = expense_id >> CHUNK_SHIFT
+            buffer = buffers.get(chunk)
+            if buffer is None:
+                buffer = buffers[chunk] = bytearray(CHUNK_IDS // 8)
+            offset = expense_id & CHUNK_IDS - 1
+            buffer[offset >> 3] |= 1 << (offset & 7)
+        for chunk, buffer in buffers.items():
+            bitmap[chunk] = bitmap.get(chunk, 0) | int.from_bytes(buffer, "little")
+
+    def evaluate(self, query: Query) -> Bitmap:
+        """Return the bitmap of expenses matching a parsed query.
+
+        The result may be one of the index's own bitmaps; do not change it.
+        """
+        kind = query[0]
+        if kind == "tag":
+            return self._bitmaps.get(query[1], {})
+        if kind == "not":
+            excluded = self.evaluate(query[1])
+            result = {
+                chunk: bits & ~excluded.get(chunk, 0)
+                for chunk, bits in self._all.items()
+            }
+        elif kind == "and":
+            left, right = self.evaluate(query[1]), self.evaluate(query[2])
+            if len(right) < len(left):
+                left, right = right, left
+            result = {chunk: bits & right.get(chunk, 0) for chunk, bits in left.items()}
+        else:
+            result = dict(self.evaluate(query[1]))
+            for chunk, bits in self.evaluate(query[2]).items():
+                result[chunk] = result.get(chunk, 0) | bits
+        return {chunk: bits for chunk, bits in result.items() if bits}
+
+    def search(self, query: str) -> List[int]:
+        """Return the ids of expenses matching a tag query, in id order."""
+        bitmap = self.evaluate(parse_query(query))
+        return [
+            chunk << CHUNK_SHIFT | position
+            for chunk in sorted(bitmap)
+            for position in iter_bits(bitmap[chunk])
+        ]
+
+    def tag_counts(self) -> Dict[str, int]:
+        """How many expenses carry each tag."""
+        return {
+            tag: sum(bin(bits).count("1") for bits in bitmap.values())
+            for tag, bitmap in sorted(self._bitmaps.items())
+        }
@@ -0,0 +1,96 @@
+"""
+Append-only journal of expense mutations.
+
+Each mutation is written as a single JSON line next to the snapshot file, so
+a write costs O(1) instead of re-serializing the whole expense list. The
+journal is replayed on top of the snapshot when loading and folded back into
+the snapshot (compacted) once it grows past a threshold.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class ExpenseJournal:
+    """Write-ahead journal for an expenses snapshot file."""
+
+    def __init__(self, snapshot_path: Path, compact_threshold: int = 1000):
+        self.snapshot_path = snapshot_path
+        self.file_path = snapshot_path.with_suffix(".journal")
+        self.compact_threshold = compact_threshold
+        self.entry_count = 0
+        # Until the journal header is checked against the snapshot, appends
+        # start a fresh journal rather than extending a stale one.
+        self.is_current = False
+        self.is_torn = False
+
+    def _snapshot_stamp(self) -> Optional[Dict[str, int]]:
+        """Identify the snapshot this journal was started against."""
+        try:
+            stat = self.snapshot_path.stat()
+        except FileNotFoundError:
+            return None
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        """Yield the journal entries that still apply to the snapshot."""
+        self.entry_count = 0
+        self.is_torn = False
+        if not self.file_path.exists():
+            return
+
+        with open(self.file_path, "r") as f:
+            header = f.readline()
+            try:
+                stamp = json.loads(header).get("snapshot")
+            except ValueError:
+                return
+            # The snapshot was rewritten after this journal was started, so
+            # its entries are already part of the snapshot.
+            if stamp != self._snapshot_stamp():
+                return
+            self.is_current = True
+
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn trailing line from an interrupted append. Later
+                    # appends would land after it, so force a compaction.
+                    self.is_torn = True
+                    break
+                self.entry_count += 1
+                yield entry
+
+    def append(self, op: str, **fields: Any) -> None:
+        """Append a single mutation to the journal."""
+        self.append_many([{"op": op, **fields}])
+
+    def append_many(self, entries: List[Dict[str, Any]]) -> None:
+        """Append several mutations with a single write."""
+        if not self.is_current:
+            self.reset()
+        with open(self.file_path, "a") as f:
+            f.write("".join(json.dumps(entry) + "\n" for entry in entries))
+        self.entry_count += len(entries)
+
+    def reset(self) -> None:
+        """Start an empty journal against the current snapshot."""
+        tmp_path = self.file_path.with_suffix(".journal.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps({"snapshot": self._snapshot_stamp()}) + "\n")
+        os.replace(tmp_path, self.file_path)
+        self.entry_count = 0
+        self.is_current = True
+        self.is_torn = False
+
+    def needs_compaction(self, record_count: int = 0) -> bool:
+        """Check whether the journal has outgrown the compaction threshold.
+
+        The threshold grows with the number of live records, so the cost of
+        rewriting the snapshot stays amortized O(1) per journaled change.
+        """
+        threshold = max(self.compact_threshold, record_count)
+        return self.is_torn or self.entry_count >= threshold
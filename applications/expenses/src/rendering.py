@@ -0,0 +1,143 @@
+"""
+Buffered, paginated rendering of expense listings.
+
+Printing a listing with one print call per row spends most of its time in
+the calls rather than the output. ExpenseRenderer formats rows as the store
+iterator yields them, without collecting them first, and writes them in
+chunks of RENDER_CHUNK lines with one write each, so listing a large store
+to a file is bound by the file rather than the formatting.
+
+A listing can be paged:
+
+- with a page number, only that page of rows is formatted; the rows before
+  and after it are only counted and added to the total.
+- with a page size alone on a terminal, the listing stops after each page
+  like `more`: Enter shows the next page and q skips the rest.
+
+Either way the footer still gives the count and total of every match.
+"""
+
+import itertools
+import sys
+from typing import Iterable, Iterator, List, Optional, TextIO
+
+# Rows formatted before each write.
+RENDER_CHUNK = 4096
+# Page size when a page is asked for without one.
+DEFAULT_PAGE_SIZE = 50
+RULE = "-" * 40
+
+
+def format_expense(expense) -> str:
+    """One listing row: id, name, price, then the date and tags if any."""
+    date = f" ({expense.timestamp[:10]})" if expense.timestamp else ""
+    tags = f" [{', '.join(expense.tags)}]" if expense.tags else ""
+    return f"{expense.id}. {expense.name} - ${expense.price:.2f}{date}{tags}"
+
+
+class ExpenseRenderer:
+    """Writes expense listings with a running total, a chunk at a time."""
+
+    def __init__(
+        self,
+        page_size: Optional[int] = None,
+        page: Optional[int] = None,
+        out: Optional[TextIO] = None,
+        interactive: Optional[bool] = None,
+    ):
+        if page_size is not None and page_size < 1:
+            raise ValueError("page size must be at least 1")
+        if page is not None and page < 1:
+            raise ValueError("page must be at least 1")
+        self.page = page
+        self.page_size = page_size or (DEFAULT_PAGE_SIZE if page else None)
+        # None: whatever sys.stdout is when a listing is rendered, so
+        # redirecting stdout redirects listings too.
+        self.out = out
+        # Whether to pause between pages; None: when stdin and the output
+        # are both terminals.
+        self.interactive = interactive
+
+    def render(self, expenses: Iterable, title: str, empty_message: str) -> None:
+        """Write title, the expenses and their total, or empty_message if
+        there are none."""
+        out = self.out or sys.stdout
+        rows: Iterator = iter(expenses)
+        pausing = (
+            self.page is None
+            and self.page_size is not None
+            and (
+                self.interactive
+                if self.interactive is not None
+                else out.isatty() and sys.stdin.isatty()
+            )
+        )
+        first = (self.page - 1) * self.page_size if self.page else 0
+        count = shown = 0
+        total = 0.0
+        lines: List[str] = []
+        try:
+            for expense in itertools.islice(rows, first):
+                total += expense.price
+                count += 1
+
+            limit = self.page_size if self.page or pausing else None
+            while True:
+                for expense in itertools.islice(rows, limit):
+                    if not shown:
+                        lines += (title, RULE)
+                    lines.append(format_expense(expense))
+                    total += expense.price
+                    count += 1
+                    shown += 1
+                    if len(lines) >= RENDER_CHUNK:
+                        out.write("\n".join(lines) + "\n")
+                        lines = []
+                if not pausing or shown % limit:
+                    break
+                following = next(rows, None)
+                if following is None:
+                    break
+                rows = itertools.chain((following,), rows)
+                if lines:
+                    out.write("\n".join(lines) + "\n")
+                    lines = []
+                if not self._more(out):
+                    break
+
+            for expense in rows:
+                total += expense.price
+                count += 1
+        except Exception as e:
+            lines.append(f"Error loading expenses: {e}")
+
+        if not count:
+            lines.append(empty_message)
+        else:
+            if shown:
+                lines.append(RULE)
+            if self.page and not shown:
+                pages = -(-count // self.page_size)
+                lines.append(
+                    f"Page {self.page} is past the end: {count} "
+                    f"expenses on {pages} page(s)"
+                )
+            elif shown < count:
+                pages = -(-count // self.page_size)
+                where = f" (page {self.page} of {pages})" if self.page else ""
+                lines.append(
+                    f"Showing {first + 1}-{first + shown} of "
+                    f"{count} expenses{where}"
+                )
+            lines.append(f"Total: ${total:.2f}")
+        out.write("\n".join(lines) + "\n")
+        out.flush()
+
+    def _more(self, out: TextIO) -> bool:
+        """Ask whether to show the next page."""
+        out.flush()
+        try:
+            answer = input("-- More -- (Enter for the next page, q to stop) ")
+        except EOFError:
+            return False
+        return answer.strip().lower() != "q"
@@ -0,0 +1,202 @@
+"""
+Sharded expense storage.
+
+Instead of one expenses.json, expenses are split across N shard files in a
+directory next to it (expenses.shards/), either by id (id % N) or by the
+month of their timestamp, with a manifest recording which. Each shard is an
+ordinary JSON array in id order, so it reads like the single file.
+
+Loading, searching, totaling and sketching (see sketches.py) fan out
+across a process pool, one task per shard, and merge the partial results:
+shards are parsed on separate cores, and a full scan only sends back the
+matching records or a small per-shard summary. Saving rewrites only the
+shards that changed.
+
+The manifest is written after the shards, so if the very first save is
+interrupted the layout does not exist yet and expenses.json is still used.
+Once it is written the manager renames expenses.json to expenses.json.bak
+and keeps using the shards, whether or not shards are asked for.
+"""
+
+import heapq
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from expenses_core.aggregates import ExpenseStats
+from expenses_core.sketches import ExpenseSketches
+from expenses_core.streaming import iter_json_array
+
+SHARD_KEYS = ("id", "month")
+MANIFEST = "manifest.json"
+
+# One loaded record: (id, name, price, timestamp, tags). Tuples pickle much
+# faster than dicts on the way back from a worker.
+Record = Tuple[int, str, float, Optional[str], List[str]]
+
+
+def _read_shard(path: str) -> List[Record]:
+    """Parse a whole shard."""
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        data = json.load(f)
+    return [
+        (
+            item["id"],
+            item["name"],
+            item["price"],
+            item.get("timestamp"),
+            item.get("tags", []),
+        )
+        for item in data
+    ]
+
+
+def _summarize_shard(path: str) -> Tuple[int, float, Optional[float], Optional[float]]:
+    """(count, total, min, max) of the prices in a shard."""
+    if not os.path.exists(path):
+        return 0, 0.0, None, None
+    prices = [item["price"] for item in iter_json_array(Path(path))]
+    if not prices:
+        return 0, 0.0, None, None
+    return len(prices), math.fsum(prices), min(prices), max(prices)
+
+
+def _search_shard(path: str, query: str) -> List[Dict[str, Any]]:
+    """Records in a shard whose name contains query (lowercase)."""
+    if not os.path.exists(path):
+        return []
+    return [
+        item for item in iter_json_array(Path(path)) if query in item["name"].lower()
+    ]
+
+
+def _sketch_shard(path: str) -> ExpenseSketches:
+    """Quantile and distinct name sketches of a shard."""
+    sketches = ExpenseSketches()
+    if os.path.exists(path):
+        for item in iter_json_array(Path(path)):
+            sketches.prices.update(item["price"])
+            sketches.names.add(item["name"].lower())
+    return sketches
+
+
+class ShardLayout:
+    """A directory of shard files and the pool that reads them."""
+
+    def __init__(self, directory: Path, count: int = 4, key: str = "id"):
+        if key not in SHARD_KEYS:
+            raise ValueError(f"Unknown shard key: {key}")
+        if count < 1:
+            raise ValueError("The number of shards must be at least 1")
+        self.directory = directory
+        self.count = count
+        self.key = key
+        # An existing layout keeps the count and key it was written with.
+        if self.exists():
+            with open(directory / MANIFEST, "r") as f:
+                manifest = json.load(f)
+            self.count = manifest["shards"]
+            self.key = manifest["key"]
+
+    def exists(self) -> bool:
+        return (self.directory / MANIFEST).exists()
+
+    def path(self, shard: int) -> Path:
+        return self.directory / f"shard-{shard:03d}.json"
+
+    def shard_of(self, expense) -> int:
+        """The shard an expense is stored in."""
+        if self.key == "id":
+            return expense.id % self.count
+        if expense.timestamp is None:
+            return 0
+        # Consecutive months go to consecutive shards.
+        timestamp = expense.timestamp
+        return (int(timestamp[:4]) * 12 + int(timestamp[5:7])) % self.count
+
+    def _map(self, function, *args) -> list:
+        """Run function(shard path, *args) for every shard in a process pool
+        and return the results in shard order.
+
+        The pool only lives for the call, so no idle workers are left
+        behind between operations or at exit.
+        """
+        paths = [str(self.path(shard)) for shard in range(self.count)]
+        if self.count == 1:
+            return [function(paths[0], *args)]
+        with ProcessPoolExecutor(
+            max_workers=min(self.count, os.cpu_count() or 1)
+        ) as executor:
+            return list(
+                executor.map(function, paths, *([arg] * self.count for arg in args))
+            )
+
+    def load(self) -> Iterator[Record]:
+        """Parse every shard in parallel and yield the records in id order."""
+        return heapq.merge(*self._map(_read_shard))
+
+    def stats(self) -> ExpenseStats:
+        """Price statistics over all shards, summarized in parallel."""
+        summaries = self._map(_summarize_shard)
+        minimums = [summary[2] for summary in summaries if summary[0]]
+        maximums = [summary[3] for summary in summaries if summary[0]]
+        return ExpenseStats.from_summary(
+            sum(summary[0] for summary in summaries),
+            math.fsum(summary[1] for summary in summaries),
+            min(minimums, default=None),
+            max(maximums, default=None),
+        )
+
+    def sketches(self) -> ExpenseSketches:
+        """Sketches over all shards, built in parallel and merged."""
+        merged = ExpenseSketches()
+        for sketches in self._map(_sketch_shard):
+            merged.merge(sketches)
+        return merged
+
+    def search(self, query: str) -> Iterator[Dict[str, Any]]:
+        """Records whose name contains query, scanning shards in parallel;
+        in id order."""
+        return heapq.merge(
+            *self._map(_search_shard, query.lower()), key=lambda item: item["id"]
+        )
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Stream every record in id order without loading whole shards."""
+        return heapq.merge(
+            *(
+                iter_json_array(self.path(shard))
+                for shard in range(self.count)
+                if self.path(shard).exists()
+            ),
+            key=lambda item: item["id"],
+        )
+
+    def save(self, expenses: Iterable, shards: Set[int]) -> None:
+        """Rewrite the given shards from all the expenses."""
+        self.directory.mkdir(exist_ok=True)
+        records: Dict[int, List[dict]] = {shard: [] for shard in shards}
+        for expense in expenses:
+            shard_records = records.get(self.shard_of(expense))
+            if shard_records is not None:
+                shard_records.append(expense.to_dict())
+        for shard, shard_records in records.items():
+            self._write(self.path(shard), shard_records)
+        if not self.exists():
+            self._write(
+                self.directory / MANIFEST, {"shards": self.count, "key": self.key}
+            )
+
+    @staticmethod
+    def _write(path: Path, data) -> None:
+        # Write to a temporary file first so a crash never leaves a
+        # half-written shard behind.
+        tmp_path = path.with_suffix(".json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
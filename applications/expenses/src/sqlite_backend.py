@@ -0,0 +1,360 @@
+"""
+SQLite storage backend for ExpenseManager.
+
+Expenses live in a local SQLite database in WAL mode, so every change is a
+single-row statement committed on its own instead of a rewrite of the whole
+file. Searches, statistics, date ranges and tag queries are answered by
+SQL. Tags are stored on the row for reading and in an indexed expense_tags
+table for querying.
+
+Sketches, completions, fuzzy matches and reports have no SQL counterpart
+and use the cached indexes of ExpenseStorage. They are kept up to date by
+changes made through this backend and dropped when PRAGMA data_version
+shows that another connection has changed the database.
+
+Names are matched ignoring case with Python's str.lower, as in memory;
+SQL's LIKE and lower() only fold ASCII letters.
+"""
+
+import contextlib
+import json
+import sqlite3
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from expenses_core.aggregates import ExpenseStats
+from expenses_core.tag_index import parse_query
+from storage import ExpenseStorage
+
+
+class SqliteBackend(ExpenseStorage):
+    """Stores expenses in an indexed SQLite table."""
+
+    durable = True
+
+    def __init__(
+        self, db_path: Path, expense_type: Callable, import_path: Optional[Path] = None
+    ):
+        super().__init__()
+        self.db_path = db_path
+        self.expense_type = expense_type
+        self.conn = sqlite3.connect(str(db_path))
+        # Inside transaction(), changes are committed together at its end.
+        self.in_transaction = False
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.create_function("py_lower", 1, str.lower, deterministic=True)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS expenses ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "name TEXT NOT NULL, "
+                "price REAL NOT NULL, "
+                "timestamp TEXT, "
+                "tags TEXT NOT NULL DEFAULT '')"
+            )
+            columns = [
+                row[1] for row in self.conn.execute("PRAGMA table_info(expenses)")
+            ]
+            # Databases created before expenses had timestamps or tags.
+            if "timestamp" not in columns:
+                self.conn.execute("ALTER TABLE expenses ADD COLUMN timestamp TEXT")
+            if "tags" not in columns:
+                self.conn.execute(
+                    "ALTER TABLE expenses ADD COLUMN tags TEXT NOT NULL DEFAULT ''"
+                )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS expense_tags ("
+                "tag TEXT NOT NULL, "
+                "expense_id INTEGER NOT NULL, "
+                "PRIMARY KEY (tag, expense_id)) WITHOUT ROWID"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_expense_tags_expense "
+                "ON expense_tags(expense_id)"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_expenses_name ON expenses(name)"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_expenses_price ON expenses(price)"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_expenses_timestamp "
+                "ON expenses(timestamp)"
+            )
+
+        # Seed a brand new database from the existing JSON file.
+        if import_path is not None and import_path.exists() and not self.count():
+            with open(import_path, "r") as f:
+                data = json.load(f)
+            with self.conn:
+                for item in data:
+                    self._insert(
+                        item["name"],
+                        item["price"],
+                        item.get("timestamp"),
+                        item.get("tags", []),
+                        item.get("id"),
+                    )
+        # Changes whenever another connection commits.
+        self.data_version = self._data_version()
+
+    def _data_version(self) -> int:
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _refresh(self) -> None:
+        version = self._data_version()
+        if version != self.data_version:
+            self.data_version = version
+            self._drop_indexes()
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Commit every change made inside the block together, or none of
+        them if it raises."""
+        self.in_transaction = True
+        try:
+            with self.conn:
+                yield
+        except BaseException:
+            # The indexes already include the rolled back changes.
+            self._drop_indexes()
+            raise
+        finally:
+            self.in_transaction = False
+
+    def _writing(self):
+        """Context for a change: its own transaction, or the open one."""
+        if self.in_transaction:
+            return contextlib.nullcontext()
+        return self.conn
+
+    def _expense(self, row):
+        expense_id, name, price, timestamp, tags = row
+        return self.expense_type(
+            name=name,
+            price=price,
+            id=expense_id,
+            timestamp=timestamp,
+            tags=tags.split(",") if tags else [],
+        )
+
+    def _insert(
+        self,
+        name: str,
+        price: float,
+        timestamp: Optional[str],
+        tags: List[str],
+        expense_id: Optional[int] = None,
+    ) -> int:
+        """Insert one expense and its tags in the current transaction."""
+        cursor = self.conn.execute(
+            "INSERT INTO expenses (id, name, price, timestamp, tags) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (expense_id, name, price, timestamp, ",".join(tags)),
+        )
+        self._set_tags(cursor.lastrowid, tags)
+        return cursor.lastrowid
+
+    def _set_tags(self, expense_id: int, tags: List[str]) -> None:
+        self.conn.execute(
+            "DELETE FROM expense_tags WHERE expense_id = ?", (expense_id,)
+        )
+        self.conn.executemany(
+            "INSERT INTO expense_tags (tag, expense_id) VALUES (?, ?)",
+            ((tag, expense_id) for tag in tags),
+        )
+
+    def get(self, expense_id: int):
+        row = self.conn.execute(
+            "SELECT id, name, price, timestamp, tags FROM expenses WHERE id = ?",
+            (expense_id,),
+        ).fetchone()
+        return self._expense(row) if row else None
+
+    def _by_id(self, expense_ids: Iterable[int]) -> List:
+        """Fetch the expenses with the given ids in one query."""
+        expense_ids = list(expense_ids)
+        rows = self.conn.execute(
+            "SELECT id, name, price, timestamp, tags FROM expenses "
+            "WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(expense_ids),),
+        )
+        expenses = {row[0]: self._expense(row) for row in rows}
+        return [expenses[expense_id] for expense_id in expense_ids]
+
+    def add(
+        self,
+        name: str,
+        price: float,
+        expense_id: Optional[int] = None,
+        timestamp: Optional[str] = None,
+        tags: Iterable[str] = (),
+    ):
+        tags = list(tags)
+        with self._writing():
+            expense_id = self._insert(name, price, timestamp, tags, expense_id)
+        expense = self.expense_type(
+            name=name, price=price, id=expense_id, timestamp=timestamp, tags=tags
+        )
+        self._index_add(expense)
+        return expense
+
+    def add_many(
+        self, items: Iterable[Tuple[str, float, Optional[str], List[str]]]
+    ) -> List:
+        """Insert many (name, price, timestamp, tags) expenses in one
+        transaction."""
+        added = []
+        with self._writing():
+            for name, price, timestamp, tags in items:
+                expense_id = self._insert(name, price, timestamp, tags)
+                added.append(
+                    self.expense_type(
+                        name=name,
+                        price=price,
+                        id=expense_id,
+                        timestamp=timestamp,
+                        tags=list(tags),
+                    )
+                )
+        for index in self.indexes:
+            index.add_all(added)
+        return added
+
+    def update(
+        self,
+        expense_id: int,
+        name: Optional[str],
+        price: Optional[float],
+        tags: Optional[List[str]] = None,
+    ):
+        old = self.get(expense_id)
+        if old is None:
+            return None
+        with self._writing():
+            cursor = self.conn.execute(
+                "UPDATE expenses SET name = COALESCE(?, name), "
+                "price = COALESCE(?, price), tags = COALESCE(?, tags) "
+                "WHERE id = ?",
+                (name, price, None if tags is None else ",".join(tags), expense_id),
+            )
+            if tags is not None:
+                self._set_tags(expense_id, tags)
+        expense = self.get(expense_id)
+        self._index_remove(old)
+        self._index_add(expense)
+        return expense
+
+    def delete(self, expense_id: int):
+        expense = self.get(expense_id)
+        if expense is None:
+            return None
+        with self._writing():
+            self.conn.execute("DELETE FROM expenses WHERE id = ?", (expense_id,))
+            self.conn.execute(
+                "DELETE FROM expense_tags WHERE expense_id = ?", (expense_id,)
+            )
+        self._index_remove(expense)
+        return expense
+
+    def iter_expenses(self) -> Iterator:
+        cursor = self.conn.execute(
+            "SELECT id, name, price, timestamp, tags FROM expenses ORDER BY id"
+        )
+        for row in cursor:
+            yield self._expense(row)
+
+    def search(self, query: str) -> Iterator:
+        """Yield expenses whose name contains the lowercase query, ignoring
+        case."""
+        cursor = self.conn.execute(
+            "SELECT id, name, price, timestamp, tags FROM expenses "
+            "WHERE instr(py_lower(name), ?) ORDER BY id",
+            (query,),
+        )
+        for row in cursor:
+            yield self._expense(row)
+
+    def price_range(
+        self, low: Optional[float], high: Optional[float], top: Optional[int] = None
+    ) -> List:
+        """Expenses priced within [low, high] using the price index.
+
+        Cheapest first, or the `top` most expensive first when given.
+        """
+        sql = (
+            "SELECT id, name, price, timestamp, tags FROM expenses "
+            "WHERE price >= ? AND price <= ?"
+        )
+        params: list = [
+            float("-inf") if low is None else low,
+            float("inf") if high is None else high,
+        ]
+        if top is None:
+            sql += " ORDER BY price, id"
+        else:
+            sql += " ORDER BY price DESC, id DESC LIMIT ?"
+            params.append(top)
+        return [self._expense(row) for row in self.conn.execute(sql, params)]
+
+    def between(self, start: Optional[str], end: Optional[str]) -> List:
+        """Expenses timestamped within [start, end], oldest first.
+
+        `end` includes every timestamp it is a prefix of.
+        """
+        cursor = self.conn.execute(
+            "SELECT id, name, price, timestamp, tags FROM expenses "
+            "WHERE timestamp >= ? AND timestamp <= ? ORDER BY timestamp, id",
+            (start or "", (end or "") + "\uffff"),
+        )
+        return [self._expense(row) for row in cursor]
+
+    def monthly_stats(
+        self, start: Optional[str], end: Optional[str]
+    ) -> List[Tuple[str, ExpenseStats]]:
+        """(month, statistics) for each month from start to end."""
+        rows = self.conn.execute(
+            "SELECT substr(timestamp, 1, 7) AS month, COUNT(*), TOTAL(price), "
+            "MIN(price), MAX(price) FROM expenses "
+            "WHERE timestamp IS NOT NULL AND month >= ? AND month <= ? "
+            "GROUP BY month ORDER BY month",
+            ((start or "")[:7], (end or "\uffff")[:7]),
+        )
+        return [
+            (month, ExpenseStats.from_summary(*summary)) for month, *summary in rows
+        ]
+
+    def search_tags(self, query: str) -> List:
+        """Expenses matching a tag query, in id order. Raises ValueError
+        for a malformed query."""
+        params: list = []
+
+        def condition(node: tuple) -> str:
+            kind = node[0]
+            if kind == "tag":
+                params.append(node[1])
+                return "id IN (SELECT expense_id FROM expense_tags WHERE tag = ?)"
+            if kind == "not":
+                return f"NOT ({condition(node[1])})"
+            operator = " AND " if kind == "and" else " OR "
+            return f"({condition(node[1])}{operator}{condition(node[2])})"
+
+        sql = (
+            "SELECT id, name, price, timestamp, tags FROM expenses "
+            f"WHERE {condition(parse_query(query))} ORDER BY id"
+        )
+        return [self._expense(row) for row in self.conn.execute(sql, params)]
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM expenses").fetchone()[0]
+
+    def stats(self) -> ExpenseStats:
+        count, total, minimum, maximum = self.conn.execute(
+            "SELECT COUNT(*), TOTAL(price), MIN(price), MAX(price) FROM expenses"
+        ).fetchone()
+        return ExpenseStats.from_summary(count, total, minimum, maximum)
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,361 @@
+"""
+Storage interface of ExpenseManager.
+
+Loaded expenses are kept in one of three stores: a dict of Expense objects
+or compact columns (see columnar.py), both in a MemoryStorage, or an SQLite
+table (see sqlite_backend.py). Each is an ExpenseStorage and answers the
+same queries, so the manager only picks the store and never how a query is
+answered.
+
+The base class answers every query from secondary indexes (see
+INDEX_TYPES), each built from the stored expenses the first time a query
+needs it and then kept up to date by the store's own changes. A store that
+can answer a query natively, as SQL does for searches and ranges,
+overrides it; queries it cannot, such as sketches and fuzzy matching,
+still use the cached indexes instead of scanning every expense each time.
+"""
+
+import contextlib
+import threading
+from dataclasses import replace
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from columnar import ColumnarExpenses
+from expenses_core.aggregates import ExpenseStats
+from expenses_core.analytics import REPORTS, ExpenseAnalytics
+from expenses_core.autocomplete import AutocompleteIndex
+from expenses_core.fuzzy_index import DEFAULT_MAX_DISTANCE, BKTreeIndex
+from expenses_core.partitions import MonthlyPartitions
+from expenses_core.price_index import PriceIndex
+from expenses_core.search_index import TrigramIndex
+from expenses_core.sketches import ExpenseSketches
+from expenses_core.symbols import SymbolTable
+from expenses_core.tag_index import TagIndex
+
+# Secondary index attribute of ExpenseStorage -> its type.
+INDEX_TYPES = {
+    "aggregates": ExpenseStats,
+    "name_index": TrigramIndex,
+    "price_index": PriceIndex,
+    "name_completions": AutocompleteIndex,
+    "partitions": MonthlyPartitions,
+    "tag_index": TagIndex,
+    "sketches": ExpenseSketches,
+    "fuzzy_index": BKTreeIndex,
+}
+
+
+class ExpenseStorage:
+    """Stored expenses and the queries over them.
+
+    Subclasses implement get, add, add_many, update, delete and
+    iter_expenses, keeping the indexes up to date through _index_add and
+    _index_remove.
+    """
+
+    # Whether every change is saved by the store as it is made, leaving
+    # nothing for the manager to persist.
+    durable = False
+
+    def __init__(self, lock: Optional[threading.RLock] = None):
+        # Guards building the indexes against concurrent changes.
+        self.lock = lock or threading.RLock()
+        self._drop_indexes()
+
+    def _drop_indexes(self) -> None:
+        """Drop the secondary indexes; each is rebuilt when a query next
+        needs it."""
+        self.aggregates: Optional[ExpenseStats] = None
+        self.name_index: Optional[TrigramIndex] = None
+        self.price_index: Optional[PriceIndex] = None
+        self.name_completions: Optional[AutocompleteIndex] = None
+        self.partitions: Optional[MonthlyPartitions] = None
+        self.tag_index: Optional[TagIndex] = None
+        # Approximate price quantiles and distinct names.
+        self.sketches: Optional[ExpenseSketches] = None
+        self.fuzzy_index: Optional[BKTreeIndex] = None
+        # NumPy projection for analytics, dropped on every change. The
+        # projection itself is only built by the first report.
+        self.analytics = ExpenseAnalytics(self._projection_source)
+        # The indexes built so far.
+        self.indexes: list = [self.analytics]
+
+    def _refresh(self) -> None:
+        """Drop indexes that no longer match the stored expenses. Only
+        stores that can be changed by someone else need to."""
+
+    def _index(self, attribute: str):
+        """The secondary index kept in attribute, built from the stored
+        expenses if this is the first query to need it."""
+        with self.lock:
+            self._refresh()
+            index = getattr(self, attribute)
+            if index is None:
+                index = INDEX_TYPES[attribute]()
+                index.add_all(self.iter_expenses())
+                setattr(self, attribute, index)
+                self.indexes.append(index)
+            return index
+
+    def _index_add(self, expense) -> None:
+        for index in self.indexes:
+            index.add(expense)
+
+    def _index_remove(self, expense) -> None:
+        for index in self.indexes:
+            index.remove(expense)
+
+    def _projection_source(self) -> Iterable:
+        """What analytics projects: the expenses, or a columnar store."""
+        return self.iter_expenses()
+
+    def _by_id(self, expense_ids: Iterable[int]) -> List:
+        """The expenses with the given ids, in the same order."""
+        return [self.get(expense_id) for expense_id in expense_ids]
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Make the changes inside the block one unit. Stores that are not
+        durable leave this to whoever persists them."""
+        yield
+
+    def close(self) -> None:
+        """Release what the store holds open."""
+
+    def get(self, expense_id: int):
+        raise NotImplementedError
+
+    def add(
+        self,
+        name: str,
+        price: float,
+        expense_id: Optional[int] = None,
+        timestamp: Optional[str] = None,
+        tags: Iterable[str] = (),
+    ):
+        """Add an expense, numbered after the largest id unless one is
+        given, and return it."""
+        raise NotImplementedError
+
+    def add_many(
+        self, items: Iterable[Tuple[str, float, Optional[str], List[str]]]
+    ) -> List:
+        """Add many (name, price, timestamp, tags) expenses together and
+        return them."""
+        raise NotImplementedError
+
+    def update(
+        self,
+        expense_id: int,
+        name: Optional[str],
+        price: Optional[float],
+        tags: Optional[List[str]] = None,
+    ):
+        """Change the given fields, returning the updated expense or None
+        if there is no such id."""
+        raise NotImplementedError
+
+    def delete(self, expense_id: int):
+        """Delete an expense, returning it or None if there is no such id."""
+        raise NotImplementedError
+
+    def iter_expenses(self) -> Iterator:
+        """Yield every expense in id order."""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        return self.stats().count
+
+    def stats(self) -> ExpenseStats:
+        return self._index("aggregates")
+
+    def approx_stats(self) -> ExpenseSketches:
+        """Sketches of the price quantiles and the number of distinct names,
+        rebuilt once enough expenses have been removed."""
+        with self.lock:
+            sketches = self._index("sketches")
+            if sketches.needs_rebuild():
+                self.indexes.remove(sketches)
+                self.sketches = None
+                sketches = self._index("sketches")
+            return sketches
+
+    def search(self, query: str) -> Iterator:
+        """Expenses whose name contains the lowercase query, ignoring case,
+        in id order."""
+        return iter(self._by_id(self._index("name_index").search(query)))
+
+    def similar(self, query: str, max_distance: int = DEFAULT_MAX_DISTANCE) -> List:
+        """Expenses whose name is within max_distance edits of the
+        lowercase query, closest first."""
+        return self._by_id(self._index("fuzzy_index").search(query, max_distance))
+
+    def complete(self, prefix: str, k: int = 5) -> List[Tuple[str, int]]:
+        """Up to k (name, count) pairs of names starting with prefix, most
+        frequent first."""
+        return self._index("name_completions").complete(prefix, k)
+
+    def price_range(
+        self, low: Optional[float], high: Optional[float], top: Optional[int] = None
+    ) -> List:
+        """Expenses priced within [low, high], cheapest first, or the `top`
+        most expensive first when given."""
+        price_index = self._index("price_index")
+        if top is None:
+            return self._by_id(price_index.range(low, high))
+        return self._by_id(price_index.top(top, low, high))
+
+    def between(self, start: Optional[str], end: Optional[str]) -> List:
+        """Expenses timestamped within [start, end], oldest first."""
+        return self._by_id(self._index("partitions").ids_between(start, end))
+
+    def monthly_stats(
+        self, start: Optional[str], end: Optional[str]
+    ) -> List[Tuple[str, ExpenseStats]]:
+        """(month, statistics) for each month from start to end."""
+        return self._index("partitions").summaries(start, end)
+
+    def search_tags(self, query: str) -> List:
+        """Expenses matching a tag query, in id order. Raises ValueError
+        for a malformed query."""
+        return self._by_id(self._index("tag_index").search(query))
+
+    def report(self, name: str, **options) -> Any:
+        """Run the analytics report called name (see analytics.py)."""
+        if name not in REPORTS:
+            raise ValueError(f"Unknown report: {name}")
+        with self.lock:
+            self._refresh()
+            return getattr(self.analytics, name)(**options)
+
+
+class MemoryStorage(ExpenseStorage):
+    """Keeps the expenses in memory, keyed by id in id order, as expense
+    objects or, in columnar mode, as compact columns."""
+
+    def __init__(
+        self,
+        expense_type: Callable,
+        columnar: bool = False,
+        lock: Optional[threading.RLock] = None,
+    ):
+        self.expense_type = expense_type
+        self.columnar = columnar
+        self.expenses = ColumnarExpenses(expense_type) if columnar else {}
+        self.next_id = 1
+        # Stored expenses share one copy of each distinct name.
+        self.names = SymbolTable()
+        # While background saves may be writing the expenses out, a changed
+        # expense is replaced by a changed copy instead of changed in place.
+        self.copy_on_write = False
+        super().__init__(lock)
+
+    def _projection_source(self) -> Iterable:
+        # Columnar stores are projected from their columns directly.
+        return self.expenses if self.columnar else self.expenses.values()
+
+    def load(self, records: Iterable[tuple]) -> None:
+        """Store saved (id, name, price, timestamp, tags) records; the
+        indexes are built later, by the queries that need them."""
+        if self.columnar:
+            for expense_id, name, price, timestamp, tags in records:
+                self.expenses.add(
+                    expense_id, self.names.intern(name), price, timestamp, tags
+                )
+        else:
+            for expense_id, name, price, timestamp, tags in records:
+                self.expenses[expense_id] = self.expense_type(
+                    name=self.names.intern(name),
+                    price=price,
+                    id=expense_id,
+                    timestamp=timestamp,
+                    tags=tags,
+                )
+        self.next_id = max(self.expenses, default=0) + 1
+
+    def get(self, expense_id: int):
+        return self.expenses.get(expense_id)
+
+    def _store(
+        self,
+        name: str,
+        price: float,
+        expense_id: Optional[int],
+        timestamp: Optional[str],
+        tags: Iterable[str],
+    ):
+        """Add an expense without indexing it."""
+        if expense_id is None:
+            expense_id = self.next_id
+        self.next_id = max(self.next_id, expense_id + 1)
+        self.expenses[expense_id] = self.expense_type(
+            name=self.names.intern(name),
+            price=price,
+            id=expense_id,
+            timestamp=timestamp,
+            tags=list(tags),
+        )
+        return self.expenses[expense_id]
+
+    def add(
+        self,
+        name: str,
+        price: float,
+        expense_id: Optional[int] = None,
+        timestamp: Optional[str] = None,
+        tags: Iterable[str] = (),
+    ):
+        expense = self._store(name, price, expense_id, timestamp, tags)
+        self._index_add(expense)
+        return expense
+
+    def add_many(
+        self, items: Iterable[Tuple[str, float, Optional[str], List[str]]]
+    ) -> List:
+        """The expenses are stored first and then indexed together, each
+        index taking the whole batch through add_all."""
+        added = [
+            self._store(name, price, None, timestamp, tags)
+            for name, price, timestamp, tags in items
+        ]
+        for index in self.indexes:
+            index.add_all(added)
+        return added
+
+    def update(
+        self,
+        expense_id: int,
+        name: Optional[str],
+        price: Optional[float],
+        tags: Optional[List[str]] = None,
+    ):
+        expense = self.expenses.get(expense_id)
+        if expense is None:
+            return None
+        self._index_remove(expense)
+        if self.copy_on_write and not self.columnar:
+            expense = replace(expense)
+            self.expenses[expense_id] = expense
+        if name is not None:
+            self.names.release(expense.name)
+            expense.name = self.names.intern(name)
+        if price is not None:
+            expense.price = price
+        if tags is not None:
+            expense.tags = list(tags)
+        self._index_add(expense)
+        return expense
+
+    def delete(self, expense_id: int):
+        expense = self.expenses.get(expense_id)
+        if expense is None:
+            return None
+        self._index_remove(expense)
+        self.names.release(expense.name)
+        return self.expenses.pop(expense_id)
+
+    def iter_expenses(self) -> Iterator:
+        return iter(self.expenses.values())
+
+    def count(self) -> int:
+        return len(self.expenses)
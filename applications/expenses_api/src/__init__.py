@@ -0,0 +1,32 @@
+"""
+Expense management API.
+
+The server shares its indexes, statistics, locking and persistence modules
+with the expense CLI through the expenses_core package. It is installed
+with the project (see pyproject.toml); when running from a checkout it is
+imported straight from the CLI's src directory, without putting that
+directory, and so the CLI's own modules, on the import path.
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+
+def _import_expenses_core() -> None:
+    if "expenses_core" in sys.modules or importlib.util.find_spec("expenses_core"):
+        return
+    package_dir = (
+        Path(__file__).resolve().parents[2] / "expenses" / "src" / "expenses_core"
+    )
+    spec = importlib.util.spec_from_file_location(
+        "expenses_core",
+        package_dir / "__init__.py",
+        submodule_search_locations=[str(package_dir)],
+    )
+    package = importlib.util.module_from_spec(spec)
+    sys.modules["expenses_core"] = package
+    spec.loader.exec_module(package)
+
+
+_import_expenses_core()
@@ -1,16 +1,22 @@
-import requests
-from dataclasses import dataclass
-from typing import List, Optional, Dict, Any
 import json
-from pathlib import Path
+from dataclasses import dataclass
 from datetime import datetime
-from ..models import Expense
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from ..models import Expense, SymbolTable
 
 
 class ExpenseClient:
     def __init__(self, base_url: str = " http://127.0.0.1:5000"):
-        self.base_url = base_url.rstrip('/')
+        self.base_url = base_url.rstrip("/")
         self.session = requests.Session()
+        # Listings repeat the same names many times; every expense built by
+        # get_expenses shares one copy of each. Names are never released,
+        # as the client cannot tell when a listing is dropped.
+        self.names = SymbolTable()
 
     def _handle_response(self, response: requests.Response) -> Dict[str, Any]:
         """Handle API response and raise exceptions for errors."""
@@ -21,48 +27,85 @@ class ExpenseClient:
         """Get all expenses."""
         response = self.session.get(f"{self.base_url}/api/expenses")
         data = self._handle_response(response)
-        return [Expense(**item) for item in data]
+        expenses = []
+        for item in data:
+            item["name"] = self.names.intern(item["name"])
+            expenses.append(Expense(**item))
+        return expenses
 
     def add_expense(self, name: str, price: float) -> Expense:
         """Add a new expense."""
         data = {"name": name, "price": price}
-        response = self.session.post(
-            f"{self.base_url}/api/expenses",
-            json=data
-        )
+        response = self.session.post(f"{self.base_url}/api/expenses", json=data)
         data = self._handle_response(response)
         return Expense(**data)
 
-    def update_expense(self, index: int, name: Optional[str] = None, price: Optional[float] = None) -> Expense:
+    def get_expense(self, expense_id: int) -> Expense:
+        """Get a single expense by id."""
+        response = self.session.get(f"{self.base_url}/api/expenses/{expense_id}")
+        return Expense(**self._handle_response(response))
+
+    def update_expense(
+        self, expense_id: int, name: Optional[str] = None, price: Optional[float] = None
+    ) -> Expense:
         """Update an existing expense."""
         data = {}
         if name is not None:
-            data['name'] = name
+            data["name"] = name
         if price is not None:
-            data['price'] = price
+            data["price"] = price
 
         response = self.session.put(
-            f"{self.base_url}/api/expenses/{index}",
-            json=data
+            f"{self.base_url}/api/expenses/{expense_id}", json=data
         )
         data = self._handle_response(response)
         return Expense(**data)
 
-    def delete_expense(self, index: int) -> Expense:
+    def delete_expense(self, expense_id: int) -> Expense:
         """Delete an expense."""
-        response = self.session.delete(f"{self.base_url}/api/expenses/{index}")
+        response = self.session.delete(f"{self.base_url}/api/expenses/{expense_id}")
         data = self._handle_response(response)
         return Expense(**data)
 
+    def get_stats(self) -> Dict[str, Any]:
+        """Get count, total, min, max and mean of all expenses."""
+        response = self.session.get(f"{self.base_url}/api/expenses/stats")
+        return self._handle_response(response)
+
     def search_expenses(self, query: str) -> List[Expense]:
         """Search expenses by name."""
         response = self.session.get(
-            f"{self.base_url}/api/expenses/search",
-            params={"q": query}
+            f"{self.base_url}/api/expenses/search", params={"q": query}
         )
         data = self._handle_response(response)
         return [Expense(**item) for item in data]
 
+    def autocomplete(self, prefix: str, k: int = 5) -> List[Dict[str, Any]]:
+        """Suggest existing names starting with prefix, most frequent first."""
+        response = self.session.get(
+            f"{self.base_url}/api/expenses/autocomplete",
+            params={"prefix": prefix, "k": k},
+        )
+        return self._handle_response(response)
+
+
+def prompt_name(client: ExpenseClient) -> str:
+    """Ask for an expense name, offering completions for a trailing '*'."""
+    name = input("Enter expense name (end with * for suggestions): ")
+    if not name.endswith("*"):
+        return name
+
+    suggestions = client.autocomplete(name[:-1])
+    if not suggestions:
+        print("No suggestions.")
+        return input("Enter expense name: ")
+    for number, suggestion in enumerate(suggestions, start=1):
+        print(f"{number}. {suggestion['name']} ({suggestion['count']})")
+    choice = input("Pick a number or enter a name: ").strip()
+    if choice.isdigit() and 1 <= int(choice) <= len(suggestions):
+        return suggestions[int(choice) - 1]["name"]
+    return choice
+
 
 def main():
     client = ExpenseClient()
@@ -81,12 +124,11 @@ def main():
 
         try:
             if choice == "1":
-                name = input("Enter expense name: ")
+                name = prompt_name(client)
                 try:
                     price = float(input("Enter price: $"))
                     expense = client.add_expense(name, price)
-                    print(
-                        f"Added expense: {expense.name} - ${expense.price:.2f}")
+                    print(f"Added expense: {expense.name} - ${expense.price:.2f}")
                 except ValueError:
                     print("Invalid price! Please enter a number.")
 
@@ -98,26 +140,22 @@ def main():
 
                 print("\nExpense List:")
                 print("-" * 40)
-                for i, expense in enumerate(expenses, start=1):
-                    print(f"{i}. {expense.name} - ${expense.price:.2f}")
+                for expense in expenses:
+                    print(f"{expense.id}. {expense.name} - ${expense.price:.2f}")
 
                 try:
-                    index = int(
-                        input("\nEnter index to update (1-{}): ".format(len(expenses)))) - 1
-                    name = input(
-                        "Enter new name (press Enter to skip): ").strip()
-                    price_str = input(
-                        "Enter new price (press Enter to skip): ").strip()
+                    expense_id = int(input("\nEnter ID to update: "))
+                    name = input("Enter new name (press Enter to skip): ").strip()
+                    price_str = input("Enter new price (press Enter to skip): ").strip()
 
                     data = {}
                     if name:
-                        data['name'] = name
+                        data["name"] = name
                     if price_str:
-                        data['price'] = float(price_str)
+                        data["price"] = float(price_str)
 
-                    expense = client.update_expense(index, **data)
-                    print(
-                        f"Updated expense: {expense.name} - ${expense.price:.2f}")
+                    expense = client.update_expense(expense_id, **data)
+                    print(f"Updated expense: {expense.name} - ${expense.price:.2f}")
                 except ValueError:
                     print("Invalid input!")
 
@@ -129,17 +167,15 @@ def main():
 
                 print("\nExpense List:")
                 print("-" * 40)
-                for i, expense in enumerate(expenses, start=1):
-                    print(f"{i}. {expense.name} - ${expense.price:.2f}")
+                for expense in expenses:
+                    print(f"{expense.id}. {expense.name} - ${expense.price:.2f}")
 
                 try:
-                    index = int(
-                        input("\nEnter index to delete (1-{}): ".format(len(expenses)))) - 1
-                    expense = client.delete_expense(index)
-                    print(
-                        f"Deleted expense: {expense.name} - ${expense.price:.2f}")
+                    expense_id = int(input("\nEnter ID to delete: "))
+                    expense = client.delete_expense(expense_id)
+                    print(f"Deleted expense: {expense.name} - ${expense.price:.2f}")
                 except ValueError:
-                    print("Invalid index!")
+                    print("Invalid ID!")
 
             elif choice == "4":
                 expenses = client.get_expenses()
@@ -149,12 +185,12 @@ def main():
 
                 print("\nExpense List:")
                 print("-" * 40)
-                for i, expense in enumerate(expenses, start=1):
-                    print(f"{i}. {expense.name} - ${expense.price:.2f}")
+                for expense in expenses:
+                    print(f"{expense.id}. {expense.name} - ${expense.price:.2f}")
 
-                total = sum(expense.price for expense in expenses)
+                stats = client.get_stats()
                 print("-" * 40)
-                print(f"Total: ${total:.2f}")
+                print(f"Total: ${stats['total']:.2f}")
 
             elif choice == "5":
                 query = input("Enter search term: ")
@@ -165,8 +201,8 @@ def main():
 
                 print(f"\nExpenses matching '{query}':")
                 print("-" * 40)
-                for i, expense in enumerate(expenses, start=1):
-                    print(f"{i}. {expense.name} - ${expense.price:.2f}")
+                for expense in expenses:
+                    print(f"{expense.id}. {expense.name} - ${expense.price:.2f}")
 
                 total = sum(expense.price for expense in expenses)
                 print("-" * 40)
@@ -1,7 +1,13 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import List, Optional
 
 
 @dataclass
 class Expense:
     name: str
     price: float
+    id: Optional[int] = None
+    # ISO 8601 local time; None for expenses saved before timestamps.
+    timestamp: Optional[str] = None
+    # Lowercase tags such as "food" or "travel".
+    tags: List[str] = field(default_factory=list)
@@ -1,114 +1,795 @@
-from flask import Flask, request, jsonify
-from typing import List
+import heapq
 import json
+import math
+import os
+import threading
+from dataclasses import replace
 from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from flask import Flask, Response, jsonify, request
+
+from expenses_core.aggregates import ExpenseStats
+from expenses_core.analytics import REPORTS, ExpenseAnalytics
+from expenses_core.autocomplete import AutocompleteIndex, complete_by_scan
+from expenses_core.fuzzy_index import DEFAULT_MAX_DISTANCE, BKTreeIndex, levenshtein
+from expenses_core.locking import VersionLock
+from expenses_core.partitions import (
+    MonthlyPartitions,
+    in_range,
+    normalize_timestamp,
+    now_timestamp,
+)
+from expenses_core.persistence import DebouncedFlusher
+from expenses_core.price_index import PriceIndex
+from expenses_core.search_index import TrigramIndex
+from expenses_core.sketches import DEFAULT_QUANTILES, ExpenseSketches, parse_quantiles
+from expenses_core.streaming import assign_ids, iter_records
+from expenses_core.symbols import SymbolTable
+from expenses_core.tag_index import TagIndex, matches, normalize_tags, parse_query
+
 from ..models import Expense
 
 app = Flask(__name__)
 
 
 class ExpenseStore:
-    def __init__(self):
-        self.expenses: List[Expense] = []
-        self.load_expenses()
+    def __init__(
+        self,
+        lazy: bool = False,
+        durability: str = "always",
+        flush_interval: float = 1.0,
+        flush_every: int = 1000,
+        file_path: Optional[Path] = None,
+    ):
+        self.file_path = file_path or Path(__file__).parent.parent / "expenses.json"
+        # Expenses keyed by their stable id, in id order.
+        self.expenses: Dict[int, Expense] = {}
+        self.next_id = 1
+        # Loaded expenses share one copy of each distinct name.
+        self.names = SymbolTable()
+        self.name_index = TrigramIndex()
+        self.price_index = PriceIndex()
+        self.name_completions = AutocompleteIndex()
+        self.partitions = MonthlyPartitions()
+        self.tag_index = TagIndex()
+        self.sketches = ExpenseSketches()
+        self.analytics = ExpenseAnalytics(self.expenses.values)
+        self.aggregates = ExpenseStats()
+        # Built on the first fuzzy search, then maintained like the others.
+        self.fuzzy_index: Optional[BKTreeIndex] = None
+        self.indexes = [
+            self.name_index,
+            self.price_index,
+            self.name_completions,
+            self.partitions,
+            self.tag_index,
+            self.sketches,
+            self.analytics,
+            self.aggregates,
+        ]
+        # Serializes changes made by concurrent requests. Saves only hold it
+        # to take a snapshot, so reads are not held up while it is written.
+        self.lock = threading.RLock()
+        # Changes since the last save, replayed on top of the file if another
+        # process saved it meanwhile (see locking.py).
+        self.pending: List[Dict[str, Any]] = []
+        self.version_lock = VersionLock(self.file_path.with_suffix(".lock"))
+        self.version: Optional[int] = None
+        # Flushes take turns on their own lock; changes are marked dirty
+        # after self.lock is released, so a flush never runs under it.
+        self.flusher = DebouncedFlusher(
+            self.save_expenses,
+            threading.RLock(),
+            durability,
+            flush_interval,
+            flush_every,
+        )
+        # In lazy mode reads stream expenses.json and the expenses are only
+        # loaded into memory when a request needs to change them.
+        self.is_loaded = False
+        if not lazy:
+            self.load_expenses()
 
     def load_expenses(self):
-        file_path = Path(__file__).parent.parent / "expenses.json"
-        if file_path.exists():
+        self.names = SymbolTable()
+        version = self.version_lock.read()
+        if self.file_path.exists():
             try:
-                with open(file_path, 'r') as f:
+                with open(self.file_path, "r") as f:
                     data = json.load(f)
-                    self.expenses = [Expense(**item) for item in data]
+                    self.expenses = {
+                        item["id"]: self._load_expense(item)
+                        for item in assign_ids(data)
+                    }
             except Exception as e:
                 print(f"Error loading expenses: {e}")
-                self.expenses = []
+                self.expenses = {}
+        self.version = self.version_lock.confirm(version)
+        self.next_id = max(self.expenses, default=0) + 1
+        self.name_index = TrigramIndex()
+        self.price_index = PriceIndex()
+        self.name_completions = AutocompleteIndex()
+        self.partitions = MonthlyPartitions()
+        self.tag_index = TagIndex()
+        self.sketches = ExpenseSketches()
+        self.analytics = ExpenseAnalytics(self.expenses.values)
+        self.aggregates = ExpenseStats()
+        self.fuzzy_index = None
+        self.indexes = [
+            self.name_index,
+            self.price_index,
+            self.name_completions,
+            self.partitions,
+            self.tag_index,
+            self.sketches,
+            self.analytics,
+            self.aggregates,
+        ]
+        for index in self.indexes:
+            index.add_all(self.expenses.values())
+        # Set last: readers take the loaded path only once it is complete.
+        self.is_loaded = True
+
+    def _load_expense(self, item: Dict[str, Any]) -> Expense:
+        item["name"] = self.names.intern(item["name"])
+        return Expense(**item)
+
+    def ensure_loaded(self):
+        if not self.is_loaded:
+            # Checked again under the lock, so concurrent first requests
+            # load the file once.
+            with self.lock:
+                if not self.is_loaded:
+                    self.load_expenses()
 
-    def save_expenses(self):
-        file_path = Path(__file__).parent.parent / "expenses.json"
+    def iter_expenses(self) -> Iterator[Expense]:
+        if self.is_loaded:
+            # Copy the values so a streamed response is not disturbed by a
+            # concurrent add or delete.
+            yield from list(self.expenses.values())
+            return
+        if self.file_path.exists():
+            for item in iter_records(self.file_path):
+                yield Expense(**item)
+
+    def get_expense(self, expense_id: int) -> Optional[Expense]:
+        with self.lock:
+            self.ensure_loaded()
+            return self.expenses.get(expense_id)
+
+    def add_expense(
+        self,
+        name: str,
+        price: float,
+        timestamp: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+    ) -> Expense:
+        with self.lock:
+            self.ensure_loaded()
+            expense = Expense(
+                name=name,
+                price=price,
+                id=self.next_id,
+                timestamp=timestamp or now_timestamp(),
+                tags=tags or [],
+            )
+            self._apply_add(expense)
+            self.pending.append({"op": "add", "expense": expense})
+        # If another process saved meanwhile, the save may give the expense
+        # a new id.
+        self.flusher.mark_dirty()
+        return expense
+
+    def update_expense(
+        self, expense_id: int, name=None, price=None, tags=None
+    ) -> Optional[Expense]:
+        with self.lock:
+            self.ensure_loaded()
+            expense = self._apply_update(expense_id, name, price, tags)
+            if expense is None:
+                return None
+            self.pending.append(
+                {
+                    "op": "update",
+                    "id": expense_id,
+                    "name": name,
+                    "price": price,
+                    "tags": tags,
+                }
+            )
+        self.flusher.mark_dirty()
+        # The save may have merged in another process's changes, including
+        # deleting this expense.
+        return self.expenses.get(expense_id)
+
+    def delete_expense(self, expense_id: int) -> Optional[Expense]:
+        with self.lock:
+            self.ensure_loaded()
+            expense = self._apply_delete(expense_id)
+            if expense is None:
+                return None
+            self.pending.append({"op": "delete", "id": expense_id})
+        self.flusher.mark_dirty()
+        return expense
+
+    def _apply_add(self, expense: Expense) -> None:
+        expense.name = self.names.intern(expense.name)
+        # Index the expense before publishing it, and take it back out of
+        # the indexes that took it if one fails, so a bad expense never
+        # leaves the store half updated.
+        added = []
         try:
-            with open(file_path, 'w') as f:
-                json.dump([vars(expense)
-                          for expense in self.expenses], f, indent=2)
+            for index in self.indexes:
+                index.add(expense)
+                added.append(index)
+        except Exception:
+            for index in reversed(added):
+                index.remove(expense)
+            self.names.release(expense.name)
+            raise
+        self.next_id = max(self.next_id, expense.id + 1)
+        self.expenses[expense.id] = expense
+
+    def _apply_update(
+        self,
+        expense_id: int,
+        name: Optional[str],
+        price: Optional[float],
+        tags: Optional[List[str]],
+    ) -> Optional[Expense]:
+        expense = self.expenses.get(expense_id)
+        if expense is None:
+            return None
+        for index in self.indexes:
+            index.remove(expense)
+        # Replace the expense instead of changing it in place: a save may be
+        # writing the old object out.
+        expense = replace(expense)
+        self.expenses[expense_id] = expense
+        if name is not None:
+            self.names.release(expense.name)
+            expense.name = self.names.intern(name)
+        if price is not None:
+            expense.price = price
+        if tags is not None:
+            expense.tags = list(tags)
+        for index in self.indexes:
+            index.add(expense)
+        return expense
+
+    def _apply_delete(self, expense_id: int) -> Optional[Expense]:
+        expense = self.expenses.get(expense_id)
+        if expense is None:
+            return None
+        for index in self.indexes:
+            index.remove(expense)
+        del self.expenses[expense_id]
+        self.names.release(expense.name)
+        return expense
+
+    def stats(self) -> ExpenseStats:
+        if self.is_loaded:
+            return self.aggregates
+        stats = ExpenseStats()
+        stats.add_all(self.iter_expenses())
+        return stats
+
+    def approx_stats(self) -> ExpenseSketches:
+        """Sketches of the price quantiles and the number of distinct names,
+        rebuilt once enough expenses have been removed."""
+        if self.is_loaded:
+            with self.lock:
+                if self.sketches.needs_rebuild():
+                    position = self.indexes.index(self.sketches)
+                    self.sketches = ExpenseSketches()
+                    self.sketches.add_all(self.expenses.values())
+                    self.indexes[position] = self.sketches
+                return self.sketches
+        sketches = ExpenseSketches()
+        sketches.add_all(self.iter_expenses())
+        return sketches
+
+    def report(self, name: str, **options) -> Any:
+        """Run an analytics report by name over a cached NumPy projection.
+
+        Raises ValueError for an unknown report or option and RuntimeError
+        when NumPy is not installed.
+        """
+        if name not in REPORTS:
+            raise ValueError(f"Unknown report: {name}")
+        with self.lock:
+            if self.is_loaded:
+                analytics = self.analytics
+            else:
+                analytics = ExpenseAnalytics(self.iter_expenses)
+            return getattr(analytics, name)(**options)
+
+    def search_expenses(self, query: str) -> Iterator[Expense]:
+        if self.is_loaded:
+            # Collect the matches under the lock, so a concurrent change
+            # cannot alter the index or the store while they are read.
+            with self.lock:
+                found = [
+                    self.expenses[expense_id]
+                    for expense_id in self.name_index.search(query)
+                    if expense_id in self.expenses
+                ]
+            return iter(found)
+        return (
+            expense for expense in self.iter_expenses() if query in expense.name.lower()
+        )
+
+    def autocomplete(self, prefix: str, k: int = 5) -> List[Tuple[str, int]]:
+        """Up to k (name, count) pairs of names starting with prefix, most
+        frequent first."""
+        if self.is_loaded:
+            with self.lock:
+                return self.name_completions.complete(prefix, k)
+        return complete_by_scan(self.iter_expenses(), prefix, k)
+
+    def fuzzy_search_expenses(
+        self, query: str, max_distance: int = DEFAULT_MAX_DISTANCE
+    ) -> List[Expense]:
+        """Expenses whose name is within max_distance edits of query,
+        closest first."""
+        if self.is_loaded:
+            with self.lock:
+                if self.fuzzy_index is None:
+                    self.fuzzy_index = BKTreeIndex()
+                    self.fuzzy_index.add_all(self.expenses.values())
+                    self.indexes.append(self.fuzzy_index)
+                return [
+                    self.expenses[expense_id]
+                    for expense_id in self.fuzzy_index.search(query, max_distance)
+                ]
+
+        distances: Dict[str, int] = {}
+        ranked = []
+        for expense in self.iter_expenses():
+            name = expense.name.lower()
+            if name not in distances:
+                distances[name] = levenshtein(query, name)
+            if distances[name] <= max_distance:
+                ranked.append(((distances[name], name, expense.id), expense))
+        ranked.sort(key=lambda item: item[0])
+        return [expense for _, expense in ranked]
+
+    def expenses_with_tags(self, query: str) -> List[Expense]:
+        """Expenses matching a tag query such as "food AND NOT travel", in
+        id order. Raises ValueError for a malformed query."""
+        if self.is_loaded:
+            with self.lock:
+                return [
+                    self.expenses[expense_id]
+                    for expense_id in self.tag_index.search(query)
+                ]
+        parsed = parse_query(query)
+        return [
+            expense
+            for expense in self.iter_expenses()
+            if matches(parsed, set(expense.tags))
+        ]
+
+    def expenses_between(
+        self, start: Optional[str] = None, end: Optional[str] = None
+    ) -> List[Expense]:
+        """Expenses timestamped within [start, end], oldest first. `end`
+        includes every timestamp it is a prefix of."""
+        if self.is_loaded:
+            with self.lock:
+                return [
+                    self.expenses[expense_id]
+                    for expense_id in self.partitions.ids_between(start, end)
+                ]
+        matching = [
+            expense
+            for expense in self.iter_expenses()
+            if in_range(expense.timestamp, start, end)
+        ]
+        matching.sort(key=lambda e: (e.timestamp, e.id))
+        return matching
+
+    def monthly_stats(
+        self, start: Optional[str] = None, end: Optional[str] = None
+    ) -> List[Tuple[str, ExpenseStats]]:
+        """(month, statistics) for each month from start to end."""
+        if self.is_loaded:
+            with self.lock:
+                return self.partitions.summaries(start, end)
+        partitions = MonthlyPartitions()
+        partitions.add_all(self.iter_expenses())
+        return partitions.summaries(start, end)
+
+    def expenses_by_price(
+        self,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        top: Optional[int] = None,
+    ) -> List[Expense]:
+        """Expenses within [min_price, max_price], cheapest first, or the
+        `top` most expensive of them, most expensive first."""
+        if self.is_loaded:
+            with self.lock:
+                if top is None:
+                    ids = self.price_index.range(min_price, max_price)
+                else:
+                    ids = self.price_index.top(top, min_price, max_price)
+                return [self.expenses[expense_id] for expense_id in ids]
+
+        matching = (
+            expense
+            for expense in self.iter_expenses()
+            if (min_price is None or expense.price >= min_price)
+            and (max_price is None or expense.price <= max_price)
+        )
+        if top is None:
+            return sorted(matching, key=lambda e: (e.price, e.id))
+        return heapq.nlargest(top, matching, key=lambda e: (e.price, e.id))
+
+    def save_expenses(self) -> bool:
+        """Write the expenses to the file, returning whether it worked.
+
+        self.lock is only held to merge and take a snapshot of the
+        expenses; they are serialized and written after it is released.
+        Updates replace expenses instead of changing them, so the snapshot
+        stays as it was taken. The file lock is held throughout, so saves
+        still take turns.
+        """
+        if not self.is_loaded:
+            return True
+        try:
+            with self.version_lock as version:
+                with self.lock:
+                    if version != self.version:
+                        self._merge_changes()
+                    expenses = list(self.expenses.values())
+                    saved = len(self.pending)
+                # Replace the file in one step, so readers in other
+                # processes never see it half-written.
+                tmp_path = self.file_path.with_suffix(".json.tmp")
+                with open(tmp_path, "w") as f:
+                    json.dump([vars(expense) for expense in expenses], f, indent=2)
+                os.replace(tmp_path, self.file_path)
+                with self.lock:
+                    # Changes made during the write come after the saved ones.
+                    del self.pending[:saved]
+            self.version = self.version_lock.version
         except Exception as e:
             print(f"Error saving expenses: {e}")
+            return False
+        return True
+
+    def _merge_changes(self):
+        """Reload what another process saved since the expenses were loaded
+        and replay the pending changes on top of it.
+
+        Added expenses keep their id unless the other process used it
+        meanwhile; changes to expenses it deleted are dropped.
+        """
+        entries, self.pending = self.pending, []
+        self.load_expenses()
+        renumbered: Dict[int, int] = {}
+        for entry in entries:
+            if entry["op"] == "add":
+                # The same object, so callers holding it see its new id.
+                expense = entry["expense"]
+                if expense.id < self.next_id:
+                    renumbered[expense.id] = self.next_id
+                    expense.id = self.next_id
+                self._apply_add(expense)
+                self.pending.append(entry)
+                continue
+            expense_id = renumbered.get(entry["id"], entry["id"])
+            if entry["op"] == "update":
+                expense = self._apply_update(
+                    expense_id, entry["name"], entry["price"], entry["tags"]
+                )
+            else:
+                expense = self._apply_delete(expense_id)
+            if expense is not None:
+                self.pending.append({**entry, "id": expense.id})
+
+
+store = ExpenseStore(
+    lazy=os.environ.get("EXPENSES_LAZY") == "1",
+    durability=os.environ.get("EXPENSES_DURABILITY", "always"),
+    flush_interval=float(os.environ.get("EXPENSES_FLUSH_INTERVAL", "1.0")),
+    flush_every=int(os.environ.get("EXPENSES_FLUSH_EVERY", "1000")),
+)
 
 
-store = ExpenseStore()
+def stream_json_list(expenses: Iterator[Expense]) -> Response:
+    """Stream expenses as a JSON array without building the list first."""
 
+    def generate():
+        yield "["
+        for i, expense in enumerate(expenses):
+            yield ("," if i else "") + json.dumps(vars(expense))
+        yield "]"
 
-@app.route('/api/expenses', methods=['GET'])
+    return Response(generate(), mimetype="application/json")
+
+
+def optional_arg(name: str, convert):
+    """Convert a query parameter, returning None when it is absent."""
+    value = request.args.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        return convert(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {value}")
+
+
+def parse_price(value: Any) -> float:
+    """A price from a request body; NaN and infinity are not prices."""
+    price = float(value)
+    if not math.isfinite(price):
+        raise ValueError(f"invalid price {value!r}")
+    return price
+
+
+def normalize_bound(value: str) -> str:
+    """Validate a date range bound, keeping months ("2026-10") as given."""
+    if len(value) == 7:
+        normalize_timestamp(value + "-01")
+        return value
+    if len(value) == 10:
+        normalize_timestamp(value)
+        return value
+    return normalize_timestamp(value)
+
+
+@app.route("/api/expenses", methods=["GET"])
 def get_expenses():
-    """Get all expenses."""
-    return jsonify([vars(expense) for expense in store.expenses])
+    """Get all expenses, optionally filtered by tags, date or price.
 
+    `tags` takes a tag query such as "food AND NOT travel". `start` and
+    `end` (ISO dates, months or timestamps, both inclusive) select
+    expenses by timestamp, oldest first. Otherwise `min_price` and
+    `max_price` select a price range (cheapest first) and `top=N` returns
+    the N most expensive expenses in it instead.
+    """
+    if "tags" in request.args:
+        try:
+            expenses = store.expenses_with_tags(request.args["tags"])
+        except ValueError as e:
+            return jsonify({"error": f"Invalid tag query: {e}"}), 400
+        return stream_json_list(iter(expenses))
 
-@app.route('/api/expenses', methods=['POST'])
+    try:
+        start = optional_arg("start", normalize_bound)
+        end = optional_arg("end", normalize_bound)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if start is not None or end is not None:
+        return stream_json_list(iter(store.expenses_between(start, end)))
+
+    if not any(arg in request.args for arg in ("min_price", "max_price", "top")):
+        return stream_json_list(store.iter_expenses())
+
+    try:
+        min_price = optional_arg("min_price", float)
+        max_price = optional_arg("max_price", float)
+        top = optional_arg("top", int)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if top is not None and top < 0:
+        return jsonify({"error": "Invalid top: must not be negative"}), 400
+    return stream_json_list(iter(store.expenses_by_price(min_price, max_price, top)))
+
+
+@app.route("/api/expenses", methods=["POST"])
 def add_expense():
     """Add a new expense."""
     data = request.get_json()
-    if not data or 'name' not in data or 'price' not in data:
-        return jsonify({'error': 'Missing required fields'}), 400
+    if not isinstance(data, dict) or "name" not in data or "price" not in data:
+        return jsonify({"error": "Missing required fields"}), 400
+    if not isinstance(data["name"], str) or not data["name"].strip():
+        return jsonify({"error": "Invalid name"}), 400
 
     try:
-        expense = Expense(name=data['name'], price=float(data['price']))
-        store.expenses.append(expense)
-        store.save_expenses()
-        return jsonify(vars(expense)), 201
-    except ValueError:
-        return jsonify({'error': 'Invalid price'}), 400
+        price = parse_price(data["price"])
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid price"}), 400
+    timestamp = data.get("timestamp")
+    if timestamp is not None:
+        try:
+            timestamp = normalize_timestamp(timestamp)
+        except (TypeError, ValueError):
+            return jsonify({"error": "Invalid timestamp"}), 400
+    try:
+        tags = normalize_tags(data.get("tags"))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid tags: {e}"}), 400
 
+    expense = store.add_expense(data["name"], price, timestamp, tags)
+    return jsonify(vars(expense)), 201
+
+
+@app.route("/api/expenses/<int:expense_id>", methods=["GET"])
+def get_expense(expense_id):
+    """Get a single expense."""
+    expense = store.get_expense(expense_id)
+    if expense is None:
+        return jsonify({"error": "Expense not found"}), 404
+    return jsonify(vars(expense))
 
-@app.route('/api/expenses/<int:index>', methods=['PUT'])
-def update_expense(index):
-    """Update an existing expense."""
-    if index < 0 or index >= len(store.expenses):
-        return jsonify({'error': 'Invalid index'}), 404
 
+@app.route("/api/expenses/<int:expense_id>", methods=["PUT"])
+def update_expense(expense_id):
+    """Update an existing expense."""
     data = request.get_json()
-    if not data:
-        return jsonify({'error': 'No data provided'}), 400
+    if not data or not isinstance(data, dict):
+        return jsonify({"error": "No data provided"}), 400
+    name = data.get("name")
+    if name is not None and (not isinstance(name, str) or not name.strip()):
+        return jsonify({"error": "Invalid name"}), 400
 
-    expense = store.expenses[index]
-    if 'name' in data:
-        expense.name = data['name']
-    if 'price' in data:
+    price = None
+    if "price" in data:
         try:
-            expense.price = float(data['price'])
-        except ValueError:
-            return jsonify({'error': 'Invalid price'}), 400
+            price = parse_price(data["price"])
+        except (TypeError, ValueError):
+            return jsonify({"error": "Invalid price"}), 400
 
-    store.save_expenses()
+    tags = None
+    if "tags" in data:
+        try:
+            tags = normalize_tags(data["tags"])
+        except ValueError as e:
+            return jsonify({"error": f"Invalid tags: {e}"}), 400
+
+    expense = store.update_expense(expense_id, name, price, tags)
+    if expense is None:
+        return jsonify({"error": "Expense not found"}), 404
     return jsonify(vars(expense))
 
 
-@app.route('/api/expenses/<int:index>', methods=['DELETE'])
-def delete_expense(index):
+@app.route("/api/expenses/<int:expense_id>", methods=["DELETE"])
+def delete_expense(expense_id):
     """Delete an expense."""
-    if index < 0 or index >= len(store.expenses):
-        return jsonify({'error': 'Invalid index'}), 404
-
-    expense = store.expenses.pop(index)
-    store.save_expenses()
+    expense = store.delete_expense(expense_id)
+    if expense is None:
+        return jsonify({"error": "Expense not found"}), 404
     return jsonify(vars(expense))
 
 
-@app.route('/api/expenses/search', methods=['GET'])
+@app.route("/api/expenses/search", methods=["GET"])
 def search_expenses():
-    """Search expenses by name."""
-    query = request.args.get('q', '').lower()
+    """Search expenses by name.
+
+    With `fuzzy=1` names within `distance` edits of the query (default 2)
+    match too, closest first.
+    """
+    query = request.args.get("q", "").lower()
     if not query:
         return jsonify([])
 
-    matching_expenses = [
-        expense for expense in store.expenses
-        if query in expense.name.lower()
-    ]
-    return jsonify([vars(expense) for expense in matching_expenses])
+    if request.args.get("fuzzy") == "1":
+        try:
+            distance = optional_arg("distance", int)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if distance is None:
+            distance = DEFAULT_MAX_DISTANCE
+        if distance < 0:
+            return jsonify({"error": "Invalid distance: must not be negative"}), 400
+        return stream_json_list(iter(store.fuzzy_search_expenses(query, distance)))
+
+    return stream_json_list(store.search_expenses(query))
+
+
+@app.route("/api/expenses/autocomplete", methods=["GET"])
+def autocomplete_names():
+    """Suggest existing names for a prefix, most frequent first."""
+    prefix = request.args.get("prefix", "")
+    try:
+        k = optional_arg("k", int)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if k is None:
+        k = 5
+    if k < 0:
+        return jsonify({"error": "Invalid k: must not be negative"}), 400
+    return jsonify(
+        [
+            {"name": name, "count": count}
+            for name, count in store.autocomplete(prefix, k)
+        ]
+    )
+
+
+@app.route("/api/expenses/stats", methods=["GET"])
+def get_stats():
+    """Get count, total, min, max and mean of all expenses."""
+    return jsonify(store.stats().to_dict())
+
+
+# URL name -> (report, query parameter, parameter type).
+ANALYTICS_REPORTS = {
+    "histogram": ("histogram", "bins", int),
+    "by-name": ("totals_by_name", "limit", int),
+    "moving-average": ("moving_average", "window", int),
+    "outliers": ("outliers", "k", float),
+}
+
+
+@app.route("/api/expenses/analytics/<report>", methods=["GET"])
+def get_report(report):
+    """Run an analytics report over the expenses.
+
+    `histogram` takes `bins`, `by-name` takes `limit`, `moving-average`
+    takes `window` (days) and `outliers` takes `k`.
+    """
+    if report not in ANALYTICS_REPORTS:
+        return jsonify({"error": "Report not found"}), 404
+    name, option, convert = ANALYTICS_REPORTS[report]
+    try:
+        value = optional_arg(option, convert)
+        result = store.report(name, **({} if value is None else {option: value}))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 501
+    return jsonify(result)
+
+
+@app.route("/api/expenses/stats/approx", methods=["GET"])
+def get_approx_stats():
+    """Get estimated price quantiles and the estimated number of distinct
+    names.
+
+    `q` lists the quantiles as comma-separated fractions (default
+    "0.5,0.9,0.99"); each is returned under a key such as "p90".
+    """
+    try:
+        fractions = optional_arg("q", parse_quantiles) or DEFAULT_QUANTILES
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(store.approx_stats().to_dict(fractions))
+
+
+@app.route("/api/expenses/stats/names", methods=["GET"])
+def get_name_stats():
+    """Get how much memory sharing one copy of each name saves.
+
+    Only loaded expenses are counted, so this is all zeros in lazy mode
+    until the first change.
+    """
+    return jsonify(store.names.to_dict())
+
+
+@app.route("/api/expenses/stats/monthly", methods=["GET"])
+def get_monthly_stats():
+    """Get count, total, min, max and mean for each month.
+
+    `start` and `end` are optional months ("2026-10"), both inclusive.
+    """
+    try:
+        start = optional_arg("start", normalize_bound)
+        end = optional_arg("end", normalize_bound)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(
+        [
+            {"month": month, **stats.to_dict()}
+            for month, stats in store.monthly_stats(start, end)
+        ]
+    )
+
+
+@app.route("/api/expenses/flush", methods=["POST"])
+def flush_expenses():
+    """Write all pending changes to disk now."""
+    store.flusher.flush()
+    return jsonify({"pending": store.flusher.dirty})
 
 
 def main():
     app.run(debug=True, port=5000)
 
 
-if __name__ == '__main__':
+if __name__ == "__main__":
     main()
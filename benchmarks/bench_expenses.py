@@ -0,0 +1,479 @@
+"""
+Benchmarks for the expense stores.
+
+Generates synthetic expenses.json files (with timestamps and tags) and
+measures load, single-record
+lookup (get), save, add, update, delete, search and total for the CLI
+ExpenseManager (in each of its storage modes, including sharded and
+compressed) and the Flask app's ExpenseStore. The total and the lookups
+are also timed right after load ("cold_total", "get"), before anything is
+loaded for the lazy targets. Every target/size pair runs in its own process
+so peak RSS is measured in isolation, and the size of each target's
+snapshot on disk is recorded, as are the bytes a freshly loaded store
+holds per expense. Results are printed as a table and written to a JSON
+file for tracking regressions; a target holding more bytes per expense
+than its MEMORY_BUDGETS entry fails the run.
+
+Usage:
+    python benchmarks/bench_expenses.py
+    python benchmarks/bench_expenses.py --sizes 1000 1000000 --output out.json
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "applications" / "expenses" / "src"))
+sys.path.insert(0, str(ROOT_DIR / "applications" / "expenses_api"))
+
+DEFAULT_SIZES = [10**3, 10**4, 10**5]
+WORDS = [
+    "coffee",
+    "taxi",
+    "lunch",
+    "dinner",
+    "groceries",
+    "rent",
+    "fuel",
+    "books",
+    "movie",
+    "gym",
+    "pharmacy",
+    "parking",
+    "train",
+    "snacks",
+]
+TAGS = ["food", "travel", "work", "home", "health", "fun"]
+QUERIES = ["coffee", "tax", "groceries1", "ent", "zzz", "din", "k"]
+# Expenses are spread over the two years before this time.
+DATASET_END = datetime(2026, 1, 1)
+DATASET_SPAN_SECONDS = 2 * 365 * 24 * 3600
+# One shard per core, so sharded load and scans can use all of them.
+SHARDS = max(2, os.cpu_count() or 1)
+# Most bytes a freshly loaded store may hold per expense. Checked from
+# MEMORY_CHECK_SIZE expenses up, where fixed costs no longer dominate.
+MEMORY_BUDGETS = {
+    "manager": 512,
+    "manager-columnar": 80,
+    "store": 1024,
+}
+MEMORY_CHECK_SIZE = 10**4
+
+
+def generate_dataset(path: Path, size: int, seed: int) -> None:
+    """Write size synthetic expenses to path as a JSON array."""
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        f.write("[\n")
+        for expense_id in range(1, size + 1):
+            timestamp = DATASET_END - timedelta(
+                seconds=rng.randrange(DATASET_SPAN_SECONDS)
+            )
+            record = {
+                "name": f"{rng.choice(WORDS)}{rng.randrange(100)}",
+                "price": round(rng.uniform(0.5, 500), 2),
+                "id": expense_id,
+                "timestamp": timestamp.isoformat(),
+                "tags": rng.sample(TAGS, rng.randrange(3)),
+            }
+            f.write(("  " if expense_id == 1 else ",\n  ") + json.dumps(record))
+        f.write("\n]\n")
+
+
+class ManagerTarget:
+    """Adapts the CLI ExpenseManager to the benchmark operations."""
+
+    def __init__(self, file_path: Path, **options: Any):
+        # Imported here so module import time is not counted as load time.
+        from expense_manager import ExpenseManager
+
+        self.store_type = ExpenseManager
+        self.file_path = file_path
+        self.options = options
+        if options.get("storage_format") == "binary":
+            from binary_format import json_to_binary
+
+            self.file_path = file_path.with_suffix(".bin")
+            json_to_binary(file_path, self.file_path)
+        if options.get("storage_format") == "compressed":
+            from compressed_format import json_to_compressed
+
+            self.file_path = file_path.with_suffix(".jsonz")
+            json_to_compressed(
+                file_path, self.file_path, options.get("compression", "zlib")
+            )
+        if options.get("shards"):
+            # Split the dataset up front so load reads the shards.
+            self.store_type(
+                file_path=file_path, shards=options["shards"]
+            ).save_expenses()
+
+    def load(self) -> None:
+        self.store = self.store_type(file_path=self.file_path, **self.options)
+
+    def snapshot_bytes(self) -> int:
+        if self.options.get("shards"):
+            return sum(
+                path.stat().st_size
+                for path in self.file_path.with_suffix(".shards").iterdir()
+            )
+        if self.options.get("backend") == "sqlite":
+            return self.file_path.with_suffix(".db").stat().st_size
+        return self.file_path.stat().st_size
+
+    def get(self, expense_id: int) -> None:
+        self.store.get_expense(expense_id)
+
+    def prepare_save(self) -> None:
+        """Make the timed save write the whole snapshot. Lazy targets have
+        nothing loaded and sharded ones no dirty shard yet, so their save
+        would otherwise write nothing. (The SQLite backend commits every
+        change as it is made; its save never writes anything.)"""
+        self.store.ensure_loaded()
+        if self.options.get("shards"):
+            self.store.dirty_shards.update(range(self.store.shards.count))
+
+    def save(self) -> None:
+        self.store.save_expenses()
+
+    def add(self, name: str, price: float) -> None:
+        self.store.add_expense(name, price)
+
+    def update(self, expense_id: int, price: float) -> None:
+        self.store.update_expense(expense_id, price=price)
+
+    def delete(self, expense_id: int) -> None:
+        self.store.delete_expense(expense_id)
+
+    def search(self, query: str) -> None:
+        # Collect the matches, as StoreTarget does, rather than time
+        # search_expenses printing them.
+        list(self.store.expenses_matching(query))
+
+    def total(self) -> float:
+        return self.store.total_expenses()
+
+    def count(self) -> int:
+        return self.store.count_expenses()
+
+
+class StoreTarget:
+    """Adapts the Flask app's ExpenseStore to the benchmark operations."""
+
+    def __init__(self, file_path: Path):
+        from src.server.server import ExpenseStore
+
+        self.store_type = ExpenseStore
+        self.file_path = file_path
+
+    def load(self) -> None:
+        self.store = self.store_type(file_path=self.file_path)
+
+    def snapshot_bytes(self) -> int:
+        return self.file_path.stat().st_size
+
+    def prepare_save(self) -> None:
+        pass
+
+    def get(self, expense_id: int) -> None:
+        self.store.get_expense(expense_id)
+
+    def save(self) -> None:
+        self.store.save_expenses()
+
+    def add(self, name: str, price: float) -> None:
+        self.store.add_expense(name, price)
+
+    def update(self, expense_id: int, price: float) -> None:
+        self.store.update_expense(expense_id, price=price)
+
+    def delete(self, expense_id: int) -> None:
+        self.store.delete_expense(expense_id)
+
+    def search(self, query: str) -> None:
+        list(self.store.search_expenses(query))
+
+    def total(self) -> float:
+        return self.store.stats().total
+
+    def count(self) -> int:
+        return self.store.stats().count
+
+
+TARGETS: Dict[str, Callable[[Path], Any]] = {
+    "manager": lambda path: ManagerTarget(path),
+    "manager-journal": lambda path: ManagerTarget(path, journal=True),
+    "manager-columnar": lambda path: ManagerTarget(path, columnar=True),
+    "manager-sqlite": lambda path: ManagerTarget(path, backend="sqlite"),
+    "manager-binary": lambda path: ManagerTarget(path, storage_format="binary"),
+    "manager-compressed": lambda path: ManagerTarget(path, storage_format="compressed"),
+    "manager-compressed-lazy": lambda path: ManagerTarget(
+        path, storage_format="compressed", lazy=True
+    ),
+    "manager-compressed-lzma": lambda path: ManagerTarget(
+        path, storage_format="compressed", compression="lzma"
+    ),
+    "manager-sharded": lambda path: ManagerTarget(path, shards=SHARDS),
+    "manager-sharded-lazy": lambda path: ManagerTarget(path, shards=SHARDS, lazy=True),
+    "store": lambda path: StoreTarget(path),
+}
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Throughput and latency percentiles for a list of timings in seconds."""
+    ordered = sorted(latencies)
+    seconds = sum(ordered)
+
+    def percentile(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "seconds": seconds,
+        "ops_per_sec": len(ordered) / seconds if seconds else float("inf"),
+        "p50_ms": percentile(0.50),
+        "p99_ms": percentile(0.99),
+    }
+
+
+def timed(operation: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    operation()
+    return time.perf_counter() - start
+
+
+def loaded_bytes(target: Any) -> int:
+    """Bytes held by a freshly loaded store, replacing the target's."""
+    target.store = None
+    tracemalloc.start()
+    try:
+        target.load()
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(
+    target_name: str, dataset: str, size: int, ops: int, seed: int
+) -> Dict[str, Any]:
+    """Run every operation against one target; executed in a child process."""
+    rng = random.Random(seed)
+    work_dir = Path(tempfile.mkdtemp(prefix="expenses-bench-"))
+    file_path = work_dir / "expenses.json"
+    shutil.copy(dataset, file_path)
+    target = TARGETS[target_name](file_path)
+    results: Dict[str, Dict[str, float]] = {}
+
+    # The stores report every change on stdout; keep that out of the timings.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results["load"] = summarize([timed(target.load)])
+        # Before anything changes, so lazy targets total with a full scan
+        # and look records up in the snapshot file.
+        results["cold_total"] = summarize([timed(target.total)])
+        results["get"] = summarize(
+            [timed(lambda: target.get(rng.randint(1, size))) for _ in range(ops)]
+        )
+        snapshot_bytes = target.snapshot_bytes()
+        target.prepare_save()
+        results["save"] = summarize([timed(target.save)])
+
+        results["add"] = summarize(
+            [
+                timed(lambda: target.add(rng.choice(WORDS), rng.uniform(0.5, 500)))
+                for _ in range(ops)
+            ]
+        )
+
+        ids = rng.sample(range(1, size + 1), min(ops, size))
+        results["update"] = summarize(
+            [
+                timed(lambda: target.update(expense_id, rng.uniform(0.5, 500)))
+                for expense_id in ids
+            ]
+        )
+        results["delete"] = summarize(
+            [timed(lambda: target.delete(expense_id)) for expense_id in ids]
+        )
+
+        results["search"] = summarize(
+            [
+                timed(lambda: target.search(query))
+                for _ in range(max(1, ops // 100))
+                for query in QUERIES
+            ]
+        )
+        results["total"] = summarize(
+            [timed(target.total) for _ in range(max(1, ops // 100))]
+        )
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak_rss //= 1024
+    # Measured last, as tracing allocations slows everything down and
+    # would inflate the peak RSS.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        memory = loaded_bytes(target)
+        count = target.count()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        "target": target_name,
+        "size": size,
+        "operations": results,
+        "snapshot_bytes": snapshot_bytes,
+        "peak_rss_kb": peak_rss,
+        "loaded_bytes_per_expense": memory / count if count else 0.0,
+    }
+
+
+def available_targets(names: List[str]) -> List[str]:
+    """Drop targets whose dependencies are not installed."""
+    available = []
+    for name in names:
+        if name == "store":
+            try:
+                import flask  # noqa: F401
+            except ImportError:
+                print("Skipping 'store': Flask is not installed")
+                continue
+        available.append(name)
+    return available
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    header = (
+        f"{'target':<25}{'size':>10}  {'operation':<9}"
+        f"{'ops/s':>12}{'p50 ms':>10}{'p99 ms':>10}"
+    )
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        for operation, summary in result["operations"].items():
+            print(
+                f"{result['target']:<25}{result['size']:>10}  {operation:<9}"
+                f"{summary['ops_per_sec']:>12.1f}{summary['p50_ms']:>10.3f}"
+                f"{summary['p99_ms']:>10.3f}"
+            )
+        print(
+            f"{result['target']:<25}{result['size']:>10}  peak RSS "
+            f"{result['peak_rss_kb'] / 1024:.1f} MiB, snapshot "
+            f"{result['snapshot_bytes'] / 1024:.1f} KiB, loaded "
+            f"{result['loaded_bytes_per_expense']:.1f} B/expense"
+        )
+
+
+def memory_regressions(results: List[Dict[str, Any]]) -> List[str]:
+    """Describe each result holding more bytes per expense than its
+    target's budget."""
+    return [
+        f"{result['target']} with {result['size']} expenses holds "
+        f"{result['loaded_bytes_per_expense']:.1f} bytes per expense, "
+        f"over its budget of {MEMORY_BUDGETS[result['target']]}"
+        for result in results
+        if result["target"] in MEMORY_BUDGETS
+        and result["size"] >= MEMORY_CHECK_SIZE
+        and result["loaded_bytes_per_expense"] > MEMORY_BUDGETS[result["target"]]
+    ]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the expense stores.")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="dataset sizes to generate (default: 10^3 10^4 10^5)",
+    )
+    parser.add_argument(
+        "--targets",
+        nargs="+",
+        choices=list(TARGETS),
+        default=list(TARGETS),
+        help="stores to benchmark",
+    )
+    parser.add_argument(
+        "--ops", type=int, default=200, help="timed adds, updates and deletes per case"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=42, help="random seed for datasets and operations"
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path("bench_results.json"),
+        help="where to write the JSON results",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    targets = available_targets(args.targets)
+    results = []
+    data_dir = Path(tempfile.mkdtemp(prefix="expenses-data-"))
+    try:
+        for size in args.sizes:
+            dataset = data_dir / f"expenses-{size}.json"
+            generate_dataset(dataset, size, args.seed)
+            for target_name in targets:
+                print(f"Running {target_name} with {size} expenses...")
+                # A fresh process per case keeps peak RSS and caches separate.
+                # Unlike multiprocessing.Pool workers, it may start its own
+                # worker processes, which the sharded targets need.
+                with ProcessPoolExecutor(
+                    1, mp_context=multiprocessing.get_context("spawn")
+                ) as pool:
+                    results.append(
+                        pool.submit(
+                            run_case,
+                            target_name,
+                            str(dataset),
+                            size,
+                            args.ops,
+                            args.seed,
+                        ).result()
+                    )
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    print()
+    print_table(results)
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "ops": args.ops,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    regressions = memory_regressions(results)
+    for regression in regressions:
+        print(f"Memory regression: {regression}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
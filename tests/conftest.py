@@ -0,0 +1,63 @@
+"""
+Shared fixtures for the expense application tests.
+
+The CLI modules are imported the way expense_manager.py imports them, from
+applications/expenses/src, and the API as the src package of
+applications/expenses_api.
+"""
+
+import json
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+CLI_SRC = ROOT_DIR / "applications" / "expenses" / "src"
+API_DIR = ROOT_DIR / "applications" / "expenses_api"
+sys.path.insert(0, str(CLI_SRC))
+sys.path.insert(0, str(API_DIR))
+
+
+def make_records(count: int):
+    """Expense records with ids 1..count, timestamps over several months
+    and a mix of tags."""
+    return [
+        {
+            "name": f"item{expense_id % 7}",
+            "price": round(expense_id * 1.25, 2),
+            "id": expense_id,
+            "timestamp": f"2026-{expense_id % 9 + 1:02d}-15T12:00:00",
+            "tags": ["food"] if expense_id % 2 else ["travel", "work"],
+        }
+        for expense_id in range(1, count + 1)
+    ]
+
+
+@pytest.fixture
+def records():
+    return make_records(50)
+
+
+@pytest.fixture
+def expense_file(tmp_path, records):
+    """An expenses.json snapshot holding the records fixture."""
+    path = tmp_path / "expenses.json"
+    path.write_text(json.dumps(records, indent=2))
+    return path
+
+
+def stored(path: Path):
+    """The records of a JSON snapshot, keyed by id."""
+    return {record["id"]: record for record in json.loads(path.read_text())}
+
+
+def run_python(code: str, *args: str) -> subprocess.Popen:
+    """Start a Python process running code with the CLI modules importable."""
+    return subprocess.Popen(
+        [sys.executable, "-c", textwrap.dedent(code), *args],
+        cwd=CLI_SRC,
+        stdout=subprocess.DEVNULL,
+    )
@@ -0,0 +1,90 @@
+"""Running price aggregates (user-005)."""
+
+import math
+import random
+
+import pytest
+
+from expense_manager import Expense, ExpenseManager
+from expenses_core.aggregates import ExpenseStats
+
+
+def expected(expenses):
+    prices = [expense.price for expense in expenses]
+    if not prices:
+        return {"count": 0, "total": 0.0, "min": None, "max": None, "mean": None}
+    return {
+        "count": len(prices),
+        "total": math.fsum(prices),
+        "min": min(prices),
+        "max": max(prices),
+        "mean": math.fsum(prices) / len(prices),
+    }
+
+
+def test_random_adds_and_removes_match_a_recount():
+    rng = random.Random(5)
+    stats = ExpenseStats()
+    live = []
+    for expense_id in range(1, 5001):
+        if live and rng.random() < 0.45:
+            gone = live.pop(rng.randrange(len(live)))
+            stats.remove(gone)
+        else:
+            expense = Expense("x", rng.choice([0.1, 0.2, 0.3, 1e6, 7.25]), expense_id)
+            stats.add(expense)
+            live.append(expense)
+        assert stats.to_dict() == pytest.approx(expected(live))
+
+
+def test_removing_the_extremes_finds_the_next_ones():
+    stats = ExpenseStats()
+    expenses = [Expense("x", float(price), price) for price in range(1, 101)]
+    stats.add_all(expenses)
+    for low, high in zip(expenses[:49], reversed(expenses[51:])):
+        stats.remove(low)
+        stats.remove(high)
+        assert (stats.minimum, stats.maximum) == (low.price + 1, high.price - 1)
+
+    # The heaps are rebuilt rather than left to fill up with gone prices.
+    assert len(stats._low) <= 2 * len(stats._prices) + 64
+
+
+def test_total_does_not_drift():
+    stats = ExpenseStats()
+    keep = Expense("keep", 0.1, 1)
+    stats.add(keep)
+    for expense_id in range(2, 10002):
+        expense = Expense("x", 1e8 + 0.1, expense_id)
+        stats.add(expense)
+        stats.remove(expense)
+
+    assert stats.total == 0.1
+    stats.remove(keep)
+    assert stats.to_dict() == expected([])
+
+
+def test_non_finite_prices_are_left_out():
+    stats = ExpenseStats()
+    for expense_id, price in enumerate([math.nan, math.inf, 2.0, -math.inf], 1):
+        stats.add(Expense("x", price, expense_id))
+    stats.remove(Expense("x", math.nan, 1))
+
+    assert stats.to_dict() == expected([Expense("x", 2.0, 3)])
+
+
+def test_manager_and_server_stats_follow_changes(expense_file, records, monkeypatch):
+    from src.server import server
+
+    manager = ExpenseManager(file_path=expense_file)
+    manager.update_expense(1, price=500.0)
+    manager.delete_expense(50)
+    manager.add_expense("new", 0.5)
+    live = list(manager.iter_expenses())
+    assert manager.stats().to_dict() == pytest.approx(expected(live))
+
+    monkeypatch.setattr(server, "store", server.ExpenseStore(file_path=expense_file))
+    client = server.app.test_client()
+    client.delete("/api/expenses/2")
+    live = [expense for expense in live if expense.id != 2]
+    assert client.get("/api/expenses/stats").get_json() == pytest.approx(expected(live))
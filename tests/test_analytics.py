@@ -0,0 +1,136 @@
+"""NumPy analytics reports (user-020)."""
+
+import math
+import statistics
+from collections import defaultdict
+from datetime import date, timedelta
+
+import pytest
+
+from expense_manager import Expense, ExpenseManager
+from expenses_core import analytics
+from expenses_core.analytics import ExpenseAnalytics
+
+pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def expenses():
+    return [
+        Expense(
+            f"item{n % 4}",
+            float(n % 17) * 2.5 + (400.0 if n % 29 == 0 else 0.0),
+            n,
+            f"2026-03-{n % 20 + 1:02d}T10:00:00" if n % 3 else None,
+        )
+        for n in range(1, 101)
+    ]
+
+
+def test_histogram_counts_every_expense(expenses):
+    bins = ExpenseAnalytics(lambda: expenses).histogram(bins=5)
+
+    assert len(bins) == 5
+    assert sum(row["count"] for row in bins) == len(expenses)
+    assert bins[0]["low"] == min(e.price for e in expenses)
+    assert bins[-1]["high"] == max(e.price for e in expenses)
+
+
+def test_totals_by_name_match_a_loop(expenses):
+    totals = defaultdict(float)
+    counts = defaultdict(int)
+    for expense in expenses:
+        totals[expense.name] += expense.price
+        counts[expense.name] += 1
+
+    rows = ExpenseAnalytics(lambda: expenses).totals_by_name()
+    assert [row["total"] for row in rows] == sorted(totals.values(), reverse=True)
+    for row in rows:
+        assert row["total"] == pytest.approx(totals[row["name"]])
+        assert row["count"] == counts[row["name"]]
+    assert len(ExpenseAnalytics(lambda: expenses).totals_by_name(limit=2)) == 2
+
+
+def test_moving_average_covers_every_day(expenses):
+    daily = defaultdict(float)
+    for expense in expenses:
+        if expense.timestamp:
+            daily[date.fromisoformat(expense.timestamp[:10])] += expense.price
+
+    rows = ExpenseAnalytics(lambda: expenses).moving_average(window=3)
+    first = min(daily)
+    assert [row["date"] for row in rows] == [
+        str(first + timedelta(days=n)) for n in range(len(rows))
+    ]
+    for n, row in enumerate(rows):
+        days = [first + timedelta(days=d) for d in range(max(n - 2, 0), n + 1)]
+        assert row["total"] == pytest.approx(daily[days[-1]])
+        assert row["average"] == pytest.approx(
+            sum(daily[day] for day in days) / len(days)
+        )
+
+
+def test_outliers_use_tukey_fences(expenses):
+    q1, _, q3 = statistics.quantiles(
+        [e.price for e in expenses], n=4, method="inclusive"
+    )
+    report = ExpenseAnalytics(lambda: expenses).outliers()
+
+    assert report["low"] == pytest.approx(q1 - 1.5 * (q3 - q1))
+    assert report["high"] == pytest.approx(q3 + 1.5 * (q3 - q1))
+    assert sorted(row["id"] for row in report["expenses"]) == [29, 58, 87]
+
+
+def test_empty_and_invalid_reports():
+    empty = ExpenseAnalytics(list)
+
+    assert empty.histogram() == []
+    assert empty.totals_by_name() == []
+    assert empty.moving_average() == []
+    assert empty.outliers() == {"low": None, "high": None, "expenses": []}
+    for report, options in [
+        ("histogram", {"bins": 0}),
+        ("totals_by_name", {"limit": 0}),
+        ("moving_average", {"window": 0}),
+        ("outliers", {"k": -1}),
+    ]:
+        with pytest.raises(ValueError):
+            getattr(empty, report)(**options)
+
+
+def test_reports_need_numpy(monkeypatch, expenses):
+    monkeypatch.setattr(analytics, "np", None)
+
+    with pytest.raises(RuntimeError):
+        ExpenseAnalytics(lambda: expenses).histogram()
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_manager_reports_follow_changes(expense_file, columnar):
+    manager = ExpenseManager(columnar=columnar, file_path=expense_file)
+    dict_manager = ExpenseManager(file_path=expense_file)
+    assert manager.report("totals_by_name") == dict_manager.report("totals_by_name")
+
+    manager.add_expense("big", 1000.0)
+    manager.delete_expense(50)
+    rows = manager.report("totals_by_name", limit=1)
+    assert rows == [{"name": "big", "count": 1, "total": 1000.0}]
+    assert [row["id"] for row in manager.report("outliers")["expenses"]] == [51]
+    with pytest.raises(ValueError):
+        manager.report("median")
+
+
+def test_server_reports(expense_file, monkeypatch):
+    from src.server import server
+
+    monkeypatch.setattr(server, "store", server.ExpenseStore(file_path=expense_file))
+    client = server.app.test_client()
+
+    response = client.get("/api/expenses/analytics/histogram?bins=4")
+    assert [row["count"] for row in response.get_json()] == [13, 12, 12, 13]
+    assert client.get("/api/expenses/analytics/histogram?bins=0").status_code == 400
+    assert client.get("/api/expenses/analytics/median").status_code == 404
+    assert math.isclose(
+        sum(row["total"] for row in client.get("/api/expenses/analytics/by-name").json),
+        sum(expense.price for expense in server.store.iter_expenses()),
+    )
@@ -0,0 +1,102 @@
+"""Prefix autocomplete (user-014)."""
+
+import random
+
+import pytest
+
+from expense_manager import Expense, ExpenseManager
+from expenses_core import autocomplete
+from expenses_core.autocomplete import AutocompleteIndex, complete_by_scan
+
+NAMES = ["Coffee", "coffee", "Cola", "cake", "Car rent", "card fee", "candy", "tea"]
+
+
+def sample_expenses(count: int, seed: int = 14, names=NAMES):
+    rng = random.Random(seed)
+    return [
+        Expense(rng.choice(names[: rng.randint(1, len(names))]), 1.0, expense_id)
+        for expense_id in range(1, count + 1)
+    ]
+
+
+@pytest.fixture
+def small_cache(monkeypatch):
+    monkeypatch.setattr(autocomplete, "CACHE_SIZE", 3)
+
+
+@pytest.mark.parametrize("build", ["add", "add_all"])
+def test_completions_match_a_scan(small_cache, build):
+    expenses = sample_expenses(300)
+    index = AutocompleteIndex()
+    if build == "add":
+        for expense in expenses:
+            index.add(expense)
+    else:
+        index.add_all(expenses)
+
+    for prefix in ["", "c", "CA", "car", "coffee", "t", "x"]:
+        for k in [1, 3, 5]:
+            assert index.complete(prefix, k) == complete_by_scan(expenses, prefix, k)
+    assert len(index) == len(expenses)
+
+
+def test_removing_a_cached_name_marks_the_cache_stale(small_cache):
+    index = AutocompleteIndex()
+    expenses = [
+        Expense(name, 1.0, expense_id)
+        for expense_id, name in enumerate(
+            ["cola"] * 5 + ["cake"] * 4 + ["candy"] * 3 + ["car"] * 2, start=1
+        )
+    ]
+    index.add_all(expenses)
+    assert index.complete("c", 3) == [("cola", 5), ("cake", 4), ("candy", 3)]
+
+    for expense in [e for e in expenses if e.name == "cola"][:4]:
+        index.remove(expense)
+        expenses.remove(expense)
+    node = index._path("c", create=False)[-1]
+    assert node.stale
+
+    # "car" was outside the full cache and now belongs in it.
+    assert index.complete("c", 3) == [("cake", 4), ("candy", 3), ("car", 2)]
+    assert not node.stale
+    assert index.complete("c", 3) == complete_by_scan(expenses, "c", 3)
+
+
+def test_random_adds_and_removes_match_a_scan(small_cache):
+    rng = random.Random(7)
+    index = AutocompleteIndex()
+    live = []
+    # One spelling per name: which of two equally common spellings is shown
+    # is not specified.
+    for expense in sample_expenses(1000, names=[n.lower() for n in NAMES[1:]]):
+        if live and rng.random() < 0.4:
+            gone = live.pop(rng.randrange(len(live)))
+            index.remove(gone)
+        else:
+            index.add(expense)
+            live.append(expense)
+        prefix = rng.choice(["", "c", "ca", "co", "car", "t"])
+        assert index.complete(prefix, 3) == complete_by_scan(live, prefix, 3)
+
+
+def test_removed_names_leave_no_nodes_behind():
+    index = AutocompleteIndex()
+    rent = Expense("rent", 1.0, 1)
+    index.add(rent)
+    index.remove(rent)
+    # Removing it twice is ignored.
+    index.remove(rent)
+
+    assert index.complete("r") == []
+    assert index._root.children == {}
+
+
+def test_manager_completes_the_most_common_spelling(tmp_path):
+    manager = ExpenseManager(file_path=tmp_path / "expenses.json")
+    for name in ["Coffee", "coffee", "Coffee", "cola"]:
+        manager.add_expense(name, 2.0)
+
+    assert manager.autocomplete("co") == [("Coffee", 3), ("cola", 1)]
+    manager.update_expense(4, name="Coffee beans")
+    assert manager.autocomplete("coffee") == [("Coffee", 3), ("Coffee beans", 1)]
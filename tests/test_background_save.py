@@ -0,0 +1,94 @@
+"""Saving on a background writer thread (user-025)."""
+
+import json
+import signal
+import time
+
+import pytest
+
+from conftest import run_python, stored
+from expense_manager import ExpenseManager
+
+
+def test_flush_waits_for_every_change(expense_file, records):
+    manager = ExpenseManager(background_save=True, file_path=expense_file)
+    added = [manager.add_expense(f"bg{n}", float(n)) for n in range(100)]
+    manager.update_expense(1, price=99.0)
+    manager.delete_expense(2)
+    manager.flush()
+
+    saved = stored(expense_file)
+    assert len(saved) == len(records) + 100 - 1
+    assert [saved[expense.id]["name"] for expense in added] == [
+        f"bg{n}" for n in range(100)
+    ]
+    assert saved[1]["price"] == 99.0
+    assert manager.take_save_error() is None
+
+
+def test_failed_save_is_reported_and_retried(expense_file, monkeypatch):
+    manager = ExpenseManager(background_save=True, file_path=expense_file)
+    write_snapshot = manager._write_snapshot
+    disk_full = [True]
+
+    def flaky_write(*args):
+        if disk_full[0]:
+            raise OSError("disk full")
+        write_snapshot(*args)
+
+    monkeypatch.setattr(manager, "_write_snapshot", flaky_write)
+    added = manager.add_expense("retried", 1.0)
+    manager.flush()
+
+    assert str(manager.take_save_error()) == "disk full"
+    assert manager.take_save_error() is None
+    assert manager.pending
+    assert added.id not in stored(expense_file)
+
+    disk_full[0] = False
+    manager.flush()
+    assert manager.take_save_error() is None
+    assert not manager.pending
+    assert stored(expense_file)[added.id]["name"] == "retried"
+
+
+def test_updates_do_not_change_a_snapshot_being_written(expense_file):
+    manager = ExpenseManager(background_save=True, file_path=expense_file)
+    before = manager.get_expense(3)
+    manager.update_expense(3, name="changed")
+
+    assert before.name == "item3"
+    assert manager.get_expense(3).name == "changed"
+
+
+@pytest.mark.parametrize("delay", [0.05, 0.2, 0.5])
+def test_killed_process_leaves_a_whole_snapshot(expense_file, records, delay):
+    writer = run_python(
+        """
+        import sys
+        from pathlib import Path
+        from expense_manager import ExpenseManager
+        manager = ExpenseManager(background_save=True,
+                                 file_path=Path(sys.argv[1]))
+        n = 0
+        while True:
+            manager.add_expense(f"bg{n}", 1.0)
+            n += 1
+        """,
+        str(expense_file),
+    )
+    time.sleep(delay)
+    writer.send_signal(signal.SIGKILL)
+    writer.wait(timeout=60)
+
+    # Saves replace the file in one step: it holds the seed records plus a
+    # prefix of the adds, never a partly written list.
+    saved = json.loads(expense_file.read_text())
+    assert saved[: len(records)] == records
+    assert [record["name"] for record in saved[len(records) :]] == [
+        f"bg{n}" for n in range(len(saved) - len(records))
+    ]
+    # The lock died with the process, so the file can be changed again.
+    manager = ExpenseManager(file_path=expense_file)
+    manager.add_expense("after", 2.0)
+    assert stored(expense_file)[manager.next_id - 1]["name"] == "after"
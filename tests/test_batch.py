@@ -0,0 +1,130 @@
+"""Batch command mode (user-023)."""
+
+import functools
+import io
+import json
+import sys
+
+import pytest
+
+from batch import BatchError, iter_commands, run_batch, run_command
+from conftest import stored
+from expense_manager import ExpenseManager
+
+
+def run(manager, *commands):
+    """Run commands as a batch; return the committed flag and the output
+    lines."""
+    out = io.StringIO()
+    lines = [c if isinstance(c, str) else json.dumps(c) for c in commands]
+    committed = run_batch(manager, lines, out)
+    return committed, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_batch_commits_every_change_at_once(expense_file, records, journal):
+    manager = ExpenseManager(journal=journal, file_path=expense_file)
+    committed, results = run(
+        manager,
+        {"op": "add", "name": "Coffee", "price": 3.5, "tags": ["food"]},
+        {"op": "update", "id": 1, "price": 99.0},
+        {"op": "delete", "id": 2},
+        {"op": "search", "query": "coff"},
+    )
+
+    assert committed
+    assert [result["ok"] for result in results[:-1]] == [True] * 4
+    assert results[3]["count"] == 1
+    assert results[-1] == {"committed": True, "commands": 4, "changes": 3}
+    reopened = ExpenseManager(journal=journal, file_path=expense_file)
+    assert reopened.get_expense(1).price == 99.0
+    assert reopened.get_expense(2) is None
+    assert reopened.get_expense(len(records) + 1).name == "Coffee"
+
+
+@pytest.mark.parametrize(
+    "failing",
+    [
+        {"op": "delete", "id": 999},
+        {"op": "update", "id": 1, "price": "cheap"},
+        {"op": "add", "name": "", "price": 1.0},
+        {"op": "fly"},
+        "{not json",
+    ],
+)
+def test_failing_command_rolls_back_the_batch(expense_file, records, failing):
+    before = expense_file.read_text()
+    manager = ExpenseManager(file_path=expense_file)
+    committed, results = run(
+        manager,
+        {"op": "add", "name": "Coffee", "price": 3.5},
+        {"op": "update", "id": 1, "name": "renamed"},
+        {"op": "delete", "id": 3},
+        failing,
+        {"op": "delete", "id": 4},
+    )
+
+    assert not committed
+    assert results[3]["ok"] is False and results[3]["line"] == 4
+    assert results[-1] == {"committed": False, "commands": 4, "changes": 3}
+    # Neither the file nor the manager keeps the earlier changes.
+    assert expense_file.read_text() == before
+    assert len(manager.expenses) == len(records)
+    assert manager.get_expense(1).name == records[0]["name"]
+    assert manager.get_expense(3) is not None
+    assert list(manager.expenses_matching("renamed")) == []
+    assert not manager.pending
+
+
+def test_manager_keeps_working_after_a_rollback(expense_file, records):
+    manager = ExpenseManager(file_path=expense_file)
+    run(manager, {"op": "delete", "id": 1}, {"op": "delete", "id": 999})
+    manager.delete_expense(2)
+
+    assert 1 in stored(expense_file)
+    assert 2 not in stored(expense_file)
+
+
+def test_run_command_validates_fields(tmp_path):
+    manager = ExpenseManager(file_path=tmp_path / "expenses.json")
+    for command in [
+        {"op": "update", "id": True},
+        {"op": "update", "id": 1, "name": "  "},
+        {"op": "search", "query": 3},
+        {"op": "search", "query": "x", "fuzzy": True, "distance": -1},
+        ["op", "list"],
+    ]:
+        with pytest.raises(BatchError):
+            run_command(manager, command)
+
+
+def test_iter_commands_skips_blank_lines():
+    commands = list(iter_commands(['{"op": "list"}', "", "  ", "nope"]))
+
+    assert commands[0] == (1, {"op": "list"})
+    assert commands[1][0] == 4
+    assert isinstance(commands[1][1], ValueError)
+
+
+@pytest.mark.parametrize(
+    "command, status",
+    [({"op": "add", "name": "tea", "price": 2.0}, 0), ({"op": "delete", "id": 999}, 1)],
+)
+def test_cli_exits_with_the_batch_status(expense_file, monkeypatch, command, status):
+    import expense_manager
+
+    monkeypatch.setattr(
+        expense_manager,
+        "ExpenseManager",
+        functools.partial(ExpenseManager, file_path=expense_file),
+    )
+    monkeypatch.setattr(sys, "argv", ["expense_manager.py", "--batch", "-"])
+    monkeypatch.setattr(sys, "stdin", io.StringIO(json.dumps(command) + "\n"))
+    out = io.StringIO()
+    monkeypatch.setattr(sys, "stdout", out)
+
+    with pytest.raises(SystemExit) as exit_info:
+        expense_manager.main()
+
+    assert exit_info.value.code == status
+    assert json.loads(out.getvalue().splitlines()[-1])["committed"] is (status == 0)
@@ -0,0 +1,51 @@
+"""Memory-mapped fixed-record binary format (user-011)."""
+
+from binary_format import (
+    BinaryExpenseFile,
+    binary_to_json,
+    is_binary_file,
+    json_to_binary,
+    write_binary,
+)
+from conftest import stored
+from expense_manager import ExpenseManager
+
+
+def test_write_and_read_back(tmp_path, records):
+    path = tmp_path / "expenses.bin"
+
+    assert write_binary(path, records) == len(records)
+    with BinaryExpenseFile(path) as expenses:
+        assert len(expenses) == len(records)
+        assert list(expenses) == records
+        assert expenses.get(17) == records[16]
+        assert expenses.get(0) is None
+        assert expenses.get(len(records) + 1) is None
+
+
+def test_json_round_trip(tmp_path, expense_file, records):
+    binary_path = tmp_path / "expenses.bin"
+    json_path = tmp_path / "back.json"
+
+    assert json_to_binary(expense_file, binary_path) == len(records)
+    assert is_binary_file(binary_path)
+    assert not is_binary_file(expense_file)
+    assert binary_to_json(binary_path, json_path) == len(records)
+    assert stored(json_path) == stored(expense_file)
+
+
+def test_manager_changes_round_trip(tmp_path, expense_file, records):
+    path = tmp_path / "expenses.bin"
+    json_to_binary(expense_file, path)
+
+    manager = ExpenseManager(storage_format="binary", file_path=path)
+    added = manager.add_expense("new", 2.5, tags=["fun"])
+    manager.update_expense(2, name="renamed")
+    manager.delete_expense(3)
+    manager.flush()
+
+    with BinaryExpenseFile(path) as expenses:
+        assert expenses.get(added.id)["name"] == "new"
+        assert expenses.get(2)["name"] == "renamed"
+        assert expenses.get(3) is None
+        assert len(expenses) == len(records)
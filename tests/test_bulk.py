@@ -0,0 +1,151 @@
+"""Bulk import and export (user-007)."""
+
+import csv
+import json
+from pathlib import Path
+
+import pytest
+
+from bulk import detect_format, export_expenses, import_expenses, validate_record
+from conftest import stored
+from expense_manager import ExpenseManager
+
+
+def write_ndjson(path, count: int, bad_line: int = 0):
+    with open(path, "w") as f:
+        for n in range(1, count + 1):
+            if n == bad_line:
+                f.write("{broken\n")
+            else:
+                f.write(json.dumps({"name": f"row{n}", "price": n, "tags": "a,b"}))
+                f.write("\n")
+
+
+def failing_after(manager, monkeypatch, batches: int):
+    """Make the manager's add_expenses fail on call number batches + 1."""
+    add_expenses = manager.add_expenses
+    calls = []
+
+    def add(items):
+        calls.append(1)
+        if len(calls) > batches:
+            raise OSError("disk full")
+        return add_expenses(items)
+
+    monkeypatch.setattr(manager, "add_expenses", add)
+
+
+@pytest.mark.parametrize("fmt", ["csv", "ndjson"])
+def test_export_then_import_round_trips(expense_file, tmp_path, records, fmt):
+    source = ExpenseManager(file_path=expense_file)
+    path = tmp_path / f"export.{fmt}"
+    assert export_expenses(source, path) == len(records)
+
+    target = ExpenseManager(file_path=tmp_path / "target.json")
+    assert import_expenses(target, path) == (len(records), 0)
+
+    imported = sorted(
+        (e.name, e.price, e.timestamp, e.tags) for e in target.iter_expenses()
+    )
+    assert imported == sorted(
+        (r["name"], r["price"], r["timestamp"], r["tags"]) for r in records
+    )
+    assert len(stored(tmp_path / "target.json")) == len(records)
+
+
+def test_csv_export_has_a_header(expense_file, tmp_path):
+    path = tmp_path / "export.csv"
+    export_expenses(ExpenseManager(file_path=expense_file), path)
+
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["id", "name", "price", "timestamp", "tags"]
+    assert rows[2][4] == "travel,work"
+
+
+def test_invalid_rows_are_skipped(tmp_path, capsys):
+    path = tmp_path / "in.ndjson"
+    write_ndjson(path, 30, bad_line=7)
+    with open(path, "a") as f:
+        f.write('{"name": "", "price": 1}\n{"name": "x", "price": "nan"}\n\n')
+
+    manager = ExpenseManager(file_path=tmp_path / "expenses.json")
+    assert import_expenses(manager, path, batch_size=8) == (29, 3)
+    assert "Skipping line 7" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_batches_are_persisted_once_each(tmp_path, monkeypatch, journal):
+    path = tmp_path / "in.ndjson"
+    write_ndjson(path, 25)
+    manager = ExpenseManager(journal=journal, file_path=tmp_path / "expenses.json")
+    writes = []
+    owner, name = (
+        (manager.journal, "append_many") if journal else (manager, "_write_snapshot")
+    )
+    write = getattr(owner, name)
+    monkeypatch.setattr(owner, name, lambda *args: writes.append(1) or write(*args))
+
+    assert import_expenses(manager, path, batch_size=10) == (25, 0)
+    # In journal mode each batch is appended when it is added; a snapshot
+    # is written once for the whole import.
+    assert len(writes) == (3 if journal else 1)
+    manager.compact()
+    assert len(stored(tmp_path / "expenses.json")) == 25
+
+
+def test_failed_journal_import_keeps_the_saved_batches(tmp_path, monkeypatch):
+    path = tmp_path / "in.ndjson"
+    write_ndjson(path, 25)
+    manager = ExpenseManager(journal=True, file_path=tmp_path / "expenses.json")
+    failing_after(manager, monkeypatch, batches=2)
+
+    with pytest.raises(OSError):
+        import_expenses(manager, path, batch_size=10)
+
+    reopened = ExpenseManager(journal=True, file_path=tmp_path / "expenses.json")
+    assert len(reopened.expenses) == 20
+    assert len(manager.expenses) == 20
+
+
+def test_failed_snapshot_import_saves_nothing(expense_file, tmp_path, monkeypatch):
+    before = expense_file.read_text()
+    path = tmp_path / "in.ndjson"
+    write_ndjson(path, 25)
+    manager = ExpenseManager(file_path=expense_file)
+    failing_after(manager, monkeypatch, batches=2)
+
+    with pytest.raises(OSError):
+        import_expenses(manager, path, batch_size=10)
+
+    assert expense_file.read_text() == before
+
+
+def test_sqlite_import_commits_each_batch(tmp_path, monkeypatch):
+    path = tmp_path / "in.ndjson"
+    write_ndjson(path, 25)
+    manager = ExpenseManager(backend="sqlite", file_path=tmp_path / "expenses.json")
+    failing_after(manager, monkeypatch, batches=1)
+
+    with pytest.raises(OSError):
+        import_expenses(manager, path, batch_size=10)
+
+    reopened = ExpenseManager(backend="sqlite", file_path=tmp_path / "expenses.json")
+    assert reopened.stats().count == 10
+
+
+def test_detect_format():
+    assert detect_format(Path("a.JSONL")) == "ndjson"
+    assert detect_format(Path("a.csv")) == "csv"
+    assert detect_format(Path("a.txt"), "csv") == "csv"
+    with pytest.raises(ValueError):
+        detect_format(Path("a.txt"))
+
+
+def test_validate_record_normalizes_fields():
+    assert validate_record(
+        {"name": "Tea", "price": "2.5", "timestamp": "2026-03-04", "tags": "B,a"}
+    ) == ("Tea", 2.5, "2026-03-04T00:00:00", ["b", "a"])
+    for bad in [{"price": 1}, {"name": "x", "price": "inf"}, ["x"]]:
+        with pytest.raises(ValueError):
+            validate_record(bad)
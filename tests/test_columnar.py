@@ -0,0 +1,102 @@
+"""Columnar storage and lazily built indexes (user-003)."""
+
+import tracemalloc
+
+import pytest
+
+from columnar import ColumnarExpenses
+from expense_manager import Expense, ExpenseManager
+
+
+def test_columnar_store_round_trips_expenses(expense_file, records):
+    manager = ExpenseManager(columnar=True, file_path=expense_file)
+
+    assert [expense.to_dict() for expense in manager.iter_expenses()] == records
+
+
+def test_columnar_rows_follow_changes():
+    store = ColumnarExpenses(Expense)
+    for expense_id in (1, 2, 5):
+        store.add(expense_id, f"item{expense_id}", float(expense_id))
+    store.add(3, "late", 3.0, "2026-10-01T00:00:00", ["food"])
+    store[2].price = 20.0
+    removed = store.pop(1)
+
+    assert list(store) == [2, 3, 5]
+    assert (removed.name, removed.price, removed.id) == ("item1", 1.0, 1)
+    assert store[3].to_dict() == {
+        "name": "late",
+        "price": 3.0,
+        "id": 3,
+        "timestamp": "2026-10-01T00:00:00",
+        "tags": ["food"],
+    }
+    assert 1 not in store and store.get(1) is None
+    assert store.total() == pytest.approx(28.0)
+
+
+def test_deleted_rows_are_compacted_away():
+    store = ColumnarExpenses(Expense)
+    for expense_id in range(1, 11):
+        store.add(expense_id, "item", 1.0)
+    for expense_id in range(1, 7):
+        store.pop(expense_id)
+
+    # Once more than half of the rows were deleted, they were dropped.
+    assert list(store.columns()[0]) == [7, 8, 9, 10]
+    store.pop(7)
+    assert list(store) == [8, 9, 10]
+    store.add(4, "again", 4.0)
+    assert list(store) == [4, 8, 9, 10]
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_indexes_are_built_by_the_first_query_that_needs_them(expense_file, columnar):
+    manager = ExpenseManager(columnar=columnar, file_path=expense_file)
+    assert manager.store.name_index is None and manager.store.price_index is None
+
+    assert [expense.id for expense in manager.expenses_matching("item3")][:2] == [
+        3,
+        10,
+    ]
+    assert manager.store.name_index is not None and manager.store.price_index is None
+
+    manager.add_expense("item3 again", 1000.0)
+    # Built indexes follow changes; the others are built with them.
+    assert list(manager.expenses_matching("again"))[0].price == 1000.0
+    assert manager.top_expenses(1)[0].name == "item3 again"
+    assert manager.stats().maximum == 1000.0
+
+
+def allocated(build):
+    """Bytes still allocated by what build() returns."""
+    tracemalloc.start()
+    try:
+        kept = build()
+        return tracemalloc.get_traced_memory()[0], kept
+    finally:
+        tracemalloc.stop()
+
+
+def test_columnar_store_holds_a_fraction_of_expense_objects():
+    rows = [
+        (expense_id, f"item{expense_id % 50}", expense_id * 0.25)
+        for expense_id in range(1, 20001)
+    ]
+
+    def objects():
+        return {
+            expense_id: Expense(name, price, expense_id, "2026-10-01T00:00:00", [])
+            for expense_id, name, price in rows
+        }
+
+    def columns():
+        store = ColumnarExpenses(Expense)
+        for expense_id, name, price in rows:
+            store.add(expense_id, name, price, "2026-10-01T00:00:00")
+        return store
+
+    object_bytes, _ = allocated(objects)
+    column_bytes, store = allocated(columns)
+    assert column_bytes * 5 < object_bytes
+    assert store.memory_usage() == pytest.approx(column_bytes, rel=0.25)
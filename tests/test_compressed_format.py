@@ -0,0 +1,84 @@
+"""Block-compressed snapshots with a block index (user-022)."""
+
+import pytest
+
+from compressed_format import (
+    CODECS,
+    CompressedExpenseFile,
+    compressed_to_json,
+    json_to_compressed,
+    write_compressed,
+)
+from conftest import stored
+from expense_manager import ExpenseManager
+from expenses_core.partitions import in_range
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_write_and_read_back(tmp_path, records, codec):
+    path = tmp_path / "expenses.jsonz"
+
+    assert write_compressed(path, records, codec, block_records=8) == len(records)
+    with CompressedExpenseFile(path) as expenses:
+        assert expenses.codec == codec
+        assert len(expenses) == len(records)
+        assert list(expenses) == records
+        assert expenses.get(0) is None
+        assert expenses.get(len(records) + 1) is None
+
+
+def test_get_reads_only_the_block_holding_the_id(tmp_path, records):
+    path = tmp_path / "expenses.jsonz"
+    write_compressed(path, records, block_records=8)
+
+    with CompressedExpenseFile(path) as expenses:
+        assert expenses.get(20) == records[19]
+        assert expenses.get(21) == records[20]
+        assert expenses.blocks_read == 1
+
+
+def test_between_matches_a_full_scan(tmp_path, records):
+    path = tmp_path / "expenses.jsonz"
+    write_compressed(path, records, block_records=8)
+
+    with CompressedExpenseFile(path) as expenses:
+        for start, end in [
+            ("2026-03", "2026-04"),
+            (None, "2026-01"),
+            ("2026-09-15", None),
+            ("2027", None),
+        ]:
+            assert list(expenses.between(start, end)) == [
+                record
+                for record in records
+                if in_range(record["timestamp"], start, end)
+            ]
+
+
+def test_json_round_trip(tmp_path, expense_file, records):
+    compressed_path = tmp_path / "expenses.jsonz"
+    json_path = tmp_path / "back.json"
+
+    assert json_to_compressed(expense_file, compressed_path, "lzma") == len(records)
+    assert compressed_to_json(compressed_path, json_path) == len(records)
+    assert stored(json_path) == stored(expense_file)
+
+
+def test_unknown_codec_is_rejected(tmp_path, records):
+    with pytest.raises(ValueError):
+        write_compressed(tmp_path / "expenses.jsonz", records, "rot13")
+
+
+def test_lazy_manager_looks_up_without_loading(tmp_path, expense_file, records):
+    path = tmp_path / "expenses.jsonz"
+    json_to_compressed(expense_file, path)
+
+    manager = ExpenseManager(storage_format="compressed", lazy=True, file_path=path)
+    assert manager.get_expense(30).to_dict() == records[29]
+    assert not manager.is_loaded
+
+    manager.delete_expense(30)
+    manager.flush()
+    with CompressedExpenseFile(path) as expenses:
+        assert expenses.get(30) is None
+        assert len(expenses) == len(records) - 1
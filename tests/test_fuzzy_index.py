@@ -0,0 +1,82 @@
+"""BK-tree fuzzy name search (user-013)."""
+
+import itertools
+import random
+import string
+
+import pytest
+
+from expense_manager import Expense, ExpenseManager
+from expenses_core.fuzzy_index import BKTreeIndex, levenshtein
+
+
+def scan(expenses, query, max_distance):
+    ranked = sorted(
+        (levenshtein(query, expense.name.lower()), expense.name.lower(), expense.id)
+        for expense in expenses
+    )
+    return [
+        expense_id for distance, _, expense_id in ranked if distance <= max_distance
+    ]
+
+
+def random_names(count: int, seed: int = 13):
+    rng = random.Random(seed)
+    return [
+        "".join(rng.choice("abcde") for _ in range(rng.randint(1, 6)))
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize(
+    "a, b, distance",
+    [
+        ("", "", 0),
+        ("", "abc", 3),
+        ("coffee", "cofee", 1),
+        ("kitten", "sitting", 3),
+        ("flaw", "lawn", 2),
+        ("rent", "rent", 0),
+    ],
+)
+def test_levenshtein(a, b, distance):
+    assert levenshtein(a, b) == levenshtein(b, a) == distance
+
+
+def test_search_matches_a_scan():
+    expenses = [
+        Expense(name.upper() if n % 5 == 0 else name, 1.0, n)
+        for n, name in enumerate(random_names(500), start=1)
+    ]
+    index = BKTreeIndex()
+    index.add_all(expenses)
+
+    for query, max_distance in itertools.product(["abc", "e", "ddddd", "x"], [0, 1, 2]):
+        assert index.search(query, max_distance) == scan(expenses, query, max_distance)
+
+
+def test_removed_names_are_not_found_and_the_tree_is_rebuilt():
+    expenses = [Expense(name, 1.0, n) for n, name in enumerate(string.ascii_lowercase)]
+    index = BKTreeIndex()
+    index.add_all(expenses)
+    for expense in expenses[:20]:
+        index.remove(expense)
+
+    assert index._nodes <= 2 * len(index._by_name)
+    assert index.search("a", 1) == scan(expenses[20:], "a", 1)
+    # A removed name comes back when an expense uses it again.
+    index.add(Expense("b", 1.0, 99))
+    assert index.search("b", 0) == [99]
+    assert len(index) == 7
+
+
+def test_manager_fuzzy_search_with_and_without_index(expense_file):
+    manager = ExpenseManager(file_path=expense_file)
+    manager.add_expense("Coffee", 3.0)
+    manager.add_expense("coffee beans", 9.0)
+    manager.update_expense(1, name="cofee")
+    lazy = ExpenseManager(lazy=True, file_path=expense_file)
+
+    for current in (manager, lazy):
+        found = [(e.name, e.id) for e in current.expenses_similar_to("COFFEE", 1)]
+        assert found == [("Coffee", 51), ("cofee", 1)]
@@ -0,0 +1,78 @@
+"""Stable expense ids (user-008)."""
+
+import json
+
+import pytest
+
+from expense_manager import ExpenseManager
+from expenses_core.streaming import assign_ids, iter_records
+
+# An older file: the first record has no id and a later one takes id 1.
+MIXED = [{"name": "a", "price": 1.0}, {"name": "b", "price": 2.0, "id": 1}]
+
+
+@pytest.fixture
+def mixed_file(tmp_path):
+    path = tmp_path / "expenses.json"
+    path.write_text(json.dumps(MIXED))
+    return path
+
+
+def test_records_without_ids_never_take_a_later_id(mixed_file):
+    assert [item["id"] for item in assign_ids(json.loads(mixed_file.read_text()))] == [
+        2,
+        1,
+    ]
+    assert [item["id"] for item in iter_records(mixed_file, chunk_size=8)] == [2, 1]
+
+
+def test_iter_records_only_rereads_when_an_id_is_missing(tmp_path, monkeypatch):
+    from expenses_core import streaming
+
+    path = tmp_path / "expenses.json"
+    path.write_text(json.dumps([{"name": "a", "price": 1.0, "id": 3}]))
+    monkeypatch.setattr(streaming, "max_id", lambda items: pytest.fail("reread"))
+
+    assert [item["id"] for item in iter_records(path)] == [3]
+
+
+@pytest.mark.parametrize(
+    "options", [{}, {"lazy": True}, {"columnar": True}, {"storage_format": "binary"}]
+)
+def test_manager_loads_distinct_ids_from_an_older_file(mixed_file, options):
+    if options.get("storage_format") == "binary":
+        from binary_format import json_to_binary
+
+        binary_path = mixed_file.with_suffix(".bin")
+        json_to_binary(mixed_file, binary_path)
+        manager = ExpenseManager(file_path=binary_path, **options)
+    else:
+        manager = ExpenseManager(file_path=mixed_file, **options)
+
+    assert sorted((e.id, e.name) for e in manager.iter_expenses()) == [
+        (1, "b"),
+        (2, "a"),
+    ]
+
+
+def test_server_loads_distinct_ids_from_an_older_file(mixed_file, monkeypatch):
+    from src.server import server
+
+    monkeypatch.setattr(server, "store", server.ExpenseStore(file_path=mixed_file))
+    client = server.app.test_client()
+
+    assert client.get("/api/expenses/2").get_json()["name"] == "a"
+    assert client.get("/api/expenses/1").get_json()["name"] == "b"
+
+
+def test_ids_stay_with_their_expenses(expense_file, records):
+    manager = ExpenseManager(file_path=expense_file)
+    manager.delete_expense(1)
+    added = manager.add_expense("new", 1.0)
+    manager.delete_expense(added.id)
+    again = manager.add_expense("again", 2.0)
+
+    # Deleting shifts nothing and ids are never reused within a session.
+    assert manager.get_expense(2).name == records[1]["name"]
+    assert again.id == added.id + 1
+    assert ExpenseManager(file_path=expense_file).get_expense(again.id).name == "again"
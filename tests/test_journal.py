@@ -0,0 +1,81 @@
+"""Append-only journal mode (user-001)."""
+
+import json
+
+from conftest import stored
+from expense_manager import ExpenseManager
+from journal import ExpenseJournal
+
+
+def journal_lines(expense_file):
+    return expense_file.with_suffix(".journal").read_text().splitlines()
+
+
+def test_changes_are_appended_without_rewriting_the_snapshot(expense_file, records):
+    before = expense_file.read_text()
+    manager = ExpenseManager(journal=True, file_path=expense_file)
+    manager.add_expense("tea", 2.0)
+    manager.update_expense(1, price=10.0)
+    manager.delete_expense(2)
+
+    assert expense_file.read_text() == before
+    lines = journal_lines(expense_file)
+    assert "snapshot" in json.loads(lines[0])
+    assert [json.loads(line)["op"] for line in lines[1:]] == [
+        "add",
+        "update",
+        "delete",
+    ]
+
+    reopened = ExpenseManager(journal=True, file_path=expense_file)
+    assert reopened.get_expense(1).price == 10.0
+    assert reopened.get_expense(2) is None
+    assert reopened.get_expense(len(records) + 1).name == "tea"
+
+
+def test_journal_is_compacted_into_the_snapshot(expense_file, records):
+    manager = ExpenseManager(journal=True, file_path=expense_file)
+    manager.journal.compact_threshold = 5
+    # The threshold grows with the number of expenses.
+    for n in range(len(records) - 1):
+        manager.update_expense(1, price=float(n))
+    assert len(journal_lines(expense_file)) == len(records)
+
+    manager.update_expense(1, price=123.0)
+    assert len(journal_lines(expense_file)) == 1
+    assert stored(expense_file)[1]["price"] == 123.0
+
+
+def test_torn_last_line_is_skipped_and_compacted(expense_file, records):
+    manager = ExpenseManager(journal=True, file_path=expense_file)
+    manager.add_expense("kept", 1.0)
+    with open(expense_file.with_suffix(".journal"), "a") as f:
+        f.write('{"op": "add", "name": "to')
+
+    reopened = ExpenseManager(journal=True, file_path=expense_file)
+
+    assert [e.name for e in reopened.iter_expenses()][-1] == "kept"
+    assert len(stored(expense_file)) == len(records) + 1
+    assert len(journal_lines(expense_file)) == 1
+
+
+def test_journal_of_an_older_snapshot_is_ignored(expense_file, records):
+    manager = ExpenseManager(journal=True, file_path=expense_file)
+    manager.add_expense("stale", 1.0)
+    # Rewriting the snapshot without the journal makes it stale.
+    expense_file.write_text(json.dumps(records[:10], indent=2) + "\n")
+
+    reopened = ExpenseManager(journal=True, file_path=expense_file)
+    assert len(list(reopened.iter_expenses())) == 10
+
+
+def test_old_entries_addressed_by_position_replay(expense_file, records):
+    journal = ExpenseJournal(expense_file)
+    journal.append("update", index=0, price=7.0)
+    journal.append("delete", index=1)
+
+    manager = ExpenseManager(journal=True, file_path=expense_file)
+
+    assert manager.get_expense(1).price == 7.0
+    assert manager.get_expense(2) is None
+    assert len(manager.expenses) == len(records) - 1
@@ -0,0 +1,165 @@
+"""File locking, merging concurrent saves and journal replay (user-021)."""
+
+import json
+import threading
+import time
+
+from conftest import run_python, stored
+from expense_manager import ExpenseManager
+from expenses_core.locking import VersionLock
+
+
+def test_version_lock_counts_saves(tmp_path):
+    lock = VersionLock(tmp_path / "expenses.lock")
+    before = lock.read()
+
+    with lock as version:
+        assert version == before
+        assert lock.held()
+    assert not lock.held()
+    assert lock.read() != before
+    assert lock.version == lock.read()
+
+
+def test_saves_from_two_managers_are_merged(expense_file, records):
+    first = ExpenseManager(file_path=expense_file)
+    second = ExpenseManager(file_path=expense_file)
+
+    from_first = first.add_expense("from first", 1.0)
+    first.update_expense(5, price=55.0)
+    from_second = second.add_expense("from second", 2.0)
+    second.delete_expense(6)
+
+    saved = stored(expense_file)
+    assert len(saved) == len(records) + 1
+    assert saved[from_first.id]["name"] == "from first"
+    # The second manager's add took the same id, so it was renumbered.
+    assert saved[from_first.id + 1]["name"] == "from second"
+    assert from_second.id == from_first.id
+    assert saved[5]["price"] == 55.0
+    assert 6 not in saved
+
+
+def test_change_to_an_expense_deleted_elsewhere_is_dropped(expense_file):
+    first = ExpenseManager(file_path=expense_file, durability="exit")
+    second = ExpenseManager(file_path=expense_file)
+
+    first.update_expense(7, name="stale")
+    second.delete_expense(7)
+    first.flush()
+
+    assert 7 not in stored(expense_file)
+    assert first.get_expense(7) is None
+
+
+def test_concurrent_processes_lose_no_expenses(expense_file, records):
+    workers = [
+        run_python(
+            """
+        import sys
+        from pathlib import Path
+        from expense_manager import ExpenseManager
+        manager = ExpenseManager(file_path=Path(sys.argv[1]))
+        for n in range(20):
+            manager.add_expense(f"worker{sys.argv[2]}-{n}", 1.0)
+        """,
+            str(expense_file),
+            str(worker),
+        )
+        for worker in range(4)
+    ]
+    for worker in workers:
+        assert worker.wait(timeout=120) == 0
+
+    saved = stored(expense_file)
+    assert len(saved) == len(records) + 4 * 20
+    names = [record["name"] for record in saved.values()]
+    assert len(set(names[len(records) :])) == 4 * 20
+
+
+def test_journal_is_replayed_after_a_crash(expense_file, records):
+    # The process dies without running its exit hooks or compacting.
+    crashed = run_python(
+        """
+        import os, sys
+        from pathlib import Path
+        from expense_manager import ExpenseManager
+        manager = ExpenseManager(journal=True, file_path=Path(sys.argv[1]))
+        manager.add_expense("journaled", 3.0, tags=["fun"])
+        manager.update_expense(1, price=11.0)
+        manager.delete_expense(2)
+        os._exit(0)
+        """,
+        str(expense_file),
+    )
+    assert crashed.wait(timeout=60) == 0
+    # The snapshot itself was not rewritten.
+    assert stored(expense_file) == {record["id"]: record for record in records}
+
+    manager = ExpenseManager(journal=True, file_path=expense_file)
+    added = manager.get_expense(len(records) + 1)
+    assert (added.name, added.tags) == ("journaled", ["fun"])
+    assert manager.get_expense(1).price == 11.0
+    assert manager.get_expense(2) is None
+
+
+def test_torn_journal_line_is_skipped_and_compacted(expense_file):
+    manager = ExpenseManager(journal=True, file_path=expense_file)
+    manager.add_expense("kept", 4.0)
+    journal_path = expense_file.with_suffix(".journal")
+    with open(journal_path, "a") as f:
+        f.write(json.dumps({"op": "add", "name": "torn", "price": 1.0})[:20])
+
+    reopened = ExpenseManager(journal=True, file_path=expense_file)
+    # Loading folded the intact entries into the snapshot and started a
+    # fresh journal, so later appends do not follow the torn line.
+    assert [record["name"] for record in stored(expense_file).values()][-1] == "kept"
+    assert len(journal_path.read_text().splitlines()) == 1
+
+    reopened.add_expense("after", 5.0)
+    names = [
+        expense.name
+        for expense in ExpenseManager(
+            journal=True, file_path=expense_file
+        ).iter_expenses()
+    ]
+    assert names[-2:] == ["kept", "after"]
+
+
+def test_store_reads_are_not_held_up_by_a_save(tmp_path, monkeypatch):
+    from src.server import server
+
+    store = server.ExpenseStore(file_path=tmp_path / "expenses.json")
+    writing = threading.Event()
+    release = threading.Event()
+    dump = json.dump
+
+    def slow_dump(*args, **kwargs):
+        writing.set()
+        assert release.wait(timeout=30)
+        dump(*args, **kwargs)
+
+    monkeypatch.setattr(server.json, "dump", slow_dump)
+    adder = threading.Thread(target=store.add_expense, args=("coffee", 3.5))
+    adder.start()
+    try:
+        assert writing.wait(timeout=30)
+        # The save is stuck writing, but reads go ahead.
+        assert store.autocomplete("cof") == [("coffee", 1)]
+        assert [expense.name for expense in store.search_expenses("coff")] == ["coffee"]
+        # So do changes; only their own flush waits for the save.
+        updater = threading.Thread(
+            target=store.update_expense, args=(1,), kwargs={"price": 4.0}
+        )
+        updater.start()
+        deadline = time.monotonic() + 30
+        while store.get_expense(1).price != 4.0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert store.get_expense(1).price == 4.0
+    finally:
+        release.set()
+        adder.join(timeout=30)
+    updater.join(timeout=30)
+
+    assert stored(tmp_path / "expenses.json")[1]["price"] == 4.0
+    assert not store.pending
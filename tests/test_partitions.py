@@ -0,0 +1,125 @@
+"""Timestamps and month partitions (user-015)."""
+
+import random
+
+import pytest
+
+from expense_manager import Expense, ExpenseManager
+from expenses_core.partitions import MonthlyPartitions, in_range, normalize_timestamp
+
+
+def random_expenses(count: int, seed: int = 15):
+    rng = random.Random(seed)
+    return [
+        Expense(
+            name="item",
+            price=round(rng.uniform(0, 100), 2),
+            id=expense_id,
+            timestamp=(
+                f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+                f"T{rng.randint(0, 23):02d}:{rng.choice([0, 30]):02d}:00"
+                if expense_id % 10
+                else None
+            ),
+        )
+        for expense_id in range(1, count + 1)
+    ]
+
+
+def ids_between(expenses, start, end):
+    return [
+        expense.id
+        for expense in sorted(
+            (
+                expense
+                for expense in expenses
+                if in_range(expense.timestamp, start, end)
+            ),
+            key=lambda expense: (expense.timestamp, expense.id),
+        )
+    ]
+
+
+@pytest.fixture
+def indexed():
+    """Partitions built by add_all, single adds and removes, and the
+    expenses they should hold."""
+    expenses = random_expenses(3000)
+    partitions = MonthlyPartitions()
+    partitions.add_all(expenses[:1000])
+    for expense in expenses[1000:2000]:
+        partitions.add(expense)
+    partitions.add_all(expenses[2000:])
+    for expense in random.Random(1).sample(expenses, 500):
+        partitions.remove(expense)
+        expenses.remove(expense)
+    return partitions, expenses
+
+
+@pytest.mark.parametrize(
+    "start, end",
+    [
+        (None, None),
+        ("2026-03", "2026-05"),
+        ("2026-03-15", "2026-03-20T12:00:00"),
+        ("2026-04-02T10:30:00", "2026-04"),
+        ("2026-06-10", None),
+        (None, "2026-02-03"),
+        ("2026-07", "2026-07"),
+    ],
+)
+def test_ids_between_matches_a_scan(indexed, start, end):
+    partitions, expenses = indexed
+
+    assert partitions.ids_between(start, end) == ids_between(expenses, start, end)
+
+
+def test_summaries_match_the_expenses_of_each_month(indexed):
+    partitions, expenses = indexed
+
+    months = partitions.summaries()
+    assert [month for month, _ in months] == [f"2026-{m:02d}" for m in range(1, 13)]
+    for month, stats in months:
+        prices = [
+            expense.price
+            for expense in expenses
+            if expense.timestamp and expense.timestamp[:7] == month
+        ]
+        assert stats.count == len(prices)
+        assert stats.total == pytest.approx(sum(prices))
+        assert (stats.minimum, stats.maximum) == (min(prices), max(prices))
+
+
+def test_cached_summary_follows_adds_and_removes():
+    partitions = MonthlyPartitions()
+    cheap = Expense("cheap", 1.0, 1, "2026-01-05T10:00:00")
+    dear = Expense("dear", 9.0, 2, "2026-01-06T10:00:00")
+    partitions.add(cheap)
+    assert partitions.summaries()[0][1].to_dict()["max"] == 1.0
+
+    partitions.add(dear)
+    assert partitions.summaries()[0][1].to_dict()["max"] == 9.0
+    partitions.remove(dear)
+    assert partitions.summaries()[0][1].to_dict()["max"] == 1.0
+    partitions.remove(cheap)
+    assert partitions.summaries() == []
+    assert partitions.months() == []
+
+
+def test_manager_reads_ranges_and_months_from_partitions(tmp_path):
+    manager = ExpenseManager(file_path=tmp_path / "expenses.json")
+    manager.add_expense("rent", 900.0, normalize_timestamp("2026-09-01"))
+    manager.add_expense("coffee", 3.0, normalize_timestamp("2026-10-02T08:15"))
+    manager.add_expense("lunch", 12.0, normalize_timestamp("2026-10-31T13:00"))
+
+    assert [e.name for e in manager.expenses_between("2026-10")] == [
+        "coffee",
+        "lunch",
+    ]
+    assert [e.name for e in manager.expenses_between(end="2026-10-02")] == [
+        "rent",
+        "coffee",
+    ]
+    assert [
+        (month, stats.count, stats.total) for month, stats in manager.monthly_stats()
+    ] == [("2026-09", 1, 900.0), ("2026-10", 2, 15.0)]
@@ -0,0 +1,167 @@
+"""Group commit and the durability policies (user-009)."""
+
+import threading
+import time
+
+import pytest
+
+from conftest import stored
+from expense_manager import ExpenseManager
+from expenses_core.persistence import DebouncedFlusher
+
+
+class Writer:
+    """A flush function that records its calls and can be made to fail."""
+
+    def __init__(self):
+        self.calls = 0
+        self.failing = False
+
+    def __call__(self) -> bool:
+        self.calls += 1
+        return not self.failing
+
+
+def test_always_policy_flushes_every_change():
+    writer = Writer()
+    flusher = DebouncedFlusher(writer, threading.RLock(), "always")
+    flusher.mark_dirty()
+    flusher.mark_dirty()
+
+    assert writer.calls == 2
+    assert flusher.dirty == 0
+
+
+def test_interval_policy_flushes_at_the_dirty_threshold():
+    writer = Writer()
+    flusher = DebouncedFlusher(writer, threading.RLock(), "interval", 60, 3)
+    flusher.mark_dirty()
+    flusher.mark_dirty()
+    assert writer.calls == 0
+
+    flusher.mark_dirty()
+    assert writer.calls == 1
+    assert flusher.dirty == 0
+
+
+def test_interval_policy_flushes_after_the_interval():
+    writer = Writer()
+    flusher = DebouncedFlusher(writer, threading.RLock(), "interval", 0.05, 1000)
+    flusher.mark_dirty()
+    deadline = time.monotonic() + 5
+    while writer.calls == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert writer.calls == 1
+    assert flusher.dirty == 0
+
+
+def test_exit_policy_only_flushes_when_asked():
+    writer = Writer()
+    flusher = DebouncedFlusher(writer, threading.RLock(), "exit")
+    for _ in range(5):
+        flusher.mark_dirty()
+    assert writer.calls == 0
+
+    flusher.flush()
+    flusher.flush()
+    assert writer.calls == 1
+
+
+def test_hold_flushes_once_at_the_end():
+    writer = Writer()
+    flusher = DebouncedFlusher(writer, threading.RLock(), "always")
+    with flusher.hold():
+        flusher.mark_dirty()
+        flusher.mark_dirty()
+        assert writer.calls == 0
+
+    assert writer.calls == 1
+
+
+def test_failed_flush_keeps_the_changes_dirty():
+    writer = Writer()
+    flusher = DebouncedFlusher(writer, threading.RLock(), "exit")
+    flusher.mark_dirty(2)
+    writer.failing = True
+    flusher.flush()
+    assert flusher.dirty == 2
+
+    writer.failing = False
+    flusher.flush()
+    assert writer.calls == 2
+    assert flusher.dirty == 0
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        DebouncedFlusher(Writer(), threading.RLock(), "sometimes")
+
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_manager_saves_again_after_a_failed_write(expense_file, monkeypatch, journal):
+    manager = ExpenseManager(durability="exit", journal=journal, file_path=expense_file)
+    added = manager.add_expense("kept", 1.0)
+    if journal:
+        append_many = manager.journal.append_many
+
+        def failing_append(entries):
+            monkeypatch.setattr(manager.journal, "append_many", append_many)
+            raise OSError("disk full")
+
+        monkeypatch.setattr(manager.journal, "append_many", failing_append)
+    else:
+        write_snapshot = manager._write_snapshot
+
+        def failing_write(*args):
+            monkeypatch.setattr(manager, "_write_snapshot", write_snapshot)
+            raise OSError("disk full")
+
+        monkeypatch.setattr(manager, "_write_snapshot", failing_write)
+
+    manager.flush()
+    assert manager.flusher.dirty == 1
+    assert manager.pending
+
+    manager.flush()
+    assert manager.flusher.dirty == 0
+    assert not manager.pending
+    reopened = ExpenseManager(journal=journal, file_path=expense_file)
+    assert reopened.get_expense(added.id).name == "kept"
+
+
+def test_manager_interval_policy_writes_in_batches(expense_file, records):
+    manager = ExpenseManager(
+        durability="interval",
+        flush_interval=60,
+        flush_every=3,
+        file_path=expense_file,
+    )
+    manager.add_expense("one", 1.0)
+    manager.add_expense("two", 2.0)
+    assert len(stored(expense_file)) == len(records)
+
+    manager.add_expense("three", 3.0)
+    assert len(stored(expense_file)) == len(records) + 3
+
+
+def test_store_flush_reports_changes_a_failed_save_left(tmp_path, monkeypatch):
+    from src.server import server
+
+    path = tmp_path / "expenses.json"
+    monkeypatch.setattr(
+        server, "store", server.ExpenseStore(durability="exit", file_path=path)
+    )
+    client = server.app.test_client()
+    client.post("/api/expenses", json={"name": "kept", "price": 1.0})
+
+    with monkeypatch.context() as failing:
+        failing.setattr(server.os, "replace", fail_replace)
+        assert client.post("/api/expenses/flush").get_json() == {"pending": 1}
+
+    assert client.post("/api/expenses/flush").get_json() == {"pending": 0}
+    assert [record["name"] for record in stored(path).values()] == ["kept"]
+
+
+def fail_replace(src, dst):
+    raise OSError("disk full")
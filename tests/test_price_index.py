@@ -0,0 +1,118 @@
+"""Sorted price index (user-012)."""
+
+import math
+import random
+
+import pytest
+
+from expense_manager import Expense, ExpenseManager
+from expenses_core import price_index
+from expenses_core.price_index import PriceIndex
+
+
+def expected_range(expenses, low=None, high=None):
+    return [
+        expense.id
+        for expense in sorted(expenses, key=lambda expense: (expense.price, expense.id))
+        if (low is None or expense.price >= low)
+        and (high is None or expense.price <= high)
+    ]
+
+
+def check_blocks(index):
+    """The blocks are each sorted, in order, and their maxes are right."""
+    pairs = []
+    for prices, ids, last in zip(index._prices, index._ids, index._maxes):
+        assert 0 < len(prices) < 2 * price_index.BLOCK_SIZE
+        assert len(prices) == len(ids)
+        block = list(zip(prices, ids))
+        assert block == sorted(block)
+        assert block[-1] == last
+        pairs.extend(block)
+    assert pairs == sorted(pairs)
+    assert len(pairs) == len(index)
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    monkeypatch.setattr(price_index, "BLOCK_SIZE", 4)
+
+
+def test_adds_split_full_blocks(small_blocks):
+    rng = random.Random(12)
+    expenses = [Expense("x", float(rng.randint(0, 20)), i) for i in range(1, 200)]
+    index = PriceIndex()
+    for expense in expenses:
+        index.add(expense)
+
+    assert len(index._prices) > 1
+    check_blocks(index)
+    assert index.range() == expected_range(expenses)
+    assert index.range(5, 12) == expected_range(expenses, 5, 12)
+
+
+def test_removes_drop_empty_blocks(small_blocks):
+    expenses = [Expense("x", float(i % 10), i) for i in range(1, 101)]
+    index = PriceIndex()
+    index.add_all(expenses)
+    blocks = len(index._prices)
+    for expense in random.Random(3).sample(expenses, 90):
+        index.remove(expense)
+        expenses.remove(expense)
+        check_blocks(index)
+
+    assert len(index._prices) < blocks
+    assert index.range() == expected_range(expenses)
+    # Removing an expense that is not indexed changes nothing.
+    index.remove(Expense("gone", 1.0, 1000))
+    assert len(index) == 10
+
+
+def test_add_all_merges_with_indexed_entries(small_blocks):
+    first = [Expense("x", float(i % 13), i) for i in range(1, 51)]
+    second = [Expense("x", float(i % 7), i) for i in range(51, 101)]
+    few = [Expense("x", 3.5, i) for i in range(101, 104)]
+    index = PriceIndex()
+    index.add_all(first)
+    index.add_all(second)
+    check_blocks(index)
+    # Few expenses next to the indexed ones are added one at a time.
+    index.add_all(few)
+    check_blocks(index)
+
+    assert index.range() == expected_range(first + second + few)
+
+
+def test_top_reads_across_blocks(small_blocks):
+    expenses = [Expense("x", float(i % 25), i) for i in range(1, 101)]
+    index = PriceIndex()
+    index.add_all(expenses)
+
+    for n, low, high in [(1, None, None), (10, None, None), (7, 3, 11), (50, 20, 30)]:
+        assert (
+            index.top(n, low, high)
+            == list(reversed(expected_range(expenses, low, high)))[:n]
+        )
+    assert index.top(5, 30, 40) == []
+
+
+def test_non_finite_prices_are_not_indexed():
+    index = PriceIndex()
+    index.add(Expense("x", math.nan, 1))
+    index.add(Expense("y", math.inf, 2))
+    index.add(Expense("z", 1.0, 3))
+    index.remove(Expense("x", math.nan, 1))
+
+    assert len(index) == 1
+    assert index.range() == [3]
+
+
+def test_manager_keeps_the_index_in_step_with_updates(expense_file, records):
+    manager = ExpenseManager(file_path=expense_file)
+    assert [e.id for e in manager.top_expenses(3)] == [50, 49, 48]
+
+    manager.update_expense(1, price=1000.0)
+    manager.delete_expense(50)
+
+    assert [e.id for e in manager.top_expenses(3)] == [1, 49, 48]
+    assert [e.id for e in manager.expenses_by_price(2, 5)] == [2, 3, 4]
@@ -0,0 +1,121 @@
+"""Buffered, paginated listings (user-024)."""
+
+import builtins
+import io
+
+import pytest
+
+import rendering
+from expense_manager import Expense, ExpenseManager
+from rendering import RULE, ExpenseRenderer, format_expense
+
+
+class Output(io.StringIO):
+    """A text stream that counts its writes."""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+    def isatty(self):
+        return False
+
+
+def sample(count: int):
+    return [Expense(f"item{n}", float(n), n) for n in range(1, count + 1)]
+
+
+def render(expenses, **options):
+    out = Output()
+    ExpenseRenderer(out=out, **options).render(expenses, "Title", "Nothing")
+    return out, out.getvalue().splitlines()
+
+
+def test_full_listing_is_written_in_chunks(monkeypatch):
+    monkeypatch.setattr(rendering, "RENDER_CHUNK", 10)
+    out, lines = render(iter(sample(95)))
+
+    assert lines[:2] == ["Title", RULE]
+    assert lines[2:97] == [format_expense(e) for e in sample(95)]
+    assert lines[97:] == [RULE, "Total: $4560.00"]
+    # Nine full chunks, then the rest with the footer.
+    assert out.writes == 10
+
+
+def test_page_shows_its_rows_and_totals_everything():
+    _, lines = render(iter(sample(25)), page=2, page_size=10)
+
+    assert lines[2:12] == [format_expense(e) for e in sample(25)[10:20]]
+    assert lines[-2:] == [
+        "Showing 11-20 of 25 expenses (page 2 of 3)",
+        "Total: $325.00",
+    ]
+
+
+def test_page_past_the_end():
+    _, lines = render(sample(25), page=4, page_size=10)
+
+    assert lines == [
+        "Page 4 is past the end: 25 expenses on 3 page(s)",
+        "Total: $325.00",
+    ]
+
+
+def test_empty_listing():
+    assert render([])[1] == ["Nothing"]
+
+
+def test_pausing_stops_when_asked(monkeypatch):
+    answers = iter(["", "q"])
+    monkeypatch.setattr(builtins, "input", lambda prompt: next(answers))
+    _, lines = render(sample(25), page_size=10, interactive=True)
+
+    assert len([line for line in lines if ". item" in line]) == 20
+    assert lines[-2:] == ["Showing 1-20 of 25 expenses", "Total: $325.00"]
+
+
+def test_pausing_does_not_ask_after_the_last_page(monkeypatch):
+    def no_input(prompt):
+        raise AssertionError("asked for more after the last page")
+
+    monkeypatch.setattr(builtins, "input", lambda prompt: "")
+    _, lines = render(sample(20), page_size=10, interactive=True)
+    assert lines[-1] == "Total: $210.00"
+
+    monkeypatch.setattr(builtins, "input", no_input)
+    render(sample(10), page_size=10, interactive=True)
+
+
+def test_failing_iterator_is_reported():
+    def broken():
+        yield from sample(3)
+        raise OSError("disk gone")
+
+    _, lines = render(broken())
+
+    assert lines[-3:] == ["Error loading expenses: disk gone", RULE, "Total: $6.00"]
+
+
+@pytest.mark.parametrize("options", [{"page": 0}, {"page_size": 0}])
+def test_invalid_pages_are_rejected(options):
+    with pytest.raises(ValueError):
+        ExpenseRenderer(**options)
+
+
+def test_manager_lists_through_its_renderer(expense_file):
+    manager = ExpenseManager(file_path=expense_file)
+    out = Output()
+    manager.renderer = ExpenseRenderer(page=5, page_size=10, out=out)
+    manager.list_expenses()
+
+    lines = out.getvalue().splitlines()
+    rows = [line.split(".")[0] for line in lines if ". item" in line]
+    assert rows == [str(expense_id) for expense_id in range(41, 51)]
+    assert lines[-2:] == [
+        "Showing 41-50 of 50 expenses (page 5 of 5)",
+        f"Total: ${sum(n * 1.25 for n in range(1, 51)):.2f}",
+    ]
@@ -0,0 +1,109 @@
+"""Trigram substring search and the server's use of it (user-004)."""
+
+import random
+import subprocess
+import sys
+
+import pytest
+
+from conftest import API_DIR
+from expense_manager import Expense
+from expenses_core.search_index import TrigramIndex
+
+NAMES = ["Coffee", "coffee beans", "Taxi", "taxi to airport", "ox", "Café"]
+
+
+@pytest.fixture
+def expenses():
+    rng = random.Random(4)
+    return [Expense(rng.choice(NAMES), 1.0, expense_id) for expense_id in range(1, 201)]
+
+
+def scan(expenses, query):
+    return [e.id for e in expenses if query.lower() in e.name.lower()]
+
+
+@pytest.mark.parametrize("query", ["coffee", "COF", "xi t", "ox", "o", "", "zzz", "fé"])
+def test_search_matches_a_scan(expenses, query):
+    index = TrigramIndex()
+    index.add_all(expenses)
+
+    assert index.search(query) == scan(expenses, query)
+
+
+def test_removed_and_renamed_expenses_are_not_found(expenses):
+    index = TrigramIndex()
+    index.add_all(expenses)
+    for expense in expenses[::2]:
+        index.remove(expense)
+    renamed = expenses[1]
+    index.remove(renamed)
+    renamed.name = "train"
+    index.add(renamed)
+    kept = expenses[1::2]
+
+    assert index.search("rain") == [renamed.id]
+    assert index.search("taxi") == scan(kept, "taxi")
+    assert len(index) == len(kept)
+    # Removing an expense twice, or one never added, changes nothing.
+    index.remove(expenses[0])
+    index.remove(Expense("ghost", 1.0, 999))
+    assert len(index) == len(kept)
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    from src.server import server
+
+    monkeypatch.setattr(
+        server, "store", server.ExpenseStore(file_path=tmp_path / "expenses.json")
+    )
+    return server
+
+
+@pytest.mark.parametrize(
+    "body", [{"name": "", "price": 1}, {"name": 5, "price": 1}, ["coffee", 1]]
+)
+def test_server_rejects_invalid_names(server, body):
+    client = server.app.test_client()
+
+    assert client.post("/api/expenses", json=body).status_code == 400
+    assert len(server.store.expenses) == 0
+
+
+def test_server_publishes_an_expense_only_once_every_index_took_it(server, monkeypatch):
+    def broken_add(expense):
+        raise RuntimeError("index is broken")
+
+    monkeypatch.setattr(server.store.tag_index, "add", broken_add)
+    with pytest.raises(RuntimeError):
+        server.store.add_expense("coffee", 3.0)
+
+    assert server.store.expenses == {}
+    assert server.store.name_index.search("coffee") == []
+    assert server.store.price_index.range() == []
+
+
+def test_server_search_uses_the_index(server):
+    client = server.app.test_client()
+    for name in ("Coffee", "Tea", "coffee beans"):
+        client.post("/api/expenses", json={"name": name, "price": 1.0})
+
+    found = client.get("/api/expenses/search?q=COFF").get_json()
+    assert [expense["name"] for expense in found] == ["Coffee", "coffee beans"]
+
+
+def test_api_does_not_see_the_cli_modules():
+    code = (
+        "import importlib.util, src.server.server; "
+        "print([name for name in ('journal', 'bulk', 'batch', 'rendering') "
+        "if importlib.util.find_spec(name)])"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=API_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert output.strip() == "[]"
@@ -0,0 +1,80 @@
+"""Sharded storage (user-018)."""
+
+import json
+
+import pytest
+
+from expense_manager import ExpenseManager
+from shards import MANIFEST, ShardLayout
+
+
+@pytest.fixture
+def sharded(expense_file):
+    """expense_file after a first save split it into three shards."""
+    manager = ExpenseManager(shards=3, file_path=expense_file)
+    manager.add_expense("split", 1.0)
+    return expense_file
+
+
+@pytest.mark.parametrize("key", ["id", "month"])
+def test_shards_round_trip(expense_file, records, key):
+    manager = ExpenseManager(shards=3, shard_key=key, file_path=expense_file)
+    manager.update_expense(1, price=42.0)
+    manager.delete_expense(2)
+    layout = manager.shards
+
+    assert sorted(p.name for p in layout.directory.iterdir()) == [
+        MANIFEST,
+        "shard-000.json",
+        "shard-001.json",
+        "shard-002.json",
+    ]
+    for shard in range(3):
+        for record in json.loads(layout.path(shard).read_text()):
+            assert layout.shard_of(manager.get_expense(record["id"])) == shard
+
+    reopened = ExpenseManager(shards=3, file_path=expense_file)
+    assert len(reopened.expenses) == len(records) - 1
+    assert reopened.get_expense(1).price == 42.0
+
+
+def test_first_save_moves_the_single_file_aside(sharded, records):
+    assert not sharded.exists()
+    backup = sharded.with_suffix(".json.bak")
+    assert [record["id"] for record in json.loads(backup.read_text())] == [
+        record["id"] for record in records
+    ]
+
+
+def test_a_run_without_shards_keeps_using_them(sharded, records):
+    manager = ExpenseManager(file_path=sharded)
+    assert manager.shards is not None and manager.shards.count == 3
+    assert len(manager.expenses) == len(records) + 1
+
+    manager.add_expense("later", 2.0)
+    lazy = ExpenseManager(lazy=True, file_path=sharded)
+    assert [e.name for e in lazy.iter_expenses()][-2:] == ["split", "later"]
+    assert not sharded.exists()
+
+
+def test_sqlite_backend_refuses_a_sharded_snapshot(sharded):
+    with pytest.raises(ValueError, match="shards"):
+        ExpenseManager(backend="sqlite", file_path=sharded)
+
+
+def test_existing_layout_keeps_its_count_and_key(sharded):
+    layout = ShardLayout(sharded.with_suffix(".shards"), 8, "month")
+
+    assert (layout.count, layout.key) == (3, "id")
+
+
+def test_lazy_scans_match_the_loaded_expenses(sharded):
+    loaded = ExpenseManager(file_path=sharded)
+    lazy = ExpenseManager(lazy=True, file_path=sharded)
+
+    assert lazy.stats().to_dict() == pytest.approx(loaded.stats().to_dict())
+    assert [e.id for e in lazy.expenses_matching("item3")] == [
+        e.id for e in loaded.expenses_matching("item3")
+    ]
+    assert lazy.approx_stats().count == len(loaded.expenses)
+    assert not lazy.is_loaded
@@ -0,0 +1,126 @@
+"""Quantile and distinct-name sketches (user-019)."""
+
+import bisect
+import random
+
+import pytest
+
+from expense_manager import Expense, ExpenseManager
+from expenses_core.sketches import (
+    ExpenseSketches,
+    HyperLogLog,
+    KLLSketch,
+    parse_quantiles,
+)
+
+FRACTIONS = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+
+
+def kll(values, seed: int = 19) -> KLLSketch:
+    sketch = KLLSketch()
+    sketch._random.seed(seed)
+    for value in values:
+        sketch.update(value)
+    return sketch
+
+
+def rank_errors(sketch, values):
+    """How far the rank of each estimated quantile is from the asked one,
+    as a fraction of all values."""
+    ordered = sorted(values)
+    return [
+        abs(bisect.bisect_left(ordered, estimate) / len(ordered) - fraction)
+        for fraction, estimate in zip(FRACTIONS, sketch.quantiles(FRACTIONS))
+    ]
+
+
+@pytest.fixture
+def prices():
+    rng = random.Random(19)
+    return [round(rng.lognormvariate(3, 1), 2) for _ in range(50000)]
+
+
+def test_kll_quantiles_are_within_the_rank_error(prices):
+    sketch = kll(prices)
+
+    assert sketch.count == len(prices)
+    assert len(sketch) < 1000
+    assert max(rank_errors(sketch, prices)) < 0.03
+
+
+def test_merged_kll_sketches_stay_accurate(prices):
+    parts = [kll(prices[start::8], seed=start) for start in range(8)]
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+
+    assert merged.count == len(prices)
+    assert len(merged) < 1000
+    assert max(rank_errors(merged, prices)) < 0.03
+
+
+def test_empty_kll_has_no_quantiles():
+    assert KLLSketch().quantiles([0.5]) == [None]
+
+
+@pytest.mark.parametrize("distinct", [10, 1000, 100000])
+def test_hll_estimate_is_within_a_few_percent(distinct):
+    sketch = HyperLogLog()
+    for n in range(distinct):
+        sketch.add(f"name {n}")
+        sketch.add(f"name {n}")
+
+    assert sketch.estimate() == pytest.approx(distinct, rel=0.05)
+
+
+def test_merged_hll_counts_shared_names_once():
+    left, right, both = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for n in range(30000):
+        left.add(f"name {n}")
+        both.add(f"name {n}")
+    for n in range(20000, 50000):
+        right.add(f"name {n}")
+        both.add(f"name {n}")
+    left.merge(right)
+
+    assert left.estimate() == both.estimate()
+    assert left.estimate() == pytest.approx(50000, rel=0.05)
+    with pytest.raises(ValueError):
+        left.merge(HyperLogLog(precision=10))
+
+
+def test_removals_ask_for_a_rebuild():
+    sketches = ExpenseSketches()
+    expenses = [Expense(f"n{i}", float(i), i) for i in range(1, 101)]
+    sketches.add_all(expenses)
+    # Rebuilt once removed values are over a tenth of the live ones.
+    for expense in expenses[:9]:
+        sketches.remove(expense)
+    assert not sketches.needs_rebuild()
+
+    sketches.remove(expenses[9])
+    assert sketches.needs_rebuild()
+    assert sketches.count == 90
+
+
+def test_manager_rebuilds_sketches_after_many_deletes(tmp_path):
+    manager = ExpenseManager(file_path=tmp_path / "expenses.json")
+    for n in range(1, 101):
+        manager.add_expense(f"name {n % 20}", float(n))
+    first = manager.approx_stats()
+    assert first.to_dict()["distinct_names"] == 20
+
+    for expense_id in range(1, 51):
+        manager.delete_expense(expense_id)
+    rebuilt = manager.approx_stats()
+
+    assert rebuilt is not first
+    assert rebuilt.count == 50
+    assert rebuilt.quantiles([0.5]) == [75.0]
+
+
+def test_parse_quantiles():
+    assert parse_quantiles("0.5, 0.9,") == [0.5, 0.9]
+    for bad in ["", "1.5", "x"]:
+        with pytest.raises(ValueError):
+            parse_quantiles(bad)
@@ -0,0 +1,123 @@
+"""SQLite storage backend (user-006)."""
+
+import pytest
+
+from expense_manager import ExpenseManager
+
+
+@pytest.fixture
+def managers(expense_file):
+    """An SQLite manager seeded from expense_file and an in-memory one."""
+    return (
+        ExpenseManager(backend="sqlite", file_path=expense_file),
+        ExpenseManager(file_path=expense_file),
+    )
+
+
+def ids(expenses):
+    return [expense.id for expense in expenses]
+
+
+def test_changes_are_committed_row_by_row(expense_file, records):
+    manager = ExpenseManager(backend="sqlite", file_path=expense_file)
+    before = expense_file.read_text()
+    added = manager.add_expense("tea", 2.0, tags=["food"])
+    manager.update_expense(1, name="coffee", price=10.0)
+    manager.delete_expense(2)
+
+    assert expense_file.read_text() == before
+    reopened = ExpenseManager(backend="sqlite", file_path=expense_file)
+    assert reopened.get_expense(1).name == "coffee"
+    assert reopened.get_expense(1).price == 10.0
+    assert reopened.get_expense(2) is None
+    assert reopened.get_expense(added.id).tags == ["food"]
+    assert reopened.stats().count == len(records)
+    assert manager.update_expense(2, price=1.0) is None
+    assert manager.delete_expense(2) is None
+
+
+def test_queries_match_the_in_memory_store(managers):
+    for manager in managers:
+        manager.add_expense("Éclair au café", 3.0, "2026-02-03T08:00:00", ["food"])
+        manager.update_expense(3, price=99.0, tags=["travel"])
+        manager.delete_expense(4)
+    sqlite, memory = managers
+
+    for query in ["item3", "ÉCLAIR", "CAFÉ", "é", "%", ""]:
+        assert ids(sqlite.expenses_matching(query)) == ids(
+            memory.expenses_matching(query)
+        )
+    assert ids(sqlite.expenses_matching("éclair")) == [51]
+    assert ids(sqlite.expenses_by_price(10, 20)) == ids(
+        memory.expenses_by_price(10, 20)
+    )
+    assert ids(sqlite.top_expenses(5)) == ids(memory.top_expenses(5))
+    assert ids(sqlite.expenses_between("2026-02", "2026-03")) == ids(
+        memory.expenses_between("2026-02", "2026-03")
+    )
+    assert [
+        (month, stats.to_dict()) for month, stats in sqlite.monthly_stats()
+    ] == pytest.approx(
+        [(month, stats.to_dict()) for month, stats in memory.monthly_stats()]
+    )
+    assert ids(sqlite.expenses_with_tags("food AND NOT travel")) == ids(
+        memory.expenses_with_tags("food AND NOT travel")
+    )
+    assert ids(sqlite.expenses_similar_to("itme3")) == ids(
+        memory.expenses_similar_to("itme3")
+    )
+    assert sqlite.autocomplete("it") == memory.autocomplete("it")
+    assert sqlite.approx_stats().to_dict() == memory.approx_stats().to_dict()
+    with pytest.raises(ValueError):
+        sqlite.expenses_with_tags("food AND")
+
+
+def test_derived_indexes_are_cached_and_kept_up_to_date(expense_file):
+    manager = ExpenseManager(backend="sqlite", file_path=expense_file)
+    sketches = manager.approx_stats()
+    assert manager.approx_stats() is sketches
+    completions = manager.store.name_completions
+
+    manager.add_expense("zucchini", 4.0)
+    manager.update_expense(1, name="zebra")
+    assert manager.store.name_completions is completions
+    assert manager.autocomplete("z") == [("zebra", 1), ("zucchini", 1)]
+    assert manager.approx_stats() is sketches
+    assert sketches.count == 51
+
+
+def test_changes_by_another_connection_drop_the_indexes(expense_file):
+    manager = ExpenseManager(backend="sqlite", file_path=expense_file)
+    assert manager.autocomplete("new") == []
+    sketches = manager.approx_stats()
+
+    other = ExpenseManager(backend="sqlite", file_path=expense_file)
+    other.add_expense("newcomer", 1.0)
+
+    assert manager.autocomplete("new") == [("newcomer", 1)]
+    assert manager.approx_stats() is not sketches
+    assert manager.approx_stats().count == 51
+
+
+def test_rolled_back_changes_leave_the_indexes(expense_file):
+    manager = ExpenseManager(backend="sqlite", file_path=expense_file)
+    assert manager.autocomplete("gone") == []
+
+    with pytest.raises(OSError):
+        with manager.transaction():
+            manager.add_expense("gone", 1.0)
+            raise OSError("disk full")
+
+    assert manager.autocomplete("gone") == []
+    assert manager.stats().count == 50
+
+
+def test_reports_follow_changes(expense_file):
+    pytest.importorskip("numpy")
+    manager = ExpenseManager(backend="sqlite", file_path=expense_file)
+    manager.report("totals_by_name")
+
+    manager.add_expense("big", 1000.0)
+    assert manager.report("totals_by_name", limit=1) == [
+        {"name": "big", "count": 1, "total": 1000.0}
+    ]
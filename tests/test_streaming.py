@@ -0,0 +1,94 @@
+"""Streaming parser and lazy loading (user-002)."""
+
+import json
+import threading
+
+import pytest
+
+from conftest import stored
+from expense_manager import ExpenseManager
+from expenses_core.streaming import assign_ids, iter_json_array
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_iter_json_array_matches_json_load(tmp_path, records, chunk_size):
+    records = records + [
+        {
+            "name": 'odd "[name]", {x}\\ é',
+            "price": 1e-3,
+            "id": 51,
+            "timestamp": None,
+            "tags": [],
+        }
+    ]
+    path = tmp_path / "expenses.json"
+    path.write_text(json.dumps(records, indent=2))
+
+    assert list(iter_json_array(path, chunk_size)) == records
+
+
+def test_iter_json_array_of_empty_array(tmp_path):
+    path = tmp_path / "expenses.json"
+    path.write_text("[\n]\n")
+
+    assert list(iter_json_array(path)) == []
+
+
+def test_assign_ids_numbers_records_without_ids():
+    items = [{"name": "a"}, {"name": "b", "id": 5}, {"name": "c"}]
+
+    assert [item["id"] for item in assign_ids(items)] == [6, 5, 7]
+    assert [item["id"] for item in assign_ids([{}, {}])] == [1, 2]
+
+
+def test_lazy_manager_reads_without_loading(expense_file, records):
+    manager = ExpenseManager(lazy=True, file_path=expense_file)
+
+    assert [expense.id for expense in manager.iter_expenses()] == [
+        record["id"] for record in records
+    ]
+    assert manager.stats().total == pytest.approx(
+        sum(record["price"] for record in records)
+    )
+    assert not manager.is_loaded
+
+
+def test_lazy_manager_change_round_trips(expense_file):
+    manager = ExpenseManager(lazy=True, file_path=expense_file)
+    added = manager.add_expense("new", 9.5, tags=["fun"])
+    manager.update_expense(3, price=100.0)
+    manager.delete_expense(4)
+    manager.flush()
+
+    saved = stored(expense_file)
+    assert saved[added.id]["name"] == "new"
+    assert saved[3]["price"] == 100.0
+    assert 4 not in saved
+    reopened = ExpenseManager(lazy=True, file_path=expense_file)
+    assert sorted(expense.id for expense in reopened.iter_expenses()) == sorted(saved)
+
+
+def test_lazy_store_loads_once_under_concurrent_reads(expense_file):
+    from src.server.server import ExpenseStore
+
+    store = ExpenseStore(lazy=True, file_path=expense_file)
+    loads = []
+    load_expenses = store.load_expenses
+
+    def counting_load():
+        loads.append(1)
+        load_expenses()
+
+    store.load_expenses = counting_load
+    found = []
+    threads = [
+        threading.Thread(target=lambda n=n: found.append(store.get_expense(n)))
+        for n in range(1, 9)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert sorted(expense.id for expense in found) == list(range(1, 9))
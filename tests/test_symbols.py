@@ -0,0 +1,72 @@
+"""Shared expense names (user-017)."""
+
+import sys
+
+import pytest
+
+from expense_manager import ExpenseManager
+from expenses_core.symbols import SymbolTable
+
+
+def test_intern_returns_one_copy_per_name():
+    table = SymbolTable()
+    first = table.intern("".join(["cof", "fee"]))
+    second = table.intern("".join(["coff", "ee"]))
+
+    assert first is second
+    assert len(table) == 1
+    assert table.references == 2
+    assert table.bytes_saved == sys.getsizeof(first)
+
+
+def test_release_forgets_unused_names():
+    table = SymbolTable()
+    for name in ["rent", "rent", "tea"]:
+        table.intern(name)
+    table.release("rent")
+    assert table.to_dict() == {
+        "distinct": 2,
+        "references": 2,
+        "bytes_used": sys.getsizeof("rent") + sys.getsizeof("tea"),
+        "bytes_saved": 0,
+    }
+
+    table.release("rent")
+    table.release("tea")
+    # Releasing a name that is not in the table is ignored.
+    table.release("tea")
+    assert table.to_dict()["references"] == 0
+    assert len(table) == 0
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_manager_shares_names_and_follows_changes(expense_file, records, columnar):
+    manager = ExpenseManager(columnar=columnar, file_path=expense_file)
+    expenses = list(manager.iter_expenses())
+    by_name = {}
+    for expense in expenses:
+        assert by_name.setdefault(expense.name, expense.name) is expense.name
+    assert len(manager.names) == 7
+    assert manager.names.references == len(records)
+
+    manager.update_expense(7, name="item0 renamed")
+    manager.delete_expense(14)
+    added = manager.add_expense("item1", 1.0)
+
+    assert manager.names.references == len(records)
+    assert len(manager.names) == 8
+    assert added.name is manager.get_expense(1).name
+
+
+def test_server_shares_names(expense_file, monkeypatch):
+    from src.server import server
+
+    monkeypatch.setattr(server, "store", server.ExpenseStore(file_path=expense_file))
+    client = server.app.test_client()
+    client.post("/api/expenses", json={"name": "item3", "price": 1.0})
+    store = server.store
+
+    assert len(store.names) == 7
+    names = {}
+    for expense in store.expenses.values():
+        assert names.setdefault(expense.name, expense.name) is expense.name
@@ -0,0 +1,128 @@
+"""Tag bitmap index and tag queries (user-016)."""
+
+import random
+
+import pytest
+
+from expense_manager import Expense, ExpenseManager
+from expenses_core.tag_index import (
+    CHUNK_IDS,
+    TagIndex,
+    matches,
+    normalize_tags,
+    parse_query,
+)
+
+QUERIES = [
+    "food",
+    "food travel",
+    "food OR travel",
+    "NOT food",
+    "work AND NOT (food OR travel)",
+    "not not work or missing",
+]
+
+# Ids on both sides of the first chunk boundaries.
+BOUNDARY_IDS = [
+    1,
+    CHUNK_IDS - 1,
+    CHUNK_IDS,
+    CHUNK_IDS + 1,
+    2 * CHUNK_IDS - 1,
+    2 * CHUNK_IDS,
+    5 * CHUNK_IDS + 7,
+]
+
+
+def tagged_expenses(ids, seed: int = 16):
+    rng = random.Random(seed)
+    return [
+        Expense(
+            "item",
+            1.0,
+            expense_id,
+            tags=rng.sample(["food", "travel", "work"], rng.randint(0, 3)),
+        )
+        for expense_id in ids
+    ]
+
+
+def scan(expenses, query):
+    parsed = parse_query(query)
+    return [e.id for e in expenses if matches(parsed, set(e.tags))]
+
+
+@pytest.mark.parametrize("build", ["add", "add_all"])
+def test_queries_across_chunk_boundaries_match_a_scan(build):
+    expenses = tagged_expenses(
+        BOUNDARY_IDS + list(range(CHUNK_IDS - 50, CHUNK_IDS - 1))
+    )
+    expenses.sort(key=lambda expense: expense.id)
+    index = TagIndex()
+    if build == "add":
+        for expense in expenses:
+            index.add(expense)
+    else:
+        index.add_all(expenses)
+
+    for query in QUERIES:
+        assert index.search(query) == scan(expenses, query)
+
+
+def test_clearing_the_last_bit_of_a_chunk_drops_it():
+    index = TagIndex()
+    expenses = tagged_expenses(BOUNDARY_IDS)
+    for expense in expenses:
+        expense.tags = ["food"]
+    index.add_all(expenses)
+    assert sorted(index._bitmaps["food"]) == [0, 1, 2, 5]
+
+    for expense in expenses[2:4]:
+        index.remove(expense)
+    assert sorted(index._bitmaps["food"]) == [0, 1, 2, 5]
+    index.remove(expenses[4])
+    assert sorted(index._bitmaps["food"]) == [0, 2, 5]
+    assert index.search("food") == [1, CHUNK_IDS - 1, 2 * CHUNK_IDS, 5 * CHUNK_IDS + 7]
+    assert index.search("NOT food") == []
+
+    for expense in expenses:
+        index.remove(expense)
+    assert index._bitmaps == {}
+    assert index._all == {}
+
+
+def test_tag_counts():
+    index = TagIndex()
+    index.add_all(tagged_expenses(BOUNDARY_IDS))
+    index.add(Expense("item", 1.0, 3 * CHUNK_IDS, tags=["work"]))
+
+    assert index.tag_counts() == {
+        tag: len(index.search(tag)) for tag in ["food", "travel", "work"]
+    }
+
+
+@pytest.mark.parametrize(
+    "query", ["", "food AND", "(food", "food)", "OR food", "NOT", "food ( )"]
+)
+def test_malformed_queries_are_rejected(query):
+    with pytest.raises(ValueError):
+        parse_query(query)
+
+
+def test_normalize_tags():
+    assert normalize_tags(" Food, travel,,FOOD ") == ["food", "travel"]
+    assert normalize_tags(None) == []
+    for bad in ["and", "a(b", [1]]:
+        with pytest.raises(ValueError):
+            normalize_tags(bad)
+
+
+def test_manager_queries_follow_tag_updates(expense_file):
+    manager = ExpenseManager(file_path=expense_file)
+    assert manager.expenses_with_tags("food AND work") == []
+
+    manager.update_expense(1, tags=["food", "work"])
+    manager.delete_expense(3)
+
+    assert [e.id for e in manager.expenses_with_tags("food AND work")] == [1]
+    assert 3 not in [e.id for e in manager.expenses_with_tags("food")]